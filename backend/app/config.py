@@ -0,0 +1,83 @@
+"""
+Runtime configuration for SmartBee, read from environment variables.
+
+HACKATHON: Every setting is optional — leaving a data path unset keeps the
+           matching router on its mock data.
+PRODUCTION: Set the paths below in the deployment environment (or a .env file).
+"""
+
+import os
+
+# ─── Data sources ─────────────────────────────────────────────────────────────
+# Path to a static GTFS zip (stops.txt, trips.txt, stop_times.txt, optional routes.txt).
+GTFS_PATH = os.environ.get("SMARTBEE_GTFS_PATH") or None
+
+# GTFS-Realtime TripUpdates source (http(s) URL or local file) and poll interval.
+GTFS_RT_URL = os.environ.get("SMARTBEE_GTFS_RT_URL") or None
+GTFS_RT_POLL_SECONDS = float(os.environ.get("SMARTBEE_GTFS_RT_POLL_SECONDS", "30"))
+
+# Path to the road graph JSON (nodes, edges with road_id, route shapes).
+ROAD_GRAPH_PATH = os.environ.get("SMARTBEE_ROAD_GRAPH_PATH") or None
+
+# Path to a .npz of raw heatmap events (<metric>_lat / _lng / _weight arrays).
+HEATMAP_EVENTS_PATH = os.environ.get("SMARTBEE_HEATMAP_EVENTS_PATH") or None
+
+# Directory of the stop event history (app.services.history) behind the heatmap
+# "delay" and "crowding" metrics: the window before now, over the last N days.
+HISTORY_PATH = os.environ.get("SMARTBEE_HISTORY_PATH") or None
+HISTORY_WINDOW_MINUTES = int(os.environ.get("SMARTBEE_HISTORY_WINDOW_MINUTES", "15"))
+HISTORY_DAYS = int(os.environ.get("SMARTBEE_HISTORY_DAYS", "30"))
+
+# Directory of the precomputed stop × stop travel-time matrix (app.services.matrix),
+# filled in the background; unset = /api/routes always plans in full.
+MATRIX_PATH = os.environ.get("SMARTBEE_MATRIX_PATH") or None
+# Time-of-day bands to precompute (comma separated; default all).
+MATRIX_BANDS = [b.strip() for b in os.environ.get(
+    "SMARTBEE_MATRIX_BANDS", "early,am_peak,interpeak,pm_peak,evening").split(",") if b.strip()]
+
+# Prebuilt binary snapshot of the datasets above (`python -m app.snapshot build`);
+# mapped at startup instead of loading, and rebuilt if stale. Unset = load from source.
+SNAPSHOT_PATH = os.environ.get("SMARTBEE_SNAPSHOT_PATH") or None
+# Hash the whole snapshot body at startup too (reads every page); otherwise only
+# `python -m app.snapshot check` does. Startup always checks header, size and sources.
+SNAPSHOT_VERIFY = os.environ.get("SMARTBEE_SNAPSHOT_VERIFY", "0") == "1"
+
+# ─── Upstreams ────────────────────────────────────────────────────────────────
+# Outbound HTTP clients (app.services.upstream). Named upstreams as "name=url,...";
+# an http(s) GTFS_RT_URL is registered as "gtfs_rt" without being listed here.
+UPSTREAM_URLS = dict(
+    entry.strip().split("=", 1) for entry in os.environ.get("SMARTBEE_UPSTREAM_URLS", "").split(",") if "=" in entry
+)
+# Per call: overall deadline, retries within it, and hedge delay (unset = no hedging).
+UPSTREAM_DEADLINE_SECONDS = float(os.environ.get("SMARTBEE_UPSTREAM_DEADLINE_SECONDS", "5"))
+UPSTREAM_RETRIES = int(os.environ.get("SMARTBEE_UPSTREAM_RETRIES", "2"))
+UPSTREAM_HEDGE_SECONDS = float(os.environ["SMARTBEE_UPSTREAM_HEDGE_SECONDS"]) if os.environ.get(
+    "SMARTBEE_UPSTREAM_HEDGE_SECONDS") else None
+# Per upstream: connection pool size, breaker threshold/cool-off, and how old a
+# last good response may be to be served while the upstream is down.
+UPSTREAM_MAX_CONNECTIONS = int(os.environ.get("SMARTBEE_UPSTREAM_MAX_CONNECTIONS", "20"))
+UPSTREAM_BREAKER_FAILURES = int(os.environ.get("SMARTBEE_UPSTREAM_BREAKER_FAILURES", "5"))
+UPSTREAM_BREAKER_RESET_SECONDS = float(os.environ.get("SMARTBEE_UPSTREAM_BREAKER_RESET_SECONDS", "30"))
+UPSTREAM_STALE_SECONDS = float(os.environ.get("SMARTBEE_UPSTREAM_STALE_SECONDS", "600"))
+
+# ─── Caching ──────────────────────────────────────────────────────────────────
+# Redis URL for the shared response cache; unset = in-process LRU per worker.
+REDIS_URL = os.environ.get("SMARTBEE_REDIS_URL") or None
+CACHE_TTL_SECONDS = float(os.environ.get("SMARTBEE_CACHE_TTL_SECONDS", "30"))
+CACHE_MAX_ENTRIES = int(os.environ.get("SMARTBEE_CACHE_MAX_ENTRIES", "10000"))
+
+# ─── Streaming ────────────────────────────────────────────────────────────────
+# How often each watched stop's board is rebuilt for SSE subscribers.
+ARRIVALS_STREAM_SECONDS = float(os.environ.get("SMARTBEE_ARRIVALS_STREAM_SECONDS", "15"))
+
+# ─── Serving ──────────────────────────────────────────────────────────────────
+# `python -m app.serve`: worker processes (default one per CPU) and the directory
+# (tmpfs by default) its supervisor publishes the loaded datasets to.
+WORKERS = int(os.environ.get("SMARTBEE_WORKERS", "0")) or os.cpu_count() or 1
+SHARED_DATA_DIR = os.environ.get("SMARTBEE_SHARED_DATA_DIR") or None
+# Set by `python -m app.serve` for its workers, which attach this file instead of loading.
+SHARED_DATA_PATH = os.environ.get("SMARTBEE_SHARED_DATA_PATH") or None
+
+# ─── Operations ───────────────────────────────────────────────────────────────
+# Token for /admin endpoints and the `X-Profile` request header; unset disables both.
+ADMIN_TOKEN = os.environ.get("SMARTBEE_ADMIN_TOKEN") or None
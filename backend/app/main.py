@@ -6,13 +6,64 @@ PRODUCTION: Replace mock data with live TfGM feeds, PostgreSQL/PostGIS,
             Redis caching, and ML model inference endpoints.
 
 Run: uvicorn app.main:app --reload --host 0.0.0.0 --port 8000
+     python -m app.serve --workers 4     (all cores, datasets loaded once; app.serve)
 Docs: http://localhost:8000/docs
 """
 
+import asyncio
+import contextlib
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
+
+from app import config
+from app.routers import admin, arrivals, routes, heatmap, road_closure, stops
+from app.services import (
+    cache, demand, history, matrix, planner, realtime, registry, road_graph, shared, snapshot, stop_resolver, tiles,
+    timetable, upstream,
+)
+from app.services.metrics import MetricsMiddleware, get_metrics
+from app.services.profiler import ProfilingMiddleware, get_profiler
+from app.services.registry import RegistryMiddleware
+
+
+# ─── Lifespan ─────────────────────────────────────────────────────────────────
+# Load static datasets once, off the event loop, before serving traffic. Workers
+# of `python -m app.serve` attach the copy its supervisor published instead, and
+# with a snapshot configured it is mapped rather than loaded (rebuilt if stale).
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    cache.init_cache()
+    worker = config.SHARED_DATA_PATH is not None
+    if worker:
+        prebuilt = await asyncio.to_thread(shared.attach, config.SHARED_DATA_PATH)
+    elif config.SNAPSHOT_PATH:
+        prebuilt = await asyncio.to_thread(snapshot.open_snapshot, config.SNAPSHOT_PATH)
+    else:
+        prebuilt = {}
+    loaded = await asyncio.to_thread(timetable.init_timetable, prebuilt=prebuilt.get("timetable"))
+    await asyncio.to_thread(stop_resolver.init_resolver, loaded, prebuilt=prebuilt.get("stops"))
+    await asyncio.to_thread(demand.init_demand, loaded)
+    network = await asyncio.to_thread(planner.init_planner, loaded, prebuilt=prebuilt.get("network"))
+    await asyncio.to_thread(road_graph.init_road_graph, prebuilt=prebuilt.get("road_graph"))
+    await asyncio.to_thread(tiles.init_tiles, prebuilt=prebuilt.get("tiles"))
+    await asyncio.to_thread(history.init_history)
+    await asyncio.to_thread(matrix.init_matrix, network, readonly=worker)
+    upstream.open_upstreams()
+    poller = realtime.start_realtime(loaded)
+    matrix.start_matrix()
+    yield
+    await arrivals.hub.close()
+    if poller is not None:
+        poller.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await poller
+    await matrix.stop_matrix()
+    await upstream.close_upstreams()
 
-from app.routers import arrivals, routes, heatmap, road_closure
 
 app = FastAPI(
     title="SmartBee API",
@@ -20,8 +71,13 @@ app = FastAPI(
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
+# ─── Dataset registry ─────────────────────────────────────────────────────────
+# Innermost: pins one dataset snapshot per request (app.services.registry).
+app.add_middleware(RegistryMiddleware)
+
 # ─── CORS ─────────────────────────────────────────────────────────────────────
 # HACKATHON: Allow all origins for easy demo.
 # PRODUCTION: Restrict to your frontend domain + internal services.
@@ -31,13 +87,55 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["GET", "POST"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Data-Version"],
 )
 
+# ─── Instrumentation ──────────────────────────────────────────────────────────
+# Outermost, so latency covers CORS and routing; profiling only with an admin token.
+app.add_middleware(ProfilingMiddleware, profiler=get_profiler(), token=config.ADMIN_TOKEN)
+app.add_middleware(MetricsMiddleware, metrics=get_metrics())
+
+
+def collect_service_metrics():
+    stats = cache.get_response_cache().stats()
+    yield ("smartbee_cache_lookups_total", "counter", "Response cache lookups by result.",
+           [({"result": r}, stats[r]) for r in ("hits", "misses", "coalesced")])
+    yield ("smartbee_cache_errors_total", "counter", "Response cache backend errors.", [({}, stats["errors"])])
+    yield ("smartbee_cache_hit_ratio", "gauge", "Share of lookups served from the cache.",
+           [({}, stats["hit_ratio"])])
+    streams = arrivals.hub.stats()
+    yield ("smartbee_stream_topics", "gauge", "Stops with at least one SSE subscriber.", [({}, streams["topics"])])
+    yield ("smartbee_stream_subscribers", "gauge", "Open SSE subscriptions.", [({}, streams["subscribers"])])
+    travel_times = matrix.get_matrix()
+    if travel_times is not None:
+        stats = travel_times.stats()
+        yield ("smartbee_matrix_rows_ready", "gauge", "Travel-time matrix rows current, by band.",
+               [({"band": band}, n) for band, n in stats["rows_ready"].items()])
+        yield ("smartbee_matrix_rows_computed_total", "counter", "Travel-time matrix rows computed.",
+               [({}, stats["rows_computed"])])
+    live = realtime.get_realtime()
+    if live is not None:
+        yield ("smartbee_realtime_version", "gauge", "GTFS-RT updates applied.", [({}, live.version)])
+        yield ("smartbee_realtime_feed_timestamp_seconds", "gauge", "Header timestamp of the last GTFS-RT feed.",
+               [({}, live.feed_timestamp)])
+    clients = upstream.upstreams()
+    if clients:
+        yield ("smartbee_upstream_requests_total", "counter", "Outbound upstream calls and attempts by outcome.",
+               [({"upstream": name, "event": event}, n)
+                for name, client in clients.items() for event, n in client.counters.items()])
+        yield ("smartbee_upstream_circuit_open", "gauge", "1 while an upstream's circuit breaker is not closed.",
+               [({"upstream": name}, int(client.breaker.state != "closed")) for name, client in clients.items()])
+
+
+get_metrics().collectors.append(collect_service_metrics)
+
 # ─── Routers ──────────────────────────────────────────────────────────────────
 app.include_router(arrivals.router, prefix="/api")
 app.include_router(routes.router, prefix="/api")
+app.include_router(stops.router, prefix="/api")
 app.include_router(heatmap.router, prefix="/api")
 app.include_router(road_closure.router, prefix="/api")
+app.include_router(admin.router)
 
 
 # ─── Health check ─────────────────────────────────────────────────────────────
@@ -50,9 +148,17 @@ async def root():
         "network": "Greater Manchester",
         "endpoints": [
             "GET  /api/arrivals?stop=piccadilly",
+            "GET  /api/arrivals/stream?stop=piccadilly  (SSE)",
+            "POST /api/arrivals/batch",
             "GET  /api/routes?origin=piccadilly&destination=chorlton",
-            "GET  /api/heatmap?metric=demand",
+            "GET  /api/routes?origin=piccadilly&destination=chorlton&detail=false",
+            "POST /api/routes/batch",
+            "GET  /api/stops/search?q=picc",
+            "GET  /api/heatmap?metric=demand&bbox=-2.30,53.44,-2.20,53.50&zoom=14",
             "POST /api/road-closure-impact",
+            "POST /api/road-closure-impact/batch",
+            "GET  /metrics  (Prometheus)",
+            "POST /admin/reload  (X-Admin-Token)",
         ],
     }
 
@@ -60,4 +166,21 @@ async def root():
 @app.get("/health", tags=["health"])
 async def health():
     # PRODUCTION: Add database ping, Redis ping, TfGM feed connectivity check
-    return {"status": "healthy", "mock_mode": True}
+    return {
+        "status": "healthy",
+        "mock_mode": timetable.get_timetable() is None,
+        "snapshot": snapshot.snapshot_info(),
+        "data_version": registry.current().version,
+        "cache": cache.get_response_cache().stats(),
+        "streams": arrivals.hub.stats(),
+        "matrix": matrix.get_matrix().stats() if matrix.get_matrix() is not None else None,
+        "upstreams": {name: client.stats() for name, client in upstream.upstreams().items()},
+        "requests_in_flight": get_metrics().in_flight,
+        "uptime_seconds": round(time.time() - get_metrics().started_at, 1),
+    }
+
+
+@app.get("/metrics", tags=["health"], response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of request, cache, stream and realtime metrics."""
+    return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4")
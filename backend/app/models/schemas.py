@@ -6,8 +6,8 @@ PRODUCTION: Extend with database ORM models (SQLAlchemy), add validation,
             and connect to TfGM real-time data feeds.
 """
 
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Optional, List, Union
 
 
 # ─── Arrivals ────────────────────────────────────────────────────────────────
@@ -28,6 +28,30 @@ class ArrivalsResponse(BaseModel):
     arrivals: List[ArrivalItem]
 
 
+class ArrivalsBatchRequest(BaseModel):
+    stops: List[str] = Field(min_length=1, max_length=100)
+    limit: int = Field(default=10, ge=1, le=50)
+
+
+class ArrivalsBatchResponse(BaseModel):
+    results: List[ArrivalsResponse]   # same order as the requested stops
+
+
+# ─── Stops ───────────────────────────────────────────────────────────────────
+
+class StopSuggestion(BaseModel):
+    name: str
+    stop_ids: List[str]             # GTFS stops sharing the name (empty in mock mode)
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    score: float                    # 1 exact, 0.9 name prefix, 0.8 word prefix, lower = fuzzy
+
+
+class StopSearchResponse(BaseModel):
+    query: str
+    results: List[StopSuggestion]   # best match first
+
+
 # ─── Routes ──────────────────────────────────────────────────────────────────
 
 class RouteOption(BaseModel):
@@ -48,6 +72,32 @@ class RoutesResponse(BaseModel):
     options: List[RouteOption]
 
 
+class TravelTimeResponse(BaseModel):
+    """Duration and changes only (`detail=false`), for a departure at the band's reference time."""
+    origin: str
+    destination: str
+    departure_time: str
+    band: str                          # "early" | "am_peak" | "interpeak" | "pm_peak" | "evening"
+    duration_minutes: Optional[int]    # None = no journey found
+    changes: Optional[int]
+    source: str                        # "matrix" | "planner" | "mock"
+
+
+class RoutePair(BaseModel):
+    origin: str
+    destination: str
+
+
+class RoutesBatchRequest(BaseModel):
+    pairs: List[RoutePair] = Field(min_length=1, max_length=100)
+    max_transfers: int = Field(default=3, ge=0, le=5)
+    detail: bool = True
+
+
+class RoutesBatchResponse(BaseModel):
+    results: List[Union[RoutesResponse, TravelTimeResponse]]     # same order as the requested pairs
+
+
 # ─── Heatmap ─────────────────────────────────────────────────────────────────
 
 class HeatmapPoint(BaseModel):
@@ -67,7 +117,8 @@ class HeatmapResponse(BaseModel):
 
 class RoadClosureRequest(BaseModel):
     road_id: str       # e.g. "oxford_road"
-    duration_hours: int = 4
+    duration_hours: float = Field(default=4, ge=0, le=24 * 31)
+    start_hour: Optional[float] = Field(default=None, ge=0, lt=24)   # hour of day; None = now
 
 
 class AffectedRoute(BaseModel):
@@ -83,3 +134,11 @@ class ClosureImpactResponse(BaseModel):
     affected_routes: List[AffectedRoute]
     estimated_passengers_affected: int
     recommended_action: str
+
+
+class ClosureBatchRequest(BaseModel):
+    scenarios: List[RoadClosureRequest] = Field(min_length=1, max_length=1000)
+
+
+class ClosureBatchResponse(BaseModel):
+    results: List[ClosureImpactResponse]   # same order as the requested scenarios
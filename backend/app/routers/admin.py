@@ -0,0 +1,159 @@
+"""
+Admin Router — /admin (profiling, road closures, dataset reload)
+
+Every endpoint requires the `X-Admin-Token` header to match SMARTBEE_ADMIN_TOKEN
+and answers 404 when no token is configured.
+
+HACKATHON: Shared-secret header.
+PRODUCTION: Serve on an internal port only, behind SSO.
+"""
+
+import asyncio
+import hmac
+import time
+from typing import List, Mapping, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from app import config
+from app.models.schemas import AffectedRoute
+from app.services import registry, road_graph, snapshot
+from app.services.matrix import get_matrix
+from app.services.planner import Disruption, closure_disruption, get_planner
+from app.services.profiler import get_profiler
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    if config.ADMIN_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def capture_profile(seconds: float = Query(default=5.0, gt=0, le=60, description="Capture length")):
+    """Sample every thread for `seconds` and return collapsed stacks (feed to flamegraph.pl / speedscope)."""
+    profiler = get_profiler()
+    profiler.acquire()
+    start = time.perf_counter()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.release()
+    return profiler.record("*", "*", start, time.perf_counter()).collapsed()
+
+
+@router.post("/profiler")
+async def arm_profiler(
+    slow_ms: float = Query(default=250.0, gt=0, description="Profile requests slower than this"),
+):
+    """Keep the sampler running and store a profile for every request slower than `slow_ms`."""
+    get_profiler().arm(slow_ms)
+    return {"armed": True, "slow_ms": slow_ms}
+
+
+@router.delete("/profiler")
+async def disarm_profiler():
+    get_profiler().disarm()
+    return {"armed": False}
+
+
+@router.get("/profiles")
+async def list_profiles():
+    profiler = get_profiler()
+    return {
+        "armed": profiler.slow_ms is not None,
+        "slow_ms": profiler.slow_ms,
+        "profiles": [p.summary() for p in reversed(profiler.profiles.values())],
+    }
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: int):
+    profile = get_profiler().profiles.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    return profile.collapsed()
+
+
+# ─── Road closures ────────────────────────────────────────────────────────────
+# Unlike POST /api/road-closure-impact (a what-if), these change journey planning
+# and refresh the travel-time matrix rows the closure can affect.
+
+# Closures and reloads both rebuild the disruption: one at a time
+_changing = asyncio.Lock()
+
+
+def require_own_datasets() -> None:
+    """409 in an app.serve worker: a change here would reach this worker only."""
+    if config.SHARED_DATA_PATH is not None:
+        raise HTTPException(status_code=409, detail="Workers of app.serve share their supervisor's datasets")
+
+
+def closures_disruption(closed: Mapping[str, List[AffectedRoute]]) -> Optional[Disruption]:
+    """Disruption of the `closed` roads on the current network (None without one)."""
+    network = get_planner()
+    if network is None:
+        return None
+    return closure_disruption(network, [route for impact in closed.values() for route in impact])
+
+
+async def publish_closures(closed: Mapping[str, List[AffectedRoute]]) -> None:
+    """Publish `closed` with its disruption in one snapshot, then refresh the matrix."""
+    disruption = await asyncio.to_thread(closures_disruption, closed)
+    if disruption is None:
+        registry.publish(closures=closed)
+        return
+    registry.publish(closures=closed, disruption=disruption)
+    matrix = get_matrix()
+    if matrix is not None:
+        matrix.set_disruption(disruption)
+
+
+@router.get("/closures")
+async def list_closures():
+    return {"closures": dict(road_graph.closed_roads())}
+
+
+@router.put("/closures/{road_id}", dependencies=[Depends(require_own_datasets)])
+async def close_road(road_id: str):
+    # Against the latest datasets, not the ones this request pinned
+    async with _changing:
+        with registry.pinned():
+            graph = road_graph.get_road_graph()
+            if graph is None or not graph.has_road(road_id):
+                raise HTTPException(status_code=404, detail=f"Road {road_id} not found")
+            # Detour searches on the road graph: off the event loop
+            closed = await asyncio.to_thread(road_graph.with_road_closed, road_id)
+            await publish_closures(closed)
+    return {"road_id": road_id, "affected_routes": closed[road_id]}
+
+
+@router.delete("/closures/{road_id}", dependencies=[Depends(require_own_datasets)])
+async def reopen_road(road_id: str):
+    async with _changing:
+        with registry.pinned():
+            closed = road_graph.with_road_reopened(road_id)
+            if closed is None:
+                raise HTTPException(status_code=404, detail=f"Road {road_id} is not closed")
+            await publish_closures(closed)
+    return {"road_id": road_id, "closed": False}
+
+
+# ─── Dataset reload ───────────────────────────────────────────────────────────
+
+@router.post("/reload", dependencies=[Depends(require_own_datasets)])
+async def reload_datasets(
+    processes: bool = Query(default=False, description="Load in a separate process instead of a thread"),
+):
+    """Reload every dataset from its source and swap it in; requests in flight finish on the old one."""
+    if _changing.locked():
+        raise HTTPException(status_code=409, detail="A reload or closure change is already in progress")
+    async with _changing:
+        start = time.perf_counter()
+        published = await snapshot.reload_datasets(processes)
+    return {"version": published.version, "seconds": round(time.perf_counter() - start, 2)}
@@ -3,17 +3,27 @@ Arrivals Router — /api/arrivals
 
 HACKATHON: Returns mocked bus arrival data for Manchester stops.
 PRODUCTION: Connect to TfGM real-time SIRI feed or Traveline National Dataset (TNDS).
-            Use websockets or SSE for push updates every 30s.
+            Push updates over SSE via /api/arrivals/stream (app.services.hub).
 """
 
 from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
 from datetime import datetime
+import time
 
-from app.models.schemas import ArrivalsResponse, ArrivalItem
+from app import config
+from app.models.schemas import ArrivalsBatchRequest, ArrivalsBatchResponse, ArrivalsResponse, ArrivalItem
+from app.services.conditional import keyed_delta
+from app.services.hub import ArrivalsHub, item_keys
+from app.services.realtime import get_realtime
+from app.services.timetable import data_version as timetable_version, get_timetable
+from app.services.cache import cached, cached_batch
+from app.services.serialization import clock_time
+from app.routers.stops import resolve_stop
 
 router = APIRouter(prefix="/arrivals", tags=["arrivals"])
 
-# HACKATHON MOCK: Static arrival data keyed by stop name.
+# HACKATHON MOCK: Static arrival data keyed by stop (see app.routers.stops.MOCK_STOPS).
 # PRODUCTION: Replace with live TfGM GTFS-RT feed parser.
 MOCK_ARRIVALS = {
     "piccadilly": [
@@ -46,24 +56,116 @@ MOCK_ARRIVALS = {
         ArrivalItem(route="43", destination="Piccadilly", due_minutes=8, status="late", delay_minutes=20, stop_name="Manchester Airport", platform="T1"),
         ArrivalItem(route="199", destination="Wythenshawe", due_minutes=3, status="ontime", stop_name="Manchester Airport", platform="T2"),
     ],
+    "northern_quarter": [
+        ArrivalItem(route="8", destination="Piccadilly", due_minutes=2, status="ontime", stop_name="Northern Quarter", platform="A"),
+        ArrivalItem(route="9", destination="Deansgate", due_minutes=6, status="ontime", stop_name="Northern Quarter", platform="B"),
+        ArrivalItem(route="216", destination="Ancoats", due_minutes=10, status="late", delay_minutes=4, stop_name="Northern Quarter", platform="A"),
+    ],
+    "ancoats": [
+        ArrivalItem(route="53", destination="Piccadilly", due_minutes=5, status="late", delay_minutes=4, stop_name="Ancoats", platform="A"),
+        ArrivalItem(route="216", destination="Northern Quarter", due_minutes=8, status="ontime", stop_name="Ancoats", platform="B"),
+    ],
 }
 
 
+def build_arrivals(stop: str, limit: int = 10) -> ArrivalsResponse:
+    """Build the arrivals board for one stop (shared by GET, stream and batch paths); 404 if unknown."""
+    now = datetime.now()
+    match = resolve_stop(stop)
+    timetable = get_timetable()
+    if timetable is not None and match.stops:
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        live = get_realtime()
+        if live is not None:
+            arrivals = timetable.arrival_board(match.stops, seconds, limit, live.trip_delay, live.trip_cancelled)
+        else:
+            arrivals = timetable.arrival_board(match.stops, seconds, limit)
+    else:
+        arrivals = MOCK_ARRIVALS.get(match.key, [])[:limit]
+
+    return ArrivalsResponse(
+        stop=match.name,
+        last_updated=now.strftime("%H:%M:%S"),
+        arrivals=arrivals,
+    )
+
+
+def arrivals_version():
+    """Cache version for boards: timetable load, realtime feed version and the current minute."""
+    live = get_realtime()
+    return timetable_version(), live.version if live is not None else 0, int(time.time() // 60)
+
+
+# Encoded once per data version, `last_updated` being when that version was built. Kept a
+# few minutes (versioned keys never go stale) so `since=` deltas can find older boards.
+ARRIVALS_CACHE = dict(ttl=300, version=arrivals_version, timestamp=("last_updated", clock_time))
+
+# `since=` deltas carry changed rows keyed as in the SSE stream's `update` events.
+arrivals_delta = keyed_delta("arrivals", lambda rows: item_keys([ArrivalItem(**row) for row in rows]))
+
+# One producer per watched stop, broadcasting to every SSE subscriber.
+hub = ArrivalsHub(build_arrivals, interval=config.ARRIVALS_STREAM_SECONDS)
+
+
 @router.get("", response_model=ArrivalsResponse)
+@cached("arrivals", **ARRIVALS_CACHE, delta=arrivals_delta, max_age=15)
 async def get_arrivals(
-    stop: str = Query(default="piccadilly", description="Stop name (e.g. piccadilly, deansgate, chorlton)"),
+    stop: str = Query(default="piccadilly", description="Stop name, stop_id or alias; close misspellings resolve"),
+    limit: int = Query(default=10, ge=1, le=50, description="Maximum number of departures"),
 ):
     """
     Get live arrival predictions for a Manchester bus stop.
 
-    HACKATHON: Returns pre-seeded mock data.
+    The stop is resolved by app.routers.stops.resolve_stop; unknown stops are a
+    404 (with suggestions) rather than another stop's board.
+
+    Responses carry an ETag (304 on `If-None-Match`); pollers pass it back as
+    `since` to receive only the changed and removed rows (app.services.conditional).
+
+    HACKATHON: Returns pre-seeded mock data unless a GTFS feed is loaded, in which
+               case the next departures come from the in-memory timetable index,
+               adjusted by GTFS-RT delays when a realtime feed is configured.
     PRODUCTION: Query TfGM SIRI-SM endpoint, parse XML, cache with Redis (TTL 30s).
     """
-    stop_key = stop.lower().replace(" ", "_")
-    arrivals = MOCK_ARRIVALS.get(stop_key, MOCK_ARRIVALS["piccadilly"])
+    return build_arrivals(stop, limit)
 
-    return ArrivalsResponse(
-        stop=stop.title(),
-        last_updated=datetime.now().strftime("%H:%M:%S"),
-        arrivals=arrivals,
+
+@router.post("/batch", response_model=ArrivalsBatchResponse)
+async def get_arrivals_batch(body: ArrivalsBatchRequest):
+    """
+    Arrivals boards for many stops in one round trip (station displays, dashboards).
+
+    Repeated stops are computed once, distinct stops concurrently, and results
+    share the cache with GET /api/arrivals. Any unknown stop fails the batch with 404.
+    """
+    return await cached_batch(
+        "arrivals", [{"stop": stop, "limit": body.limit} for stop in body.stops], build_arrivals,
+        **ARRIVALS_CACHE,
+    )
+
+
+@router.get("/stream")
+async def stream_arrivals(
+    stop: str = Query(default="piccadilly", description="Stop name, stop_id or alias; close misspellings resolve"),
+):
+    """
+    Server-Sent Events stream of a stop's arrivals board.
+
+    Sends a full `snapshot` event on connect, then `update` events carrying only
+    the changed and removed `ArrivalItem`s. All subscribers of a stop share one
+    board computation and one encoded message per tick.
+    """
+    subscription = hub.subscribe(resolve_stop(stop).key)
+
+    async def events():
+        try:
+            async for message in subscription:
+                yield message
+        finally:
+            subscription.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
@@ -9,10 +9,17 @@ PRODUCTION: Aggregate from:
   Serve via PostGIS spatial queries, cache with Redis.
 """
 
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query
 from datetime import datetime
+from typing import Optional
 
+from app import config
 from app.models.schemas import HeatmapResponse, HeatmapPoint
+from app.services import history, tiles
+from app.services.tiles import MAX_ZOOM, TileGrid, get_grid, parse_bbox
+from app.services.cache import cached
+from app.services.conditional import keyed_delta
+from app.services.serialization import iso_time
 
 router = APIRouter(prefix="/heatmap", tags=["heatmap"])
 
@@ -56,23 +63,72 @@ DELAY_POINTS = [
     HeatmapPoint(lat=53.4715, lng=-2.2992, intensity=0.30, label="Salford Quays: avg +3 min"),
 ]
 
+CROWDING_POINTS = [
+    HeatmapPoint(lat=53.4779, lng=-2.2323, intensity=0.92, label="Piccadilly: 92% full"),
+    HeatmapPoint(lat=53.4710, lng=-2.2370, intensity=0.97, label="Oxford Rd: 97% full"),
+    HeatmapPoint(lat=53.4424, lng=-2.2175, intensity=0.88, label="Fallowfield: 88% full"),
+    HeatmapPoint(lat=53.4786, lng=-2.2491, intensity=0.64, label="Deansgate: 64% full"),
+    HeatmapPoint(lat=53.4450, lng=-2.2753, intensity=0.45, label="Chorlton: 45% full"),
+    HeatmapPoint(lat=53.4715, lng=-2.2992, intensity=0.38, label="Salford Quays: 38% full"),
+    HeatmapPoint(lat=53.3658, lng=-2.2723, intensity=0.52, label="Airport: 52% full"),
+]
+
+# Tile grids over the mock points, used when no events file or history is loaded.
+MOCK_GRIDS = {
+    "demand": TileGrid.from_points(DEMAND_POINTS),
+    "delay": TileGrid.from_points(DELAY_POINTS),
+    "crowding": TileGrid.from_points(CROWDING_POINTS),
+}
+
+
+# `since=` deltas: cells are matched by position
+heatmap_delta = keyed_delta("points", lambda rows: [f"{row['lat']},{row['lng']}" for row in rows])
+
+
+def heatmap_version():
+    return tiles.data_version(), history.data_version()
+
+
+def metric_grid(metric: str) -> TileGrid:
+    """Grid for `metric`: live history window, then the events file, then mock points."""
+    store = history.get_history()
+    if store is not None and metric in ("delay", "crowding"):
+        grid = store.heat_grid(metric, datetime.now(), config.HISTORY_WINDOW_MINUTES, config.HISTORY_DAYS)
+        if grid is not None:
+            return grid
+    return get_grid(metric) or MOCK_GRIDS[metric]
+
 
 @router.get("", response_model=HeatmapResponse)
+@cached("heatmap", ttl=3600, version=heatmap_version, timestamp=("timestamp", iso_time),
+        delta=heatmap_delta, max_age=60)
 async def get_heatmap(
     metric: str = Query(default="demand", description="Metric type: 'demand' | 'delay' | 'crowding'"),
+    bbox: Optional[str] = Query(default=None, description="Viewport as min_lng,min_lat,max_lng,max_lat"),
+    zoom: int = Query(default=MAX_ZOOM, ge=0, le=22, description="Map zoom level (cells are slippy-map tiles)"),
 ):
     """
     Get heatmap intensity points for Manchester network visualisation.
 
-    HACKATHON: Returns static mock point cloud.
-    PRODUCTION: Query PostGIS for last-15-min aggregated stop events.
+    Large responses are brotli/gzip compressed once per version; `since=<ETag>`
+    returns only the cells that changed.
+
+    HACKATHON: Returns pre-aggregated tiles over the static mock point cloud, or
+               over the raw events file when one is loaded. With a stop event
+               history, delay and crowding are the mean delay / load factor per
+               stop over the last 15 minutes of the day, across the last 30 days.
+    PRODUCTION: Rebuild the tile grids from last-15-min aggregated stop events.
                 Support metric=demand (tap-on counts), metric=delay (SIRI variance),
                 metric=crowding (vehicle load factor from APC sensors).
     """
-    points = DELAY_POINTS if metric == "delay" else DEMAND_POINTS
+    try:
+        viewport = parse_bbox(bbox) if bbox else None
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+    if metric not in MOCK_GRIDS:
+        raise HTTPException(status_code=422, detail=f"Unknown metric '{metric}'; expected {', '.join(MOCK_GRIDS)}")
+    grid = metric_grid(metric)
 
-    return HeatmapResponse(
-        timestamp=datetime.now().isoformat(),
-        metric=metric,
-        points=points,
-    )
+    # Plain rows straight to the encoder; `timestamp` (when this version was built) is set by @cached.
+    return {"timestamp": None, "metric": metric, "points": grid.cell_rows(zoom, viewport)}
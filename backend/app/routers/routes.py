@@ -2,19 +2,33 @@
 Routes Router — /api/routes
 
 HACKATHON: Returns mocked journey options between Manchester locations.
-PRODUCTION: Integrate with OpenTripPlanner (OTP) running on GTFS data from TfGM,
-            or Traveline Journey Planner API. Add real-time delay adjustments via SIRI.
+PRODUCTION: Plans in-process with RAPTOR on the TfGM GTFS timetable
+            (app.services.planner). Add real-time delay adjustments via SIRI.
+
+`detail=false` answers with duration and changes only, read from the
+precomputed travel-time matrix (app.services.matrix) when its row is ready.
 """
 
 from fastapi import APIRouter, Query
 from datetime import datetime
+from typing import Union
+import asyncio
+import math
+import time
 
-from app.models.schemas import RoutesResponse, RouteOption
+from app.models.schemas import (
+    RoutesBatchRequest, RoutesBatchResponse, RoutesResponse, RouteOption, TravelTimeResponse,
+)
+from app.services.matrix import band_at, get_matrix
+from app.services.planner import disruption_version, get_disruption, get_planner
+from app.services.timetable import data_version as timetable_version
+from app.services.cache import cached, cached_batch
+from app.routers.stops import resolve_stop
 
 router = APIRouter(prefix="/routes", tags=["routes"])
 
 # HACKATHON MOCK: Hand-crafted route options for the key demo journey.
-# PRODUCTION: Call OTP REST API: GET /otp/routers/default/plan?fromPlace=...&toPlace=...
+# Used only when no GTFS feed is loaded (see app.services.planner).
 MOCK_ROUTES = {
     ("piccadilly", "chorlton"): [
         RouteOption(
@@ -97,24 +111,105 @@ DEFAULT_ROUTES = [
 ]
 
 
-@router.get("", response_model=RoutesResponse)
+def build_routes(origin: str, destination: str, max_transfers: int = 3,
+                 detail: bool = True) -> Union[RoutesResponse, TravelTimeResponse]:
+    """Plan one origin–destination pair (shared by the GET and batch endpoints); 404 if a stop is unknown."""
+    if not detail:
+        return build_travel_time(origin, destination, max_transfers)
+    now = datetime.now()
+    origin_stop, destination_stop = resolve_stop(origin), resolve_stop(destination)
+    planner = get_planner()
+    if planner is not None and origin_stop.stops and destination_stop.stops:
+        seconds = now.hour * 3600 + now.minute * 60 + now.second
+        options = planner.plan(origin_stop.stops, destination_stop.stops, seconds, max_transfers, get_disruption())
+    else:
+        options = MOCK_ROUTES.get((origin_stop.key, destination_stop.key), DEFAULT_ROUTES)
+
+    return RoutesResponse(
+        origin=origin_stop.name,
+        destination=destination_stop.name,
+        departure_time=now.strftime("%H:%M"),
+        options=options,
+    )
+
+
+def build_travel_time(origin: str, destination: str, max_transfers: int = 3) -> TravelTimeResponse:
+    """Fastest journey leaving at the current band's reference time: a matrix cell, else one search."""
+    now = datetime.now()
+    seconds = now.hour * 3600 + now.minute * 60 + now.second
+    band = band_at(seconds)
+    origin_stop, destination_stop = resolve_stop(origin), resolve_stop(destination)
+    planner = get_planner()
+    if planner is not None and origin_stop.stops and destination_stop.stops:
+        origins, targets = origin_stop.stops, destination_stop.stops
+        matrix = get_matrix()
+        hit = matrix.lookup(origins, targets, seconds, max_transfers) if matrix is not None else None
+        if hit is not None:
+            minutes, changes, source = hit.minutes, hit.changes, "matrix"
+        else:
+            journeys = planner.search(origins, targets, band.depart, max_transfers, get_disruption())
+            fastest = min(journeys, key=lambda j: (j.arrive, len(j.rides)), default=None)
+            minutes = math.ceil((fastest.arrive - band.depart) / 60) if fastest else None
+            changes = len(fastest.rides) - 1 if fastest else None
+            source = "planner"
+    else:
+        fastest = MOCK_ROUTES.get((origin_stop.key, destination_stop.key), DEFAULT_ROUTES)[0]
+        minutes, changes, source = fastest.duration_minutes, fastest.changes, "mock"
+
+    return TravelTimeResponse(
+        origin=origin_stop.name,
+        destination=destination_stop.name,
+        departure_time=f"{band.depart // 3600 % 24:02d}:{band.depart // 60 % 60:02d}",
+        band=band.name,
+        duration_minutes=minutes,
+        changes=changes,
+        source=source,
+    )
+
+
+def routes_version():
+    """Cache version for journeys: timetable load, active closures and the departure minute."""
+    return timetable_version(), disruption_version(), int(time.time() // 60)
+
+
+@router.get("", response_model=Union[RoutesResponse, TravelTimeResponse])
+@cached("routes", version=routes_version)
 async def get_routes(
-    origin: str = Query(default="piccadilly", description="Origin stop"),
-    destination: str = Query(default="chorlton", description="Destination stop"),
+    origin: str = Query(default="piccadilly", description="Origin stop name, stop_id or alias"),
+    destination: str = Query(default="chorlton", description="Destination stop name, stop_id or alias"),
+    max_transfers: int = Query(default=3, ge=0, le=5, description="Maximum number of changes"),
+    detail: bool = Query(default=True, description="False: duration and changes only (travel-time matrix)"),
 ):
     """
     Plan a journey between two Manchester stops.
 
-    HACKATHON: Returns 3 mock options (fastest, cheapest, orbital).
-    PRODUCTION: POST to OTP with GTFS feed + live SIRI delay overlay.
+    HACKATHON: Returns 3 mock options (fastest, cheapest, orbital) unless a GTFS
+               feed is loaded, in which case one in-process RAPTOR search over the
+               timetable produces them.
+    PRODUCTION: Add live SIRI delay overlay to the timetable used by the planner.
                 Apply SmartBee orbital scoring model (custom ML).
+
+    With `detail=false` the answer is the fastest journey's duration and changes
+    when leaving at the current band's reference time, served from the
+    precomputed travel-time matrix (full planning while its row is being filled).
     """
-    key = (origin.lower(), destination.lower())
-    options = MOCK_ROUTES.get(key, DEFAULT_ROUTES)
+    # RAPTOR is pure Python: search in a worker thread, not on the event loop
+    return await asyncio.to_thread(build_routes, origin, destination, max_transfers, detail)
 
-    return RoutesResponse(
-        origin=origin.title(),
-        destination=destination.title(),
-        departure_time=datetime.now().strftime("%H:%M"),
-        options=options,
+
+@router.post("/batch", response_model=RoutesBatchResponse)
+async def get_routes_batch(body: RoutesBatchRequest):
+    """
+    Plan many origin–destination pairs in one round trip.
+
+    Repeated pairs are planned once, distinct pairs concurrently, and results
+    share the cache with GET /api/routes.
+    """
+    return await cached_batch(
+        "routes",
+        [{"origin": p.origin, "destination": p.destination, "max_transfers": body.max_transfers,
+          "detail": body.detail}
+         for p in body.pairs],
+        build_routes,
+        version=routes_version,
     )
@@ -0,0 +1,77 @@
+"""
+Stops Router — /api/stops
+
+Autocomplete over every stop name, and the shared resolver the arrivals and
+routes routers use to turn free-text stop names into timetable stops.
+
+HACKATHON: Without a GTFS feed, only the demo stops the mock data covers resolve.
+PRODUCTION: Rank suggestions by the user's position and recent journeys too.
+"""
+
+from typing import Optional
+
+import numpy as np
+from fastapi import APIRouter, HTTPException, Query
+
+from app.models.schemas import StopSearchResponse, StopSuggestion
+from app.services.stop_resolver import StopMatch, StopResolver, get_resolver
+from app.services.timetable import get_timetable
+
+router = APIRouter(prefix="/stops", tags=["stops"])
+
+# HACKATHON MOCK: the demo stops, keyed the way MOCK_ARRIVALS and MOCK_ROUTES are.
+MOCK_STOPS = {
+    "piccadilly": "Piccadilly Gardens",
+    "deansgate": "Deansgate",
+    "chorlton": "Chorlton",
+    "fallowfield": "Fallowfield",
+    "salford_quays": "Salford Quays",
+    "airport": "Manchester Airport",
+    "northern_quarter": "Northern Quarter",
+    "ancoats": "Ancoats",
+}
+MOCK_RESOLVER = StopResolver([(key, name, []) for key, name in MOCK_STOPS.items()], MOCK_STOPS)
+
+
+def stop_resolver() -> StopResolver:
+    """The resolver over the loaded timetable, else over the mock stops."""
+    resolver = get_resolver()
+    return resolver if resolver is not None else MOCK_RESOLVER
+
+
+def resolve_stop(name: str) -> StopMatch:
+    """Resolve a stop name, stop_id or alias (misspellings included); 404 if nothing is close."""
+    resolver = stop_resolver()
+    match = resolver.resolve(name)
+    if match is None:
+        suggestions = [m.name for m in resolver.search(name, 3)]
+        hint = f"; did you mean {', '.join(suggestions)}?" if suggestions else ""
+        raise HTTPException(status_code=404, detail=f"Unknown stop '{name}'{hint}")
+    return match
+
+
+@router.get("/search", response_model=StopSearchResponse)
+async def search_stops(
+    q: str = Query(min_length=1, max_length=100, description="Partial or misspelt stop name"),
+    limit: int = Query(default=10, ge=1, le=50, description="Maximum number of suggestions"),
+):
+    """
+    Ranked stop suggestions for a search box, one request per keystroke.
+
+    Exact names and aliases first, then names starting with the query, then
+    names with a word starting with each query word, then close misspellings.
+    Not response-cached: a lookup costs less than a cache round trip.
+    """
+    timetable = get_timetable()
+    results = []
+    for match in stop_resolver().search(q, limit):
+        lat: Optional[float] = None
+        lng: Optional[float] = None
+        stop_ids = []
+        if timetable is not None and match.stops:
+            stop_ids = [timetable.stop_ids[s] for s in match.stops]
+            lat = round(float(np.mean(timetable.stop_lat[match.stops])), 6)
+            lng = round(float(np.mean(timetable.stop_lon[match.stops])), 6)
+        results.append(StopSuggestion(name=match.name, stop_ids=stop_ids, lat=lat, lng=lng,
+                                      score=round(match.score, 3)))
+    return StopSearchResponse(query=q, results=results)
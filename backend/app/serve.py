@@ -0,0 +1,101 @@
+"""
+Multi-process serving — every core, one copy of the datasets.
+
+    python -m app.serve --workers 4 --port 8000
+
+The supervisor (this process) loads the static datasets once — GTFS timetable,
+RAPTOR network, stop resolver, road graph and heatmap tiles — and publishes
+them to one file on tmpfs (app.services.shared), or opens the prebuilt
+snapshot when SMARTBEE_SNAPSHOT_PATH is set (app.services.snapshot). Uvicorn
+then starts the workers, whose lifespan attaches that file read-only instead
+of loading: arrays are mmap'd, so N workers share one copy of the pages and
+start in a fraction of the load time.
+
+The supervisor also owns the travel-time matrix: it fills rows on a
+background thread and checkpoints them, and workers read the same files
+(app.services.matrix).
+
+HACKATHON: Runtime state stays per worker — the in-process response cache
+           (set SMARTBEE_REDIS_URL to share it), SSE streams and GTFS-RT
+           polling. Road closures and reloads through /admin would only reach
+           the worker that received them, so workers refuse them (409).
+PRODUCTION: Broadcast closures to every worker (Redis pub/sub) and run the
+            realtime poller once, in the supervisor.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable
+
+import uvicorn
+
+from app import config
+from app.services import matrix, shared, snapshot
+
+logger = logging.getLogger("app.serve")
+
+
+def start_matrix_thread(travel_times: matrix.TravelTimeMatrix) -> Callable[[], None]:
+    """Fill the matrix on its own event loop in a thread; returns a function that stops it."""
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(travel_times.run(), name="travel-time-matrix")
+
+    def run():
+        with contextlib.suppress(asyncio.CancelledError):
+            loop.run_until_complete(task)
+        loop.close()
+
+    thread = threading.Thread(target=run, name="travel-time-matrix", daemon=True)
+    thread.start()
+
+    def stop():
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join()
+        travel_times.checkpoint()
+
+    return stop
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m app.serve", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.WORKERS)
+    parser.add_argument("--data-dir", default=config.SHARED_DATA_DIR or (
+        "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()))
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    start = time.perf_counter()
+    if config.SNAPSHOT_PATH:
+        # Workers attach the snapshot itself (already checked here)
+        path, temporary = config.SNAPSHOT_PATH, False
+        datasets = snapshot.open_snapshot(path)
+    else:
+        path, temporary = os.path.join(args.data_dir, f"smartbee-{os.getpid()}.datasets"), True
+        shared.publish(snapshot.load_datasets(), path)
+        # Keep only the published copy here too: the loaded objects are garbage from now on
+        datasets = shared.attach(path)
+    logger.info("Datasets in %s ready in %.1fs", path, time.perf_counter() - start)
+
+    # Workers inherit the environment; an in-process single worker reads config directly
+    os.environ["SMARTBEE_SHARED_DATA_PATH"] = config.SHARED_DATA_PATH = path
+    travel_times = matrix.init_matrix(datasets["network"])
+    stop_matrix = start_matrix_thread(travel_times) if travel_times is not None else None
+    try:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        if stop_matrix is not None:
+            stop_matrix()
+        if temporary:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,373 @@
+"""
+Response Cache — shared TTL cache for router responses.
+
+Two interchangeable backends store encoded JSON bodies:
+
+  - LRUCache:   bounded in-process LRU with per-entry TTL (the default)
+  - RedisCache: any client with redis.asyncio's `get` / `set(..., px=)` API, so
+                a local fake can stand in for a real server in tests
+
+Routers opt in with the `@cached(namespace, ttl)` decorator, which keys on the
+endpoint's normalised parameters, returns the stored bytes directly (skipping
+response-model validation and re-encoding) and coalesces concurrent misses for
+the same key into one computation (single-flight).
+
+Endpoints backed by a dataset pass `version=` (a callable returning the current
+data version), which becomes part of the key: a data change is a new key, so
+bodies are encoded once per version and never served stale. `timestamp=`
+(field, formatter) sets that field to the time the version was first built.
+
+`@cached` responses also carry an ETag (the body's digest), answer a
+matching `If-None-Match` with 304, serve `since=` deltas and compress large
+bodies (app.services.conditional). Compressed copies and deltas are cached
+under the digest of the body they derive from, and aren't counted as lookups.
+
+HACKATHON: In-process LRU unless SMARTBEE_REDIS_URL is set.
+PRODUCTION: Point all workers at one Redis so they share hits.
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Protocol, Tuple
+
+from fastapi import Query, Request, Response
+from pydantic import BaseModel
+
+from app import config
+from app.services import conditional
+from app.services.conditional import Delta
+from app.services.serialization import TimestampFormat, dumps, loads, with_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(Protocol):
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+
+class LRUCache:
+    """Bounded in-process LRU; expired entries are dropped lazily on read."""
+
+    def __init__(self, max_entries: int = 10_000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class RedisCache:
+    """Redis-backed cache; `client` is a `redis.asyncio.Redis` or a compatible fake."""
+
+    def __init__(self, client: Any, prefix: str = "smartbee:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisCache":
+        try:
+            import redis.asyncio as redis
+        except ImportError as exc:
+            raise RuntimeError("SMARTBEE_REDIS_URL is set but the 'redis' package is not installed") from exc
+        return cls(redis.from_url(url))
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(self.prefix + key, value, px=max(1, int(ttl * 1000)))
+
+
+class _LeaderCancelled(Exception):
+    """Raised to single-flight followers when the request computing their key is cancelled."""
+
+
+class ResponseCache:
+    """Cache front-end: hit/miss counters, backend error isolation and single-flight."""
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+    async def get_or_compute(self, key: str, ttl: float, compute: Callable[[], Awaitable[bytes]],
+                             counted: bool = True) -> Tuple[bytes, str]:
+        """Return (body, "HIT" | "COALESCED" | "MISS"), computing at most once per key at a time.
+
+        With `counted` False (entries derived from a response body) the lookup
+        stays out of the hit and miss counters.
+        """
+        while True:
+            try:
+                cached_body = await self.backend.get(key)
+            except Exception:
+                logger.warning("cache get failed for %s", key, exc_info=True)
+                self.errors += 1
+                cached_body = None
+            if cached_body is not None:
+                if counted:
+                    self.hits += 1
+                return cached_body, "HIT"
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                body = await asyncio.shield(inflight)
+            except _LeaderCancelled:
+                # The computing request went away, not this one: look again, and take over if need be
+                continue
+            if counted:
+                self.coalesced += 1
+            return body, "COALESCED"
+
+        if counted:
+            self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            body = await compute()
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        except BaseException:
+            future.set_exception(_LeaderCancelled())
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        future.set_result(body)
+        await self.store(key, body, ttl)
+        return body, "MISS"
+
+    async def store(self, key: str, body: bytes, ttl: float) -> None:
+        """Store `body` under `key` without counting a lookup; failures are logged, not raised."""
+        try:
+            await self.backend.set(key, body, ttl)
+        except Exception:
+            logger.warning("cache set failed for %s", key, exc_info=True)
+            self.errors += 1
+
+    async def peek(self, key: str) -> Optional[bytes]:
+        """The body stored under `key`, if any; never computes (and isn't counted as a lookup)."""
+        try:
+            return await self.backend.get(key)
+        except Exception:
+            logger.warning("cache get failed for %s", key, exc_info=True)
+            self.errors += 1
+            return None
+
+
+# ─── Decorator ────────────────────────────────────────────────────────────────
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return _normalize(value.model_dump())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    if isinstance(value, str):
+        return value.strip().lower()
+    return value
+
+
+def make_key(namespace: str, params: Dict[str, Any]) -> str:
+    """Stable cache key for an endpoint call: case/whitespace-insensitive, order-independent."""
+    canonical = json.dumps(_normalize(params), sort_keys=True, default=str, separators=(",", ":"))
+    return f"{namespace}:{hashlib.sha1(canonical.encode()).hexdigest()}"
+
+
+def encode(result: Any) -> bytes:
+    return dumps(result)
+
+
+Version = Optional[Callable[[], Hashable]]
+Timestamp = Optional[Tuple[str, TimestampFormat]]
+
+
+def cache_key(namespace: str, params: Dict[str, Any], version: Version = None) -> str:
+    if version is not None:
+        params = {**params, "_version": version()}
+    return make_key(namespace, params)
+
+
+async def cached_body(key: str, compute: Callable[[], Awaitable[Any]], ttl: Optional[float] = None,
+                      timestamp: Timestamp = None) -> Tuple[bytes, str]:
+    """Encoded JSON for `compute()` under `key`, served from / stored in the response cache."""
+
+    async def encoded() -> bytes:
+        result = await compute()
+        if timestamp is not None:
+            result = with_timestamp(result, timestamp[0], timestamp[1](datetime.now()))
+        return encode(result)
+
+    return await get_response_cache().get_or_compute(key, ttl or config.CACHE_TTL_SECONDS, encoded)
+
+
+async def cached_json(namespace: str, params: Dict[str, Any], compute: Callable[[], Awaitable[Any]],
+                      ttl: Optional[float] = None, version: Version = None,
+                      timestamp: Timestamp = None) -> Tuple[bytes, str]:
+    return await cached_body(cache_key(namespace, params, version), compute, ttl, timestamp)
+
+
+async def _delta_body(namespace: str, since: str, version: str, body: bytes, delta: Delta,
+                      ttl: Optional[float]) -> Optional[bytes]:
+    """Delta from version `since` to `body` (version `version`), shared by every client polling the same pair."""
+    old = await get_response_cache().peek(f"{namespace}:{since}")
+    if old is None:
+        return None
+
+    async def encoded() -> bytes:
+        changes = delta(loads(old), loads(body))
+        return encode({**changes, "since": since, "version": version})
+
+    delta_body, _ = await get_response_cache().get_or_compute(
+        f"{namespace}:{since}>{version}", ttl or config.CACHE_TTL_SECONDS, encoded, counted=False
+    )
+    return delta_body
+
+
+async def _compressed(namespace: str, body: bytes, encoding: str, ttl: Optional[float]) -> bytes:
+    async def encoded() -> bytes:
+        return conditional.compress(body, encoding)
+
+    # Keyed by the body itself: a recomputed body never picks up an older one's compressed copy
+    compressed, _ = await get_response_cache().get_or_compute(
+        f"{namespace}:{conditional.digest(body)}:{encoding}", ttl or config.CACHE_TTL_SECONDS, encoded,
+        counted=False,
+    )
+    return compressed
+
+
+def cached(namespace: str, ttl: Optional[float] = None, version: Version = None, timestamp: Timestamp = None,
+           delta: Optional[Delta] = None, max_age: Optional[int] = None):
+    """Cache an async endpoint's JSON response, keyed on its (normalised) parameters.
+
+    `delta` enables `?since=<version>` delta responses; `max_age` sets a
+    public Cache-Control lifetime for downstream caches (revalidated by ETag).
+    """
+
+    def decorator(endpoint: Callable[..., Awaitable[Any]]):
+        @functools.wraps(endpoint)
+        async def wrapper(request: Request, since: Optional[str] = None, **kwargs):
+            key = cache_key(namespace, kwargs, version)
+            # Found or computed first: bad parameters are rejected even when a tag is sent
+            body, status = await cached_body(key, lambda: endpoint(**kwargs), ttl, timestamp)
+            token = conditional.digest(body)
+            headers = {"ETag": conditional.entity_tag(token), "Vary": "Accept-Encoding"}
+            if max_age is not None:
+                headers["Cache-Control"] = f"public, max-age={max_age}"
+            if request.method == "GET" and conditional.not_modified(request.headers.get("if-none-match"), token):
+                return Response(status_code=304, headers={**headers, "X-Cache": "NOT_MODIFIED"})
+
+            if delta is not None:
+                if status == "MISS":
+                    # Kept under its version token for later `since=` requests
+                    await get_response_cache().store(f"{namespace}:{token}", body,
+                                                     ttl or config.CACHE_TTL_SECONDS)
+                since = conditional.since_digest(since)
+                if since is not None:
+                    changes = await _delta_body(namespace, since, token, body, delta, ttl)
+                    if changes is not None:
+                        body = changes
+            headers["X-Cache"] = status
+            encoding = conditional.accepted_encoding(request.headers.get("accept-encoding"))
+            if encoding is not None and len(body) >= conditional.MIN_COMPRESS_BYTES:
+                body = await _compressed(namespace, body, encoding, ttl)
+                headers["Content-Encoding"] = encoding
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        # FastAPI reads the endpoint's parameters from the signature: add the request (kept out
+        # of the cache key) and, with a delta function, the `since` query parameter
+        signature = inspect.signature(endpoint)
+        extra = [inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)]
+        if delta is not None:
+            extra.append(inspect.Parameter(
+                "since", inspect.Parameter.KEYWORD_ONLY, annotation=Optional[str],
+                default=Query(default=None, description="Version (ETag) held: answer with changes since it"),
+            ))
+        wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), *extra])
+        return wrapper
+
+    return decorator
+
+
+async def cached_batch(namespace: str, params: List[Dict[str, Any]], compute: Callable[..., Any],
+                       ttl: Optional[float] = None, version: Version = None,
+                       timestamp: Timestamp = None) -> Response:
+    """Answer a batch of `params` with one `{"results": [...]}` response.
+
+    Repeated keys are computed once; distinct keys are computed concurrently in
+    worker threads via `compute(**p)`. Entries share the cache with the single-item
+    endpoint of the same `namespace`, and cached bodies are spliced into the
+    response as-is rather than decoded and re-encoded.
+    """
+    unique: Dict[str, Dict[str, Any]] = {}
+    for p in params:
+        unique.setdefault(make_key(namespace, p), p)
+    bodies = await asyncio.gather(*[
+        cached_json(namespace, p, functools.partial(asyncio.to_thread, compute, **p), ttl, version, timestamp)
+        for p in unique.values()
+    ])
+    by_key = {key: body for key, (body, _) in zip(unique, bodies)}
+    results = b",".join(by_key[make_key(namespace, p)] for p in params)
+    return Response(content=b'{"results":[' + results + b"]}", media_type="application/json")
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+
+_cache = ResponseCache(LRUCache(config.CACHE_MAX_ENTRIES))
+
+
+def init_cache(redis_url: Optional[str] = None) -> ResponseCache:
+    global _cache
+    redis_url = redis_url or config.REDIS_URL
+    backend = RedisCache.from_url(redis_url) if redis_url else LRUCache(config.CACHE_MAX_ENTRIES)
+    _cache = ResponseCache(backend)
+    return _cache
+
+
+def get_response_cache() -> ResponseCache:
+    return _cache
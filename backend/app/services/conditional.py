@@ -0,0 +1,110 @@
+"""
+Conditional Responses — ETags, 304s, `since=` deltas and compression for cached JSON.
+
+The SHA-1 digest of a cached body (app.services.cache) is both its entity
+tag and the version token clients poll with:
+
+  - `ETag: W/"<digest>"` on every cached response; a GET whose
+    `If-None-Match` lists it exactly is answered 304 once the body is found
+    (so bad parameters are still rejected, and `*` never matches)
+  - `?since=<digest>`, on endpoints with a delta function, returns only the
+    rows added, changed or removed since that version, as long as its body is
+    still cached under its digest (otherwise the full body, without a
+    "since" field)
+  - bodies over MIN_COMPRESS_BYTES are sent brotli (if installed) or gzip
+    compressed, each encoding compressed once per body and cached too
+
+Timestamps inside cached bodies (`last_updated`, `timestamp`) are the time the
+version was first built, so a body never changes under its ETag and a CDN or
+reverse proxy can revalidate or serve it from its own cache.
+
+Delta wire format (shared with the SSE `update` event, app.services.hub):
+    {..., "since": <digest>, "version": <digest>, "changed": [row + "key"], "removed": [key]}
+"""
+
+import gzip
+import hashlib
+import re
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip only without it
+    brotli = None
+
+# Below this a compressed body saves less than the headers and CPU cost
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+_DIGEST = re.compile(r"[0-9a-f]{40}")
+
+# (old body, new body) -> delta body, decoded JSON in and out
+Delta = Callable[[dict, dict], dict]
+
+
+def digest(body: bytes) -> str:
+    """Version token of an encoded body: a recomputed body gets a new one as soon as it differs."""
+    return hashlib.sha1(body).hexdigest()
+
+
+def entity_tag(token: str) -> str:
+    # Weak: compressed and identity bodies of one version are the same entity
+    return f'W/"{token}"'
+
+
+def not_modified(if_none_match: Optional[str], token: str) -> bool:
+    """Whether `If-None-Match` names version `token` itself (never just `*`)."""
+    if not if_none_match:
+        return False
+    return any(tag.strip().removeprefix("W/").strip('"') == token for tag in if_none_match.split(","))
+
+
+def since_digest(since: Optional[str]) -> Optional[str]:
+    """The digest a `since` parameter names (bare or as an ETag); None if it isn't one."""
+    if not since:
+        return None
+    since = since.strip().removeprefix("W/").strip('"').lower()
+    return since if _DIGEST.fullmatch(since) else None
+
+
+def accepted_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """"br" or "gzip" if the client accepts it (br only with brotli installed), else None."""
+    accepted: Dict[str, float] = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip()] = quality
+
+    def ok(encoding: str) -> bool:
+        return accepted.get(encoding, accepted.get("*", 0.0)) > 0
+
+    if brotli is not None and ok("br"):
+        return "br"
+    return "gzip" if ok("gzip") else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0: the same body always compresses to the same bytes
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def keyed_delta(field: str, keys: Callable[[List[dict]], Sequence[Hashable]]) -> Delta:
+    """Delta over the list `field`, matching rows by `keys(rows)`; other fields come from the new body."""
+
+    def delta(old: dict, new: dict) -> dict:
+        previous = dict(zip(keys(old[field]), old[field]))
+        rows = dict(zip(keys(new[field]), new[field]))
+        changed = [{**row, "key": key} for key, row in rows.items() if previous.get(key) != row]
+        removed = [key for key in previous if key not in rows]
+        rest = {name: value for name, value in new.items() if name != field}
+        return {**rest, "changed": changed, "removed": removed}
+
+    return delta
@@ -0,0 +1,331 @@
+"""
+Stop Event History — append-only columnar store of observed stop events.
+
+One directory per service day, one raw little-endian file per column:
+
+    <root>/stops.json            stop table: stop_id, name, lat, lng (append-only)
+    <root>/2024-03-14/stop.i4    int32   stop index into the stop table
+                      second.i4  int32   seconds since midnight of the observation
+                      delay.i2   int16   seconds late (negative = early)
+                      load.u1    uint8   vehicle load factor in percent
+                      SEALED     marker: rows are sorted by `second`
+
+Appends only ever extend the column files, so readers can `np.memmap` a
+partition while it is being written (rows past the shortest column are
+ignored). Sealing a finished day rewrites it sorted by time of day; a window
+query on a sealed day is then two binary searches and a slice, and only the
+rows inside the window are ever paged in.
+
+Aggregations are vectorised group-bys over (stop, time bucket): one sort of
+a composite int64 key gives per-group counts, mean and percentile delay, and
+a bincount gives the mean load factor. Cost is linear in the rows inside the
+window: a 15-minute window over a month at a tenth of Greater Manchester's
+volume (~100k events) aggregates in ~5 ms.
+
+HACKATHON: Events are appended by whatever ingests them (see benchmarks.synthetic).
+PRODUCTION: Append from the GTFS-RT / AVL stream and seal each day overnight.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app import config
+from app.services import registry
+from app.services.tiles import TileGrid
+
+COLUMNS = {"stop": "i4", "second": "i4", "delay": "i2", "load": "u1"}
+DAY_SECONDS = 24 * 3600
+SEALED = "SEALED"
+
+# Mean delay (minutes) and load factor drawn at full heatmap intensity
+FULL_DELAY_MINUTES = 15.0
+FULL_LOAD_FACTOR = 1.0
+
+
+@dataclass
+class StopStats:
+    """Aggregates per (stop, bucket) group with at least one event."""
+
+    stop: np.ndarray        # int32[n_groups], index into the store's stop table
+    bucket: np.ndarray      # int32[n_groups], time bucket within the window
+    count: np.ndarray       # int64[n_groups]
+    mean_delay: np.ndarray  # float64[n_groups], seconds
+    p50_delay: np.ndarray   # int32[n_groups], seconds
+    p90_delay: np.ndarray   # int32[n_groups], seconds
+    mean_load: np.ndarray   # float64[n_groups], load factor (1.0 = full)
+
+    def __len__(self) -> int:
+        return len(self.stop)
+
+
+def aggregate(stop: np.ndarray, delay: np.ndarray, load: np.ndarray,
+              bucket: Optional[np.ndarray] = None, n_buckets: int = 1) -> StopStats:
+    """Group events by (stop, bucket) and compute delay/load statistics, fully vectorised."""
+    bucket = np.zeros(len(stop), dtype=np.int64) if bucket is None else bucket.astype(np.int64)
+    group = stop.astype(np.int64) * n_buckets + bucket
+    # Sort once on (group, delay): groups become contiguous runs with delays in order
+    key = (group << 16) | (delay.astype(np.int64) + 32768)
+    key.sort()
+    sorted_group = key >> 16
+    sorted_delay = (key & 0xFFFF) - 32768
+    if len(key):
+        starts = np.flatnonzero(np.r_[True, sorted_group[1:] != sorted_group[:-1]])
+    else:
+        starts = np.empty(0, dtype=np.int64)
+    counts = np.diff(np.r_[starts, len(key)])
+    groups = sorted_group[starts]
+
+    mean_delay = np.add.reduceat(sorted_delay, starts) / counts if len(key) else np.empty(0)
+    load_sum = np.bincount(group, weights=load, minlength=int(group.max()) + 1 if len(group) else 0)
+
+    def percentile(q: float) -> np.ndarray:
+        return sorted_delay[starts + np.floor(q * (counts - 1)).astype(np.int64)].astype(np.int32)
+
+    return StopStats(
+        stop=(groups // n_buckets).astype(np.int32),
+        bucket=(groups % n_buckets).astype(np.int32),
+        count=counts,
+        mean_delay=mean_delay,
+        p50_delay=percentile(0.5),
+        p90_delay=percentile(0.9),
+        mean_load=load_sum[groups] / counts / 100.0 if len(key) else np.empty(0),
+    )
+
+
+class HistoryStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.version = 0
+        self._lock = threading.Lock()
+        self._grids: Dict[Tuple, TileGrid] = {}
+        self._sealed: Dict[date, Dict[str, np.ndarray]] = {}   # mapped columns of immutable days
+        os.makedirs(root, exist_ok=True)
+        self._load_stops()
+
+    # ─── Stop table ───────────────────────────────────────────────────────────
+
+    def _load_stops(self) -> None:
+        path = os.path.join(self.root, "stops.json")
+        table = {"stop_id": [], "name": [], "lat": [], "lng": []}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                table = json.load(f)
+        self.stop_ids: List[str] = table["stop_id"]
+        self.stop_names: List[str] = table["name"]
+        self.stop_lat = np.array(table["lat"], dtype=np.float64)
+        self.stop_lng = np.array(table["lng"], dtype=np.float64)
+        self.stop_index = {stop_id: i for i, stop_id in enumerate(self.stop_ids)}
+
+    def register_stops(self, stop_ids: Sequence[str], names: Sequence[str],
+                       lat: Sequence[float], lng: Sequence[float]) -> None:
+        """Add stops not yet in the table (existing indexes never change)."""
+        with self._lock:
+            new = [i for i, stop_id in enumerate(stop_ids) if stop_id not in self.stop_index]
+            if not new:
+                return
+            table = {
+                "stop_id": self.stop_ids + [stop_ids[i] for i in new],
+                "name": self.stop_names + [names[i] for i in new],
+                "lat": self.stop_lat.tolist() + [float(lat[i]) for i in new],
+                "lng": self.stop_lng.tolist() + [float(lng[i]) for i in new],
+            }
+            path = os.path.join(self.root, "stops.json")
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(table, f)
+            os.replace(path + ".tmp", path)
+            self._load_stops()
+
+    # ─── Partitions ───────────────────────────────────────────────────────────
+
+    def _partition(self, day: date) -> str:
+        return os.path.join(self.root, day.isoformat())
+
+    def days(self) -> List[date]:
+        found = []
+        for name in os.listdir(self.root):
+            try:
+                found.append(date.fromisoformat(name))
+            except ValueError:
+                continue
+        return sorted(found)
+
+    def append(self, day: date, stop_ids: Iterable[str], seconds: Sequence[int],
+               delays: Sequence[int], loads: Sequence[float]) -> int:
+        """Append events for `day`; `loads` are load factors (1.0 = full). Returns rows written."""
+        stops = np.fromiter((self.stop_index[s] for s in stop_ids), dtype=np.int32)
+        columns = {
+            "stop": stops,
+            "second": np.asarray(seconds, dtype=np.int32) % DAY_SECONDS,
+            "delay": np.clip(np.asarray(delays), -32768, 32767).astype(np.int16),
+            "load": np.clip(np.round(np.asarray(loads) * 100), 0, 255).astype(np.uint8),
+        }
+        if len({len(c) for c in columns.values()}) != 1:
+            raise ValueError("append: columns must have the same length")
+        directory = self._partition(day)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            marker = os.path.join(directory, SEALED)
+            if os.path.exists(marker):
+                os.remove(marker)  # late events: the day is unsorted again until re-sealed
+                self._sealed.pop(day, None)
+            for name, dtype in COLUMNS.items():
+                with open(os.path.join(directory, f"{name}.{dtype}"), "ab") as f:
+                    f.write(columns[name].astype(f"<{dtype}", copy=False).tobytes())
+            self.version += 1
+        return len(stops)
+
+    def read(self, day: date) -> Tuple[Dict[str, np.ndarray], bool]:
+        """Memory-mapped columns of one day (empty if missing) and whether it is sealed."""
+        columns = self._sealed.get(day)
+        if columns is not None:
+            return columns, True
+        directory = self._partition(day)
+        if not os.path.isdir(directory):
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}, False
+        sizes = {}
+        for name, dtype in COLUMNS.items():
+            path = os.path.join(directory, f"{name}.{dtype}")
+            sizes[name] = os.path.getsize(path) // np.dtype(dtype).itemsize if os.path.exists(path) else 0
+        rows = min(sizes.values())
+        columns = {
+            name: np.memmap(os.path.join(directory, f"{name}.{dtype}"), dtype=f"<{dtype}", mode="r",
+                            shape=(rows,)).view(np.ndarray) if rows else np.empty(0, dtype=dtype)
+            for name, dtype in COLUMNS.items()
+        }
+        sealed = os.path.exists(os.path.join(directory, SEALED))
+        if sealed:
+            self._sealed[day] = columns
+        return columns, sealed
+
+    def seal(self, day: date) -> None:
+        """Rewrite a finished day sorted by time of day so window queries can binary-search it."""
+        columns, sealed = self.read(day)
+        if sealed:
+            return
+        order = np.argsort(columns["second"], kind="stable")
+        directory = self._partition(day)
+        staging = directory + ".sealing"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name, dtype in COLUMNS.items():
+            column = np.asarray(columns[name])[order].astype(f"<{dtype}")
+            column.tofile(os.path.join(staging, f"{name}.{dtype}"))
+        open(os.path.join(staging, SEALED), "w").close()
+        del columns
+        with self._lock:
+            self._sealed.pop(day, None)
+            retired = directory + ".old"
+            os.replace(directory, retired)
+            os.replace(staging, directory)
+            shutil.rmtree(retired, ignore_errors=True)
+            self.version += 1
+
+    def seal_before(self, today: date) -> int:
+        """Seal every unsealed day before `today`; returns how many were sealed."""
+        sealed = 0
+        for day in self.days():
+            if day < today and not os.path.exists(os.path.join(self._partition(day), SEALED)):
+                self.seal(day)
+                sealed += 1
+        return sealed
+
+    # ─── Queries ──────────────────────────────────────────────────────────────
+
+    def window(self, end: datetime, minutes: int = 15, days: int = 30,
+               bucket_minutes: Optional[int] = None) -> StopStats:
+        """Stats for the `minutes` before `end`'s time of day, over the `days` up to `end`'s date.
+
+        With `bucket_minutes`, events are further grouped into buckets of that size
+        (bucket 0 starts `minutes` before `end`).
+        """
+        end_second = end.hour * 3600 + end.minute * 60 + end.second
+        start_second = end_second - minutes * 60
+        parts: Dict[str, List[np.ndarray]] = {"stop": [], "delay": [], "load": [], "offset": []}
+        for back in range(days):
+            day = end.date() - timedelta(days=back)
+            # A window crossing midnight takes the tail of the previous day
+            ranges = [(day, max(start_second, 0), end_second, 0)]
+            if start_second < 0:
+                ranges.append((day - timedelta(days=1), DAY_SECONDS + start_second, DAY_SECONDS, -DAY_SECONDS))
+            for part_day, lo, hi, shift in ranges:
+                columns, sealed = self.read(part_day)
+                second = columns["second"]
+                if sealed:
+                    # Bounds in the column's dtype, or searchsorted casts the whole column
+                    a, b = np.searchsorted(second, np.array([lo, hi], dtype=second.dtype))
+                    rows = slice(int(a), int(b))
+                else:
+                    rows = np.flatnonzero((second >= lo) & (second < hi))
+                parts["stop"].append(np.asarray(columns["stop"][rows]))
+                parts["delay"].append(np.asarray(columns["delay"][rows]))
+                parts["load"].append(np.asarray(columns["load"][rows]))
+                parts["offset"].append(np.asarray(second[rows]) + shift - start_second)
+
+        merged = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+        if bucket_minutes:
+            n_buckets = -(-minutes // bucket_minutes)
+            bucket = merged["offset"] // (bucket_minutes * 60)
+        else:
+            n_buckets, bucket = 1, None
+        return aggregate(merged["stop"], merged["delay"], merged["load"], bucket, n_buckets)
+
+    def heat_grid(self, metric: str, now: datetime, minutes: int, days: int) -> Optional[TileGrid]:
+        """Tile grid of per-stop "delay" or "crowding" over the current window (memoised per minute)."""
+        key = (metric, now.strftime("%Y-%m-%d %H:%M"), minutes, days, self.version)
+        grid = self._grids.get(key)
+        if grid is not None:
+            return grid
+        stats = self.window(now, minutes, days)
+        if not len(stats):
+            return None
+        names = [self.stop_names[s] for s in stats.stop.tolist()]
+        if metric == "delay":
+            minutes_late = stats.mean_delay / 60.0
+            intensity = minutes_late / FULL_DELAY_MINUTES
+            labels = [f"{name}: avg {m:+.0f} min (p90 {p / 60:+.0f})"
+                      for name, m, p in zip(names, minutes_late.tolist(), stats.p90_delay.tolist())]
+        else:
+            intensity = stats.mean_load / FULL_LOAD_FACTOR
+            labels = [f"{name}: {load:.0%} full" for name, load in zip(names, stats.mean_load.tolist())]
+        grid = TileGrid.build(
+            self.stop_lat[stats.stop], self.stop_lng[stats.stop], np.clip(intensity, 0.0, 1.0),
+            label=np.arange(len(stats), dtype=np.int32), labels=labels,
+            aggregate="mean", normalize=False,
+        )
+        self._grids = {k: v for k, v in self._grids.items() if k[1] == key[1]}
+        self._grids[key] = grid
+        return grid
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+# The store is the "history" entry of the dataset registry. Appends and seals
+# write its partitions in place (`HistoryStore.version` counts them).
+
+
+def init_history(path: Optional[str] = None) -> Optional[HistoryStore]:
+    path = path or config.HISTORY_PATH
+    store = HistoryStore(path) if path else None
+    if store is not None:
+        store.seal_before(date.today())
+    registry.publish(history=store)
+    return store
+
+
+def get_history() -> Optional[HistoryStore]:
+    return registry.get("history")
+
+
+def data_version():
+    """Cache version for history-backed responses: store load/appends and the current minute."""
+    store = get_history()
+    if store is None:
+        return registry.version("history")
+    return registry.version("history"), store.version, int(time.time() // 60)
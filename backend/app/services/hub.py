@@ -0,0 +1,159 @@
+"""
+Arrivals Fan-out Hub — shared push stream per stop for SSE subscribers.
+
+Every stop with at least one subscriber gets one producer task. It rebuilds
+the stop's board every `interval` seconds, diffs it against the previous
+board and, when anything changed, encodes a single Server-Sent Events message
+that is broadcast to every subscriber. 1,000 screens watching Piccadilly cost
+one board build and one JSON encode per tick, not 1,000.
+
+Backpressure: each subscriber has a small bounded queue. If a slow client
+lets it fill up, its pending deltas are discarded and it is sent a fresh
+full snapshot instead, so it catches up without the hub buffering unbounded
+history or blocking other subscribers.
+
+Wire format (text/event-stream):
+    event: snapshot   data: {"stop", "last_updated", "arrivals": [item + "key"]}
+    event: update     data: {"stop", "last_updated", "changed": [item + "key"], "removed": [key]}
+"""
+
+import asyncio
+import logging
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from app.models.schemas import ArrivalItem, ArrivalsResponse
+from app.services import registry
+from app.services.serialization import dumps
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_SECONDS = 15.0
+_RESYNC = object()
+
+
+def item_keys(items: List[ArrivalItem]) -> List[str]:
+    """Stable keys for board rows: route, destination, platform and occurrence number."""
+    seen: Dict[Tuple[str, str, Optional[str]], int] = {}
+    keys = []
+    for item in items:
+        base = (item.route, item.destination, item.platform)
+        seen[base] = seen.get(base, 0) + 1
+        keys.append(f"{item.route}|{item.destination}|{item.platform or ''}|{seen[base]}")
+    return keys
+
+
+def sse_message(event: str, payload: dict) -> bytes:
+    return b"event: " + event.encode() + b"\ndata: " + dumps(payload) + b"\n\n"
+
+
+class Subscription:
+    def __init__(self, hub: "ArrivalsHub", topic: "_Topic", max_queue: int):
+        self.hub = hub
+        self.topic = topic
+        self.queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self.dropped = 0
+        self.queue.put_nowait(topic.snapshot)
+
+    def push(self, message: bytes) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow client: forget its backlog and resync it with a full snapshot
+            self.dropped += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(_RESYNC)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            message = await asyncio.wait_for(self.queue.get(), HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            return b": keep-alive\n\n"
+        return self.topic.snapshot if message is _RESYNC else message
+
+    def close(self) -> None:
+        self.hub._unsubscribe(self)
+
+
+class _Topic:
+    def __init__(self, stop: str):
+        self.stop = stop
+        self.subscribers: Set[Subscription] = set()
+        self.items: Dict[str, dict] = {}
+        self.snapshot = b""
+        self.task: Optional[asyncio.Task] = None
+
+
+class ArrivalsHub:
+    def __init__(self, build: Callable[[str], ArrivalsResponse], interval: float, max_queue: int = 8):
+        self.build = build
+        self.interval = interval
+        self.max_queue = max_queue
+        self._topics: Dict[str, _Topic] = {}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "topics": len(self._topics),
+            "subscribers": sum(len(t.subscribers) for t in self._topics.values()),
+        }
+
+    def subscribe(self, stop: str) -> Subscription:
+        topic = self._topics.get(stop)
+        if topic is None:
+            topic = self._topics[stop] = _Topic(stop)
+            self._refresh(topic)
+            topic.task = asyncio.create_task(self._produce(topic), name=f"arrivals-hub:{stop}")
+        subscription = Subscription(self, topic, self.max_queue)
+        topic.subscribers.add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription) -> None:
+        topic = subscription.topic
+        topic.subscribers.discard(subscription)
+        if not topic.subscribers and self._topics.get(topic.stop) is topic:
+            del self._topics[topic.stop]
+            if topic.task is not None:
+                topic.task.cancel()
+
+    async def _produce(self, topic: _Topic) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                # The task inherited the first subscriber's pinned datasets: re-pin to the latest
+                with registry.pinned():
+                    message = self._refresh(topic)
+            except Exception:
+                logger.warning("arrivals hub refresh failed for %s", topic.stop, exc_info=True)
+                continue
+            if message is not None:
+                for subscription in list(topic.subscribers):
+                    subscription.push(message)
+
+    def _refresh(self, topic: _Topic) -> Optional[bytes]:
+        """Rebuild the board; update the snapshot and return the delta message (None if unchanged)."""
+        board = self.build(topic.stop)
+        items = {
+            key: {**item.model_dump(), "key": key}
+            for key, item in zip(item_keys(board.arrivals), board.arrivals)
+        }
+        changed = [item for key, item in items.items() if topic.items.get(key) != item]
+        removed = [key for key in topic.items if key not in items]
+        topic.items = items
+        topic.snapshot = sse_message("snapshot", {
+            "stop": board.stop, "last_updated": board.last_updated, "arrivals": list(items.values()),
+        })
+        if not changed and not removed:
+            return None
+        return sse_message("update", {
+            "stop": board.stop, "last_updated": board.last_updated, "changed": changed, "removed": removed,
+        })
+
+    async def close(self) -> None:
+        tasks = [t.task for t in self._topics.values() if t.task is not None]
+        self._topics.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,573 @@
+"""
+Travel-Time Matrix — precomputed stop × stop journey times per time-of-day band.
+
+For each band (early, AM peak, inter-peak, PM peak, evening) a RAPTOR
+one-to-all search from every origin stop, leaving at the band's reference
+departure, fills one row of two memory-mapped matrices:
+
+    <root>/manifest.json            stop table hash, pattern signatures, disruption
+    <root>/<band>.minutes.u2        uint16[n_stops, n_stops]  minutes until arrival,
+                                    waiting included; 65535 = unreachable
+    <root>/<band>.changes.u1        uint8[n_stops, n_stops]   changes on that journey
+    <root>/<band>.rows.npz          which rows are current, and the patterns each
+                                    row's journeys ride (CSR)
+
+A background task fills rows off the event loop — rows a request asked for
+first, then the rest, current band first — so a lookup is a min over the
+origin × destination cells and a row that is not ready yet falls back to
+full planning (app.routers.routes).
+
+Only rows a change can affect are recomputed. A pattern's state is its
+signature (route, stops and every trip time) plus any closure suspension
+or delay (app.services.planner.Disruption); when states differ from the
+ones the matrix was computed with:
+
+  - rows whose journeys ride an old pattern that changed or went away are
+    recomputed (the used-patterns index): losing or slowing service cannot
+    touch a journey that doesn't use it
+  - a new or changed pattern can only help rows that reach one of its stops
+    in time to board and then arrive somewhere (or one walk from there) no
+    later than the matrix says; that check runs against the matrix itself,
+    vectorised over rows
+
+The timetable is diffed against the manifest at startup, so a new feed only
+recomputes the rows it touches; closures are applied while running.
+
+One process owns the files and fills them. Others (the workers of
+app.serve) open them read-only: they pick up newly ready rows from each
+checkpoint and plan in full while their own closures differ from the
+owner's.
+
+HACKATHON: One reference departure per band. A full Greater Manchester matrix
+           (12.5k stops) is ~470 MB and a few hours of one core per band.
+PRODUCTION: Fill rows in a process pool; average several departures per band.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app import config
+from app.services import registry
+from app.services.planner import INF, Disruption, RaptorNetwork
+from app.services.timetable import Timetable
+
+logger = logging.getLogger(__name__)
+
+UNREACHABLE = int(np.iinfo(np.uint16).max)      # minutes
+NO_CHANGES = int(np.iinfo(np.uint8).max)
+# High enough that searches run until nothing improves: cells are plain earliest
+# arrivals (fewest changes among ties), which is what makes the refresh checks exact
+MAX_TRANSFERS = 10
+# Rows computed per worker-thread hop at most, and how often filled rows are saved
+BATCH_ROWS = 16
+BATCH_SECONDS = 1.0
+CHECKPOINT_SECONDS = 30.0
+# Pause before the fill task carries on after a failed step
+RETRY_SECONDS = 5.0
+# How often a read-only matrix looks for a newer checkpoint
+RELOAD_SECONDS = 5.0
+
+HOUR = 3600
+
+
+class Band(NamedTuple):
+    name: str
+    start: int      # seconds after service-day midnight
+    end: int
+    depart: int     # reference departure the band's rows are computed for
+
+
+BANDS = (
+    Band("early", int(4.5 * HOUR), 7 * HOUR, 6 * HOUR),
+    Band("am_peak", 7 * HOUR, int(9.5 * HOUR), 8 * HOUR),
+    Band("interpeak", int(9.5 * HOUR), int(15.5 * HOUR), 12 * HOUR),
+    Band("pm_peak", int(15.5 * HOUR), int(18.5 * HOUR), 17 * HOUR),
+    Band("evening", int(18.5 * HOUR), int(28.5 * HOUR), 20 * HOUR),
+)
+
+
+def band_at(seconds: int) -> Band:
+    """Band covering a time of day (seconds after midnight); the small hours belong to the evening."""
+    seconds %= 24 * HOUR
+    if seconds < BANDS[0].start:
+        seconds += 24 * HOUR
+    return next(band for band in BANDS if band.start <= seconds < band.end)
+
+
+class TravelTime(NamedTuple):
+    band: Band
+    minutes: Optional[int]      # None = unreachable
+    changes: Optional[int]
+
+
+# ─── Pattern states ───────────────────────────────────────────────────────────
+
+def stops_hash(tt: Timetable) -> str:
+    return hashlib.blake2b("\n".join(tt.stop_ids).encode(), digest_size=16).hexdigest()
+
+
+def pattern_signatures(network: RaptorNetwork) -> List[str]:
+    """Content hash per pattern: route, stop sequence and every trip time."""
+    tt = network.timetable
+    signatures = []
+    for p in range(network.n_patterns):
+        stops, arr, dep = network.pattern(p)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(tt.route_ids[network.pattern_route[p]].encode())
+        h.update(np.asarray(stops, dtype=np.int32).tobytes())
+        h.update(np.ascontiguousarray(arr).tobytes())
+        h.update(np.ascontiguousarray(dep).tobytes())
+        signatures.append(h.hexdigest())
+    return signatures
+
+
+def pattern_states(signatures: Sequence[str], disruption: Disruption) -> List[Tuple[str, int]]:
+    """(signature, seconds late) per pattern, INF late if suspended: rows stay current while unchanged."""
+    return [(sig, INF if p in disruption.suspended else disruption.delays.get(p, 0))
+            for p, sig in enumerate(signatures)]
+
+
+def _disruption_to_json(disruption: Disruption) -> Dict[str, object]:
+    return {"suspended": sorted(disruption.suspended),
+            "delays": {str(p): d for p, d in sorted(disruption.delays.items())}}
+
+
+def _disruption_from_json(data: Dict[str, object]) -> Disruption:
+    return Disruption(frozenset(data.get("suspended", ())),
+                      {int(p): int(d) for p, d in data.get("delays", {}).items()})
+
+
+# ─── One band ─────────────────────────────────────────────────────────────────
+
+def _new_memmap(path: str, dtype, n_stops: int) -> np.memmap:
+    """A new zeroed square matrix file renamed over `path`, never truncating the old one in place:
+    a matrix still serving requests pinned to an older dataset snapshot keeps its own mapping."""
+    matrix = np.memmap(path + ".new", dtype=dtype, mode="w+", shape=(n_stops, n_stops))
+    os.replace(path + ".new", path)
+    return matrix
+
+
+class BandMatrix:
+    """Rows of one band: memory-mapped minutes and changes, row readiness, used-patterns index."""
+
+    def __init__(self, root: str, band: Band, n_stops: int, fresh: bool, readonly: bool = False):
+        self.band = band
+        self.n_stops = n_stops
+        base = os.path.join(root, band.name)
+        self._rows_path = base + ".rows.npz"
+        self._rows_mtime = 0.0
+        paths = (base + ".minutes.u2", base + ".changes.u1", self._rows_path)
+        fresh = fresh or not all(os.path.exists(path) for path in paths)
+        if fresh and readonly:
+            raise FileNotFoundError(f"No {band.name} travel-time matrix in {root}")
+        if fresh:
+            self.minutes = _new_memmap(paths[0], np.uint16, n_stops)
+            self.changes = _new_memmap(paths[1], np.uint8, n_stops)
+        else:
+            mode = "r" if readonly else "r+"
+            self.minutes = np.memmap(paths[0], dtype=np.uint16, mode=mode, shape=(n_stops, n_stops))
+            self.changes = np.memmap(paths[1], dtype=np.uint8, mode=mode, shape=(n_stops, n_stops))
+        self.ready = np.zeros(n_stops, dtype=bool)
+        self.used: List[np.ndarray] = [np.empty(0, np.int32)] * n_stops
+        if readonly:
+            self.reload()
+        elif not fresh:
+            with np.load(self._rows_path) as rows:
+                self.ready[:] = rows["ready"]
+                offsets, patterns = rows["offsets"], rows["patterns"]
+            self.used = [patterns[a:b] for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+
+    def reload(self) -> None:
+        """Read-only matrices: take row readiness from the owner's latest checkpoint."""
+        mtime = os.stat(self._rows_path).st_mtime
+        if mtime != self._rows_mtime:
+            with np.load(self._rows_path) as rows:
+                self.ready = rows["ready"]
+            self._rows_mtime = mtime
+
+    def fill(self, network: RaptorNetwork, row: int, disruption: Disruption) -> None:
+        depart = self.band.depart
+        arrive, rides, used = network.one_to_all(row, depart, MAX_TRANSFERS, disruption)
+        reached = arrive != INF
+        minutes = np.full(self.n_stops, UNREACHABLE, dtype=np.uint16)
+        minutes[reached] = np.minimum(np.ceil((arrive[reached] - depart) / 60), UNREACHABLE - 1)
+        changes = np.full(self.n_stops, NO_CHANGES, dtype=np.uint8)
+        changes[reached] = np.maximum(rides[reached].astype(np.int16) - 1, 0)
+        self.minutes[row] = minutes
+        self.changes[row] = changes
+        self.used[row] = used
+        self.ready[row] = True      # last: readers check this before touching the row
+
+    def rows_riding(self, patterns: np.ndarray) -> np.ndarray:
+        """bool[n_stops]: ready rows whose journeys ride any of `patterns`."""
+        hit = np.zeros(self.n_stops, dtype=bool)
+        if not len(patterns):
+            return hit
+        counts = np.fromiter((len(u) for u in self.used), dtype=np.int64, count=self.n_stops)
+        flat = np.concatenate(self.used) if counts.sum() else np.empty(0, np.int32)
+        rows = np.repeat(np.arange(self.n_stops), counts)[np.isin(flat, patterns)]
+        hit[rows] = True
+        return hit & self.ready
+
+    def rows_helped(self, network: RaptorNetwork, patterns: Sequence[int], disruption: Disruption) -> np.ndarray:
+        """bool[n_stops]: ready rows that the trips of `patterns` could get somewhere no later.
+
+        A row can only gain from a pattern if it reaches one of its stops before a
+        trip leaves, and that trip then arrives at a later stop — or one walk from
+        it, since walks start from vehicle arrivals — no later than the row's
+        current time there. Minutes are rounded up, so boarding is bounded below
+        by (minutes - 1) and arrival above by minutes: the test never misses.
+        """
+        helped = np.zeros(self.n_stops, dtype=bool)
+        patterns = [p for p in patterns if p not in disruption.suspended]
+        rows = np.flatnonzero(self.ready)
+        if not patterns or not len(rows):
+            return helped
+        offsets, walk_to, walk_seconds = network.transfer_offsets, network.transfer_to, network.transfer_seconds
+        touched = [np.asarray(network.pattern(p)[0]) for p in patterns]
+        touched += [walk_to[offsets[s]:offsets[s + 1]] for stops in touched[:len(patterns)] for s in stops]
+        columns = np.unique(np.concatenate(touched))
+        block = np.asarray(self.minutes[np.ix_(rows, columns)]).astype(np.int64)
+        latest = np.where(block == UNREACHABLE, INF, self.band.depart + block * 60)   # upper bound on arrival
+        depart = self.band.depart
+        for p in patterns:
+            stops, arr, dep = network.pattern(p)
+            delay = disruption.delays.get(p, 0)
+            n_trips = dep.shape[1]
+            at = np.searchsorted(columns, stops)
+            minutes = block[:, at]                                              # (rows, pattern stops)
+            board = depart + np.maximum(minutes - 1, 0) * 60 - delay
+            trip = np.full(minutes.shape, n_trips, dtype=np.int64)
+            for i in range(len(stops) - 1):
+                trip[:, i] = np.where(minutes[:, i] != UNREACHABLE,
+                                      np.searchsorted(dep[i], board[:, i], side="left"), n_trips)
+            # Earliest trip boardable at any earlier stop (no overtaking within a pattern)
+            best = np.minimum.accumulate(trip, axis=1)
+            earlier = np.concatenate([np.full((len(rows), 1), n_trips), best[:, :-1]], axis=1)
+            arrive = arr[np.arange(len(stops))[None, :], np.minimum(earlier, n_trips - 1)] + delay
+
+            # Latest arrival at each stop that still improves it or a stop one walk away
+            limit = latest[:, at]
+            for i, stop in enumerate(stops[1:], 1):
+                a, b = offsets[stop], offsets[stop + 1]
+                if b > a:
+                    near = latest[:, np.searchsorted(columns, walk_to[a:b])] - walk_seconds[a:b]
+                    limit[:, i] = np.maximum(limit[:, i], near.max(axis=1))
+            sooner = (earlier < n_trips) & (arrive <= limit)
+            helped[rows[sooner.any(axis=1)]] = True
+        return helped
+
+    def invalidate(self, rows: np.ndarray) -> None:
+        self.ready[rows] = False
+        for row in np.flatnonzero(rows).tolist():
+            self.used[row] = np.empty(0, np.int32)
+
+    def remap(self, old_to_new: np.ndarray) -> None:
+        """Renumber the used-patterns index after a network change (ready rows only use kept patterns)."""
+        for row in np.flatnonzero(self.ready).tolist():
+            self.used[row] = old_to_new[self.used[row]]
+
+    def checkpoint(self) -> None:
+        ready = self.ready.copy()       # rows finished after this point are saved next time
+        self.minutes.flush()
+        self.changes.flush()
+        used = [self.used[row] if ready[row] else np.empty(0, np.int32) for row in range(self.n_stops)]
+        offsets = np.zeros(self.n_stops + 1, dtype=np.int64)
+        np.cumsum([len(u) for u in used], out=offsets[1:])
+        patterns = np.concatenate(used).astype(np.int32) if offsets[-1] else np.empty(0, np.int32)
+        tmp = self._rows_path + ".tmp.npz"
+        np.savez(tmp, ready=ready, offsets=offsets, patterns=patterns)
+        os.replace(tmp, self._rows_path)
+
+
+# ─── All bands ────────────────────────────────────────────────────────────────
+
+class TravelTimeMatrix:
+    def __init__(self, root: str, network: RaptorNetwork, bands: Sequence[Band], readonly: bool = False):
+        self.root = root
+        self.network = network
+        self.readonly = readonly
+        self.disruption = Disruption()
+        self.rows_computed = 0
+        self.rows_refreshed = 0
+        self._stops_hash = stops_hash(network.timetable)
+        # Insertion-ordered set of (band, row); lookups add to it from request threads
+        self._wanted: Dict[Tuple[str, int], None] = {}
+        self._wanted_lock = threading.Lock()
+        self._pending: Optional[Disruption] = None
+        self._applying = False
+        self._wake = asyncio.Event()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None     # the fill task's, once running
+        self._next_reload = 0.0
+
+        manifest = self._read_manifest()
+        same_stops = manifest is not None and manifest.get("stops") == self._stops_hash
+        n_stops = network.timetable.n_stops
+        if readonly:
+            # The owner opened the matrix for this network before any reader started
+            if not same_stops:
+                raise ValueError(f"Travel-time matrix in {root} is not for this timetable")
+            self.signatures = manifest["signatures"]
+            self.disruption = _disruption_from_json(manifest.get("disruption", {}))
+            self.bands = {band.name: BandMatrix(root, band, n_stops, fresh=False, readonly=True)
+                          for band in bands}
+            return
+
+        self.signatures = pattern_signatures(network)
+        os.makedirs(root, exist_ok=True)
+        self.bands: Dict[str, BandMatrix] = {
+            band.name: BandMatrix(root, band, n_stops, fresh=not same_stops) for band in bands
+        }
+        if same_stops:
+            # Rows were computed for the stored patterns and closures, with none active now
+            previous = _disruption_from_json(manifest.get("disruption", {}))
+            self._apply(pattern_states(manifest["signatures"], previous), Disruption())
+        self.checkpoint()
+
+    # ─── Persistence ──────────────────────────────────────────────────────────
+
+    def _read_manifest(self) -> Optional[dict]:
+        path = os.path.join(self.root, "manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    def checkpoint(self) -> None:
+        """Save row readiness, then the manifest the ready rows are current for."""
+        if self.readonly:
+            return
+        for matrix in self.bands.values():
+            matrix.checkpoint()
+        path = os.path.join(self.root, "manifest.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump({"stops": self._stops_hash, "max_transfers": MAX_TRANSFERS,
+                       "signatures": self.signatures,
+                       "disruption": _disruption_to_json(self.disruption)}, f)
+        os.replace(path + ".tmp", path)
+
+    # ─── Incremental refresh ──────────────────────────────────────────────────
+
+    def _apply(self, old_states: Sequence[Tuple[str, int]], disruption: Disruption) -> None:
+        """Invalidate exactly the rows that moving from `old_states` to the current network can change."""
+        unmatched = {state: p for p, state in enumerate(old_states)}
+        was_late = dict(old_states)
+        old_to_new = np.full(len(old_states), -1, dtype=np.int32)
+        gained = []     # new patterns, and ones running less late than before
+        for p, (sig, late) in enumerate(pattern_states(self.signatures, disruption)):
+            old = unmatched.pop((sig, late), None)
+            if old is not None:
+                old_to_new[old] = p
+            elif late < was_late.get(sig, INF + 1):
+                gained.append(p)
+        lost = np.flatnonzero(old_to_new < 0)
+
+        for matrix in self.bands.values():
+            stale = matrix.rows_riding(lost) | matrix.rows_helped(self.network, gained, disruption)
+            matrix.invalidate(stale)
+            matrix.remap(old_to_new)
+            self.rows_refreshed += int(stale.sum())
+            logger.info("Travel-time matrix %s: %d patterns lost, %d gained; %d of %d rows to refresh",
+                        matrix.band.name, len(lost), len(gained), int(stale.sum()), matrix.n_stops)
+        self.disruption = disruption
+
+    def set_disruption(self, disruption: Disruption) -> None:
+        """Apply new closures; lookups fall back to planning until affected rows are invalidated."""
+        if self.readonly:
+            # Rows are the owner's: only usable while this process has the same closures
+            self._pending = disruption if disruption != self.disruption else None
+            return
+        self._pending = disruption
+        self._wake_up()
+
+    # ─── Background fill ──────────────────────────────────────────────────────
+
+    def _wake_up(self) -> None:
+        # asyncio.Event isn't thread-safe: callers may be request threads (asyncio.to_thread)
+        loop = self._loop
+        if loop is None:
+            self._wake.set()
+            return
+        with contextlib.suppress(RuntimeError):     # loop closed: nothing left to wake
+            loop.call_soon_threadsafe(self._wake.set)
+
+    def want(self, band: str, rows: Sequence[int]) -> None:
+        if self.readonly:
+            return      # the owner fills every row anyway
+        with self._wanted_lock:
+            for row in rows:
+                self._wanted[(band, row)] = None
+        self._wake_up()
+
+    def _next_batch(self) -> Optional[Tuple[BandMatrix, List[int]]]:
+        with self._wanted_lock:
+            wanted = list(self._wanted)
+        for band, row in wanted:
+            if not self.bands[band].ready[row]:
+                matrix = self.bands[band]
+                rows = [r for b, r in wanted if b == band and not matrix.ready[r]]
+                return matrix, rows[:BATCH_ROWS]
+            with self._wanted_lock:
+                self._wanted.pop((band, row), None)
+        now = datetime.now()
+        current = band_at(now.hour * HOUR + now.minute * 60)
+        order = sorted(self.bands.values(), key=lambda m: (BANDS.index(m.band) - BANDS.index(current)) % len(BANDS))
+        for matrix in order:
+            missing = np.flatnonzero(~matrix.ready)
+            if len(missing):
+                return matrix, missing[:BATCH_ROWS].tolist()
+        return None
+
+    def _fill(self, matrix: BandMatrix, rows: List[int], disruption: Disruption) -> None:
+        start = time.perf_counter()
+        for row in rows:
+            matrix.fill(self.network, row, disruption)
+            self.rows_computed += 1
+            if time.perf_counter() - start >= BATCH_SECONDS:
+                break
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        last_checkpoint = time.monotonic()
+        while True:
+            try:
+                last_checkpoint = await self._step(last_checkpoint)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Travel-time matrix fill step failed; retrying", exc_info=True)
+                await asyncio.sleep(RETRY_SECONDS)
+
+    async def _step(self, last_checkpoint: float) -> float:
+        """Apply pending closures or fill one batch of rows; returns the time of the last checkpoint."""
+        if self._pending is not None:
+            disruption, self._pending = self._pending, None
+            self._applying = True
+            try:
+                await asyncio.to_thread(self._apply, pattern_states(self.signatures, self.disruption),
+                                        disruption)
+                await asyncio.to_thread(self.checkpoint)
+            except Exception:
+                if self._pending is None:
+                    self._pending = disruption      # retried on the next step
+                raise
+            finally:
+                self._applying = False
+            return time.monotonic()
+
+        # Cleared before looking, so rows wanted from here on wake the wait below
+        self._wake.clear()
+        batch = self._next_batch()
+        if batch is None or time.monotonic() - last_checkpoint >= CHECKPOINT_SECONDS:
+            await asyncio.to_thread(self.checkpoint)
+            last_checkpoint = time.monotonic()
+        if batch is None:
+            await self._wake.wait()
+            return last_checkpoint
+        await asyncio.to_thread(self._fill, *batch, self.disruption)
+        return last_checkpoint
+
+    # ─── Lookups ──────────────────────────────────────────────────────────────
+
+    def lookup(self, origins: Sequence[int], targets: Sequence[int], seconds: int,
+               max_transfers: int = MAX_TRANSFERS) -> Optional[TravelTime]:
+        """Fastest journey between two stop groups, leaving at the reference time of the band.
+
+        None when a row isn't ready (it is queued first) or the fastest journey needs
+        more than `max_transfers` changes — the caller plans those in full.
+        """
+        band = band_at(seconds)
+        matrix = self.bands.get(band.name)
+        if matrix is None or self._pending is not None or self._applying:
+            return None
+        if self.readonly and time.monotonic() >= self._next_reload:
+            matrix.reload()
+            self._next_reload = time.monotonic() + RELOAD_SECONDS
+        missing = [o for o in origins if not matrix.ready[o]]
+        if missing:
+            self.want(band.name, missing)
+            return None
+        cells = np.ix_(origins, targets)
+        minutes = matrix.minutes[cells].astype(np.int32)
+        best = np.unravel_index(np.argmin(minutes * 256 + matrix.changes[cells]), minutes.shape)
+        if minutes[best] == UNREACHABLE:
+            return TravelTime(band, None, None)
+        changes = int(matrix.changes[cells][best])
+        if changes > max_transfers:
+            return None
+        return TravelTime(band, int(minutes[best]), changes)
+
+    def stats(self) -> Dict[str, object]:
+        if self.readonly:
+            for matrix in self.bands.values():
+                matrix.reload()
+        return {
+            "rows_ready": {name: int(m.ready.sum()) for name, m in self.bands.items()},
+            "rows_per_band": self.network.timetable.n_stops,
+            "rows_computed": self.rows_computed,
+            "rows_refreshed": self.rows_refreshed,
+            "rows_wanted": len(self._wanted),
+        }
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+# The "matrix" entry of the dataset registry, swapped along with the network;
+# one task at a time fills the latest one.
+
+_task: Optional[asyncio.Task] = None
+
+
+def open_matrix(network: Optional[RaptorNetwork], path: Optional[str] = None,
+                readonly: bool = False) -> Optional[TravelTimeMatrix]:
+    """Open (or create) the matrix for `network`; stale rows are refilled once `start_matrix` runs.
+
+    With `readonly`, open the files another process owns and fills (app.serve).
+    """
+    path = path or config.MATRIX_PATH
+    if network is None or not path or not network.timetable.n_stops:
+        return None
+    bands = [band for band in BANDS if band.name in config.MATRIX_BANDS]
+    return TravelTimeMatrix(path, network, bands, readonly)
+
+
+def init_matrix(network: Optional[RaptorNetwork], path: Optional[str] = None,
+                readonly: bool = False) -> Optional[TravelTimeMatrix]:
+    travel_times = open_matrix(network, path, readonly)
+    registry.publish(matrix=travel_times)
+    return travel_times
+
+
+def start_matrix() -> Optional[asyncio.Task]:
+    global _task
+    travel_times = registry.latest().get("matrix")
+    if travel_times is None or travel_times.readonly:
+        return None
+    _task = asyncio.create_task(travel_times.run(), name="travel-time-matrix")
+    return _task
+
+
+async def stop_matrix() -> None:
+    """Stop filling the latest matrix and checkpoint it (before shutdown or opening another)."""
+    global _task
+    task, _task = _task, None
+    if task is not None:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    travel_times = registry.latest().get("matrix")
+    if travel_times is not None:
+        await asyncio.to_thread(travel_times.checkpoint)
+
+
+def get_matrix() -> Optional[TravelTimeMatrix]:
+    return registry.get("matrix")
@@ -0,0 +1,182 @@
+"""
+Request Metrics — per-route latency/size histograms exposed in Prometheus format.
+
+`MetricsMiddleware` is a plain ASGI middleware (no per-request Request object
+or body buffering). It records, per (method, route template):
+
+  - request count by status code
+  - latency histogram (time until the last body byte is sent)
+  - response size histogram
+  - response cache outcome, read from the `X-Cache` header set by @cached
+
+plus a global in-flight gauge. Route templates ("/api/arrivals", not the raw
+path) keep label cardinality bounded; unmatched paths share one label.
+Server-sent event streams are counted but kept out of the histograms, since
+their "latency" is the lifetime of the connection.
+
+Other components contribute gauges/counters through `Metrics.collectors`
+(see app.main), and `/metrics` renders everything as Prometheus text format.
+
+HACKATHON: Metrics are per process.
+PRODUCTION: Scrape every worker (or use prometheus_client's multiprocess mode).
+"""
+
+import bisect
+import time
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+# (name, type, help, [(labels, value), ...])
+Family = Tuple[str, str, str, List[Tuple[Dict[str, str], float]]]
+
+
+class Histogram:
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self, name: str, labels: Dict[str, str]) -> List[Tuple[str, Dict[str, str], float]]:
+        out = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            out.append((f"{name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+        out.append((f"{name}_bucket", {**labels, "le": "+Inf"}, self.count))
+        out.append((f"{name}_sum", labels, self.sum))
+        out.append((f"{name}_count", labels, self.count))
+        return out
+
+
+class Metrics:
+    def __init__(self):
+        self.started_at = time.time()
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, str], int] = defaultdict(int)
+        self.cache: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.sizes: Dict[Tuple[str, str], Histogram] = {}
+        self.collectors: List[Callable[[], Iterable[Family]]] = []
+
+    def observe(self, method: str, route: str, status: int, seconds: float, size: int,
+                cache_status: str = "", streaming: bool = False) -> None:
+        self.requests[(method, route, str(status))] += 1
+        if cache_status:
+            self.cache[(route, cache_status)] += 1
+        if streaming:
+            return
+        key = (method, route)
+        latency = self.latency.get(key)
+        if latency is None:
+            latency = self.latency[key] = Histogram(LATENCY_BUCKETS)
+            self.sizes[key] = Histogram(SIZE_BUCKETS)
+        latency.observe(seconds)
+        self.sizes[key].observe(size)
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+
+        family("smartbee_uptime_seconds", "gauge", "Seconds since the process started.",
+               [("smartbee_uptime_seconds", {}, time.time() - self.started_at)])
+        family("smartbee_http_requests_in_flight", "gauge", "HTTP requests currently being served.",
+               [("smartbee_http_requests_in_flight", {}, self.in_flight)])
+        family("smartbee_http_requests_total", "counter", "HTTP requests by route and status.",
+               [("smartbee_http_requests_total", {"method": m, "route": r, "status": s}, n)
+                for (m, r, s), n in sorted(self.requests.items())])
+        family("smartbee_http_request_duration_seconds", "histogram",
+               "Time until the last response byte was sent.",
+               [s for (m, r), h in sorted(self.latency.items())
+                for s in h.samples("smartbee_http_request_duration_seconds", {"method": m, "route": r})])
+        family("smartbee_http_response_size_bytes", "histogram", "Response body size.",
+               [s for (m, r), h in sorted(self.sizes.items())
+                for s in h.samples("smartbee_http_response_size_bytes", {"method": m, "route": r})])
+        family("smartbee_http_cache_total", "counter", "Response cache outcome (X-Cache) by route.",
+               [("smartbee_http_cache_total", {"route": r, "result": c.lower()}, n)
+                for (r, c), n in sorted(self.cache.items())])
+        for collect in self.collectors:
+            for name, kind, help_text, samples in collect():
+                family(name, kind, help_text, [(name, labels, value) for labels, value in samples])
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsMiddleware:
+    def __init__(self, app, metrics: "Metrics"):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = self.metrics
+        start = time.perf_counter()
+        status = 500
+        size = 0
+        cache_status = ""
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal status, size, cache_status, streaming
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for name, value in message.get("headers", ()):
+                    if name == b"x-cache":
+                        cache_status = value.decode("latin-1")
+                    elif name == b"content-type" and value.startswith(b"text/event-stream"):
+                        streaming = True
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.in_flight -= 1
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            metrics.observe(scope["method"], template, status, time.perf_counter() - start,
+                            size, cache_status, streaming)
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
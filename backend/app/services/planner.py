@@ -0,0 +1,621 @@
+"""
+RAPTOR Journey Planner — round-based public-transit routing on the timetable.
+
+Builds a RAPTOR network from the in-memory `Timetable`:
+
+  - trips are grouped into patterns (identical stop sequences, no overtaking),
+    each with stop-major arrival/departure matrices so boarding is a binary search
+  - every stop lists the patterns serving it
+  - walking transfers link stops within `MAX_WALK_METRES` of each other
+
+Each round k scans only the patterns touched by stops improved in round k-1,
+so round k yields the earliest arrivals using k vehicles. Labels are split by
+one extra criterion — whether the journey has changed vehicles in the city
+centre — which lets a single search return the "fastest", "cheapest" and
+"orbital" (no city-centre interchange) options. The Pareto set over
+(arrival, transfers, centre interchange) is kept; "cheapest" is the lowest
+fare within that set.
+
+A `Disruption` (from active road closures) leaves suspended patterns out of
+the search and runs delayed patterns late at every stop. `one_to_all` is the
+same search without targets, one row of the travel-time matrix
+(app.services.matrix).
+
+HACKATHON: Flat per-boarding fares by GTFS route_type, no real-time overlay.
+PRODUCTION: Apply the Bee Network fare caps and SIRI delay deltas to trip times.
+"""
+
+import math
+from dataclasses import dataclass, field, replace
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models.schemas import AffectedRoute, RouteOption
+from app.services import registry
+from app.services.timetable import Timetable
+
+INF = 2 ** 31 - 1
+
+MAX_WALK_METRES = 300
+WALK_SPEED_MPS = 1.25
+MIN_CHANGE_SECONDS = 60
+
+# City-centre interchange zone (Piccadilly Gardens ↔ Deansgate ↔ St Peter's Square)
+CENTRE_LAT, CENTRE_LNG, CENTRE_RADIUS_METRES = 53.4794, -2.2410, 900
+
+# GTFS route_type → (display name, fare £ per boarding, CO₂ grams per passenger-km)
+MODES = {
+    0: ("Tram", 2.80, 35),
+    1: ("Subway", 2.80, 35),
+    2: ("Train", 3.50, 41),
+    3: ("Bus", 2.00, 96),
+}
+DEFAULT_MODE = MODES[3]
+
+OPTION_LABELS = {
+    "fastest": "⚡ Fastest",
+    "cheapest": "💸 Cheapest",
+    "orbital": "🛤️ Orbital (avoids city centre)",
+}
+
+
+def haversine_metres(lat1, lng1, lat2, lng2):
+    """Great-circle distance in metres; accepts scalars or NumPy arrays."""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 6_371_000 * 2 * np.arcsin(np.sqrt(a))
+
+
+@dataclass
+class Leg:
+    kind: str                 # "ride" | "walk"
+    from_stop: int
+    to_stop: int
+    depart: int
+    arrive: int
+    pattern: int = -1
+    trip: int = -1
+    board_pos: int = -1
+    alight_pos: int = -1
+
+
+@dataclass
+class Journey:
+    legs: List[Leg]
+    depart: int
+    arrive: int
+    via_centre: bool
+
+    @property
+    def rides(self) -> List[Leg]:
+        return [leg for leg in self.legs if leg.kind == "ride"]
+
+    def shifted(self, seconds: int) -> "Journey":
+        legs = [replace(leg, depart=leg.depart + seconds, arrive=leg.arrive + seconds)
+                for leg in self.legs]
+        return Journey(legs, self.depart + seconds, self.arrive + seconds, self.via_centre)
+
+
+@dataclass
+class _Search:
+    best: List[List[int]]               # [flag][stop] earliest arrival, any means
+    best_ride: List[List[int]]          # [flag][stop] earliest arrival by vehicle
+    targets: set
+    best_target: List[int] = field(default_factory=lambda: [INF, INF])
+    # Per round: (arrivals, rides), each [flag] -> {stop: (time, parent)}
+    rounds: List[tuple] = field(default_factory=list)
+
+
+@dataclass
+class Disruption:
+    """Service changes applied to a search (e.g. from road closures)."""
+    suspended: frozenset = frozenset()                   # patterns not running
+    delays: Dict[int, int] = field(default_factory=dict)  # pattern -> seconds late at every stop
+
+
+def _new_round():
+    return ({}, {}), ({}, {})
+
+
+@dataclass
+class RaptorNetwork:
+    timetable: Timetable
+    # Patterns (CSR over stops, trips and stop-major time blocks)
+    pattern_route: np.ndarray           # int32[n_patterns]
+    pattern_stop_offsets: np.ndarray    # int64[n_patterns + 1]
+    pattern_stops: np.ndarray           # int32[...]
+    pattern_trip_offsets: np.ndarray    # int64[n_patterns + 1]
+    pattern_trips: np.ndarray           # int32[...], sorted by first departure
+    pattern_time_offsets: np.ndarray    # int64[n_patterns + 1]
+    pattern_arrivals: np.ndarray        # int32[...], (n_stops × n_trips) per pattern
+    pattern_departures: np.ndarray      # int32[...]
+    # Stop → (pattern, position in pattern)
+    stop_pattern_offsets: np.ndarray    # int64[n_stops + 1]
+    stop_patterns: np.ndarray           # int32[...]
+    stop_pattern_pos: np.ndarray        # int32[...]
+    # Walking transfers (CSR)
+    transfer_offsets: np.ndarray        # int64[n_stops + 1]
+    transfer_to: np.ndarray             # int32[...]
+    transfer_seconds: np.ndarray        # int32[...]
+    centre: np.ndarray                  # bool[n_stops]
+
+    _stops: List[List[int]] = field(init=False, repr=False)
+    _arr: List[np.ndarray] = field(init=False, repr=False)
+    _dep: List[np.ndarray] = field(init=False, repr=False)
+    _serving: List[List[Tuple[int, int]]] = field(init=False, repr=False)
+    _transfers: List[List[Tuple[int, int]]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        # Python-level views for the hot loop — lists of ints are far faster
+        # to index one element at a time than NumPy scalars.
+        self._stops, self._arr, self._dep = [], [], []
+        for p in range(len(self.pattern_route)):
+            stops = self.pattern_stops[self.pattern_stop_offsets[p]:self.pattern_stop_offsets[p + 1]]
+            n_trips = int(self.pattern_trip_offsets[p + 1] - self.pattern_trip_offsets[p])
+            lo, hi = self.pattern_time_offsets[p], self.pattern_time_offsets[p + 1]
+            self._stops.append(stops.tolist())
+            self._arr.append(self.pattern_arrivals[lo:hi].reshape(len(stops), n_trips))
+            self._dep.append(self.pattern_departures[lo:hi].reshape(len(stops), n_trips))
+        self._serving = [
+            list(zip(self.stop_patterns[a:b].tolist(), self.stop_pattern_pos[a:b].tolist()))
+            for a, b in zip(self.stop_pattern_offsets[:-1], self.stop_pattern_offsets[1:])
+        ]
+        self._transfers = [
+            list(zip(self.transfer_to[a:b].tolist(), self.transfer_seconds[a:b].tolist()))
+            for a, b in zip(self.transfer_offsets[:-1], self.transfer_offsets[1:])
+        ]
+
+    @property
+    def n_patterns(self) -> int:
+        return len(self.pattern_route)
+
+    def pattern(self, p: int) -> Tuple[List[int], np.ndarray, np.ndarray]:
+        """Stops of pattern `p` and its stop-major arrival / departure matrices (n_stops × n_trips)."""
+        return self._stops[p], self._arr[p], self._dep[p]
+
+    # ─── Search ───────────────────────────────────────────────────────────────
+
+    def search(self, origins: Sequence[int], targets: Sequence[int], depart: int,
+               max_transfers: int = 3, disruption: Optional[Disruption] = None) -> List[Journey]:
+        """Run RAPTOR from `origins` at `depart`; return the Pareto journeys reaching `targets`.
+
+        Labels are indexed by flag: 0 = no city-centre interchange so far, 1 = has
+        one. A flag-0 label dominates a flag-1 label with the same or later arrival.
+        Arrivals by vehicle are tracked separately from arrivals on foot, so a
+        walk can start from a stop that was reached earlier by another walk.
+
+        In the small hours the previous service day's trips timed past 24:00:00
+        are searched too (at `depart` + 1 day), with their times shifted back.
+        """
+        journeys = []
+        for offset in self.timetable.service_days(depart):
+            journeys += [journey.shifted(-offset) if offset else journey
+                         for journey in self._search_day(origins, targets, depart + offset, max_transfers,
+                                                          disruption)]
+        return journeys
+
+    def _search_day(self, origins: Sequence[int], targets: Sequence[int], depart: int,
+                    max_transfers: int, disruption: Optional[Disruption]) -> List[Journey]:
+        target_set = set(targets)
+        search = self._run(origins, target_set, depart, max_transfers, disruption)
+        journeys = []
+        for k, (arrivals, _) in enumerate(search.rounds):
+            for flag in (0, 1):
+                reached = [(arrivals[flag][t][0], t) for t in target_set if t in arrivals[flag]]
+                if reached:
+                    journeys.append(self._reconstruct(search.rounds, k, flag, min(reached)[1],
+                                                      disruption.delays if disruption is not None else {}))
+        return [j for j in journeys if j.rides]
+
+    def one_to_all(self, origin: int, depart: int, max_transfers: int = 3,
+                   disruption: Optional[Disruption] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Earliest arrival at every stop from `origin`, for the travel-time matrix.
+
+        Returns (arrive int32[n_stops], rides int8[n_stops], used patterns int32[...]):
+        INF / -1 for unreachable stops, and the patterns ridden on the earliest-arrival
+        journey to any stop — the only patterns whose loss or delay can change the row.
+        """
+        search = self._run([origin], set(), depart, max_transfers, disruption)
+        n_stops = self.timetable.n_stops
+        arrive = np.minimum(np.array(search.best[0], dtype=np.int64), search.best[1]).astype(np.int32)
+        rides = np.full(n_stops, -1, dtype=np.int8)
+        used: set = set()
+        traced: set = set()
+        # Earliest round whose label matches the final arrival: fewest vehicles among the fastest
+        for k, (arrivals, _) in enumerate(search.rounds):
+            for flag in (0, 1):
+                for stop, (t, _) in arrivals[flag].items():
+                    if rides[stop] < 0 and t == arrive[stop] and t == search.best[flag][stop]:
+                        rides[stop] = k
+                        self._trace_patterns(search.rounds, k, flag, stop, used, traced)
+        return arrive, rides, np.array(sorted(used), dtype=np.int32)
+
+    def _run(self, origins: Sequence[int], target_set: set, depart: int, max_transfers: int,
+             disruption: Optional[Disruption]) -> _Search:
+        n_stops = self.timetable.n_stops
+        suspended = disruption.suspended if disruption is not None else frozenset()
+        delays = disruption.delays if disruption is not None else {}
+        search = _Search(
+            best=[[INF] * n_stops, [INF] * n_stops],
+            best_ride=[[INF] * n_stops, [INF] * n_stops],
+            targets=target_set,
+        )
+
+        arrivals, rides = _new_round()
+        for stop in origins:
+            search.best[0][stop] = depart
+            arrivals[0][stop] = (depart, ("origin",))
+            if stop in target_set:
+                search.best_target[0] = depart
+        search.rounds.append((arrivals, rides))
+        marked = set(origins) | self._relax_transfers(0, list(origins), search, arrivals, rides)
+
+        for k in range(1, max_transfers + 2):
+            if not marked:
+                break
+            previous = [search.best[0][:], search.best[1][:]]
+            arrivals, rides = _new_round()
+            search.rounds.append((arrivals, rides))
+
+            # Earliest marked position of each pattern touched in the last round
+            queue: Dict[int, int] = {}
+            for stop in marked:
+                for pattern, pos in self._serving[stop]:
+                    if pos < queue.get(pattern, INF) and pattern not in suspended:
+                        queue[pattern] = pos
+
+            for pattern, start in queue.items():
+                self._scan_pattern(k, pattern, start, previous, search, arrivals, rides,
+                                   delays.get(pattern, 0))
+            ridden = set(rides[0]) | set(rides[1])
+            marked = {s for s in ridden if s in arrivals[0] or s in arrivals[1]}
+            marked |= self._relax_transfers(k, list(ridden), search, arrivals, rides)
+        return search
+
+    def _scan_pattern(self, k, pattern, start, previous, search, arrivals, rides, delay=0):
+        stops = self._stops[pattern]
+        arr, dep = self._arr[pattern], self._dep[pattern]
+        best, best_ride, best_target = search.best, search.best_ride, search.best_target
+        # Active trip per flag: (column, board position, source flag, arrivals, departures)
+        active: List[Optional[tuple]] = [None, None]
+        for i in range(start, len(stops)):
+            stop = stops[i]
+
+            # Alight: carry the active trip's arrival to this stop
+            for flag in (0, 1):
+                trip = active[flag]
+                if trip is None:
+                    continue
+                t = trip[3][i]
+                if t >= min(best_ride[flag][stop], best_ride[0][stop], best_target[flag], best_target[0]):
+                    continue
+                label = (t, ("ride", pattern, trip[0], trip[1], i, trip[2]))
+                best_ride[flag][stop] = t
+                rides[flag][stop] = label
+                if t < min(best[flag][stop], best[0][stop]):
+                    best[flag][stop] = t
+                    arrivals[flag][stop] = label
+                    if stop in search.targets:
+                        best_target[flag] = t
+
+            # Board: catch the earliest trip departing after the previous-round label
+            if i == len(stops) - 1:
+                continue
+            centre_change = k >= 2 and bool(self.centre[stop])
+            for source in (0, 1):
+                ready = previous[source][stop]
+                if ready == INF:
+                    continue
+                if k >= 2:
+                    ready += MIN_CHANGE_SECONDS
+                flag = source | centre_change
+                trip = active[flag]
+                if trip is not None and trip[4][i] < ready:
+                    continue
+                column = int(np.searchsorted(dep[i], ready - delay, side="left"))
+                if column >= dep.shape[1]:
+                    continue
+                if trip is None or column < trip[0]:
+                    times = arr[:, column].tolist(), dep[:, column].tolist()
+                    if delay:
+                        times = [t + delay for t in times[0]], [t + delay for t in times[1]]
+                    active[flag] = (column, i, source, *times)
+
+    def _relax_transfers(self, k, stops, search, arrivals, rides):
+        """Walk from stops reached in round k (by vehicle, or the origins in round 0)."""
+        best, best_target = search.best, search.best_target
+        source_labels = rides if k else arrivals
+        reached = set()
+        for flag in (0, 1):
+            for stop in stops:
+                if stop not in source_labels[flag]:
+                    continue
+                start = source_labels[flag][stop][0]
+                walk_flag = flag | (k >= 1 and bool(self.centre[stop]))
+                for to_stop, seconds in self._transfers[stop]:
+                    t = start + seconds
+                    if t >= min(best[walk_flag][to_stop], best[0][to_stop], best_target[walk_flag], best_target[0]):
+                        continue
+                    best[walk_flag][to_stop] = t
+                    arrivals[walk_flag][to_stop] = (t, ("walk", stop, flag))
+                    reached.add(to_stop)
+                    if to_stop in search.targets:
+                        best_target[walk_flag] = t
+        return reached
+
+    def _trace_patterns(self, rounds, k, flag, stop, used: set, traced: set) -> None:
+        """Add the patterns ridden on the journey behind arrival label (k, flag, stop) to `used`."""
+        label, key = rounds[k][0][flag][stop], (k, flag, stop, False)
+        while key not in traced:
+            traced.add(key)
+            parent = label[1]
+            if parent[0] == "origin":
+                return
+            if parent[0] == "walk":
+                _, stop, flag = parent
+                source = rounds[k][1] if k else rounds[k][0]
+                label, key = source[flag][stop], (k, flag, stop, k > 0)
+                continue
+            _, pattern, _, board_pos, _, flag = parent
+            used.add(pattern)
+            stop = self._stops[pattern][board_pos]
+            k -= 1
+            while stop not in rounds[k][0][flag]:
+                k -= 1
+            label, key = rounds[k][0][flag][stop], (k, flag, stop, False)
+
+    def _reconstruct(self, rounds, k, flag, stop, delays) -> Journey:
+        via_centre = bool(flag)
+        arrive, parent = rounds[k][0][flag][stop]
+        legs: List[Leg] = []
+        while parent[0] != "origin":
+            if parent[0] == "walk":
+                _, from_stop, from_flag = parent
+                source = rounds[k][1] if k else rounds[k][0]
+                walk_start, parent = source[from_flag][from_stop]
+                legs.append(Leg("walk", from_stop, stop, walk_start, arrive))
+                stop, flag, arrive = from_stop, from_flag, walk_start
+                continue
+            _, pattern, column, board_pos, alight_pos, from_flag = parent
+            trip = int(self.pattern_trips[self.pattern_trip_offsets[pattern] + column])
+            board_stop = self._stops[pattern][board_pos]
+            board_time = int(self._dep[pattern][board_pos, column]) + delays.get(pattern, 0)
+            legs.append(Leg("ride", board_stop, stop, board_time,
+                            arrive, pattern, trip, board_pos, alight_pos))
+            # The boarding label was set in the latest earlier round that reached it
+            k -= 1
+            while board_stop not in rounds[k][0][from_flag]:
+                k -= 1
+            stop, flag = board_stop, from_flag
+            arrive, parent = rounds[k][0][flag][stop]
+        legs.reverse()
+        depart = legs[0].depart if legs else arrive
+        if legs and legs[0].kind == "walk" and len(legs) > 1:
+            # Leave the origin just in time for the first vehicle
+            walk_seconds = legs[0].arrive - legs[0].depart
+            legs[0].arrive = legs[1].depart
+            legs[0].depart = depart = legs[1].depart - walk_seconds
+        return Journey(legs=legs, depart=depart, arrive=legs[-1].arrive if legs else arrive,
+                       via_centre=via_centre)
+
+    # ─── Presentation ─────────────────────────────────────────────────────────
+
+    def mode(self, leg: Leg) -> Tuple[str, float, int]:
+        route = self.pattern_route[leg.pattern]
+        return MODES.get(int(self.timetable.route_type[route]), DEFAULT_MODE)
+
+    def fare(self, journey: Journey) -> float:
+        return round(sum(self.mode(leg)[1] for leg in journey.rides), 2)
+
+    def co2_grams(self, journey: Journey) -> int:
+        tt = self.timetable
+        grams = 0.0
+        for leg in journey.rides:
+            path = np.array(self._stops[leg.pattern][leg.board_pos:leg.alight_pos + 1])
+            km = haversine_metres(tt.stop_lat[path[:-1]], tt.stop_lon[path[:-1]],
+                                  tt.stop_lat[path[1:]], tt.stop_lon[path[1:]]).sum() / 1000
+            grams += km * self.mode(leg)[2]
+        return int(round(grams))
+
+    def describe(self, journey: Journey) -> List[str]:
+        tt = self.timetable
+        lines = []
+        for leg in journey.legs:
+            if leg.kind == "walk":
+                minutes = max(1, math.ceil((leg.arrive - leg.depart) / 60))
+                lines.append(f"Walk {minutes} min to {tt.stop_names[leg.to_stop]}")
+                continue
+            name = self.mode(leg)[0]
+            route = tt.route_names[self.pattern_route[leg.pattern]]
+            platform = tt.stop_platforms[leg.from_stop]
+            origin = tt.stop_names[leg.from_stop] + (f" (Plat {platform})" if platform else "")
+            lines.append(f"{name} {route} from {origin} to {tt.stop_names[leg.to_stop]}")
+        return lines
+
+    def to_option(self, kind: str, journey: Journey) -> RouteOption:
+        rides = journey.rides
+        changes = len(rides) - 1
+        if changes == 0:
+            summary = "Direct service, no changes needed."
+        else:
+            via = ", ".join(self.timetable.stop_names[leg.from_stop] for leg in rides[1:])
+            summary = f"{changes} change{'s' if changes > 1 else ''} via {via}."
+        if kind == "orbital":
+            summary += " Avoids changing in the city centre."
+        return RouteOption(
+            type=kind,
+            label=OPTION_LABELS[kind],
+            duration_minutes=max(1, math.ceil((journey.arrive - journey.depart) / 60)),
+            cost_gbp=self.fare(journey),
+            changes=changes,
+            legs=self.describe(journey),
+            co2_grams=self.co2_grams(journey),
+            summary=summary,
+        )
+
+    def plan(self, origins: Sequence[int], targets: Sequence[int], depart: int,
+             max_transfers: int = 3, disruption: Optional[Disruption] = None) -> List[RouteOption]:
+        """Fastest, cheapest and orbital options from one RAPTOR search."""
+        journeys = self.search(origins, targets, depart, max_transfers, disruption)
+        if not journeys:
+            return []
+        fastest = min(journeys, key=lambda j: (j.arrive, len(j.rides)))
+        cheapest = min(journeys, key=lambda j: (self.fare(j), j.arrive))
+        options = [self.to_option("fastest", fastest)]
+        if cheapest is not fastest and self.fare(cheapest) < self.fare(fastest):
+            options.append(self.to_option("cheapest", cheapest))
+        orbital = [j for j in journeys if not j.via_centre]
+        if orbital:
+            options.append(self.to_option("orbital", min(orbital, key=lambda j: j.arrive)))
+        return options
+
+
+# ─── Network build ────────────────────────────────────────────────────────────
+
+def _build_patterns(tt: Timetable):
+    """Group trips by stop sequence, splitting groups where a trip overtakes another."""
+    groups: Dict[Tuple[int, ...], List[int]] = {}
+    for trip in range(tt.n_trips):
+        lo, hi = tt.trip_offsets[trip], tt.trip_offsets[trip + 1]
+        if hi - lo >= 2:
+            groups.setdefault(tuple(tt.st_stop[lo:hi].tolist()), []).append(trip)
+
+    patterns = []   # (stops, [trips], route)
+    for stops, trips in groups.items():
+        trips.sort(key=lambda t: tt.st_departure[tt.trip_offsets[t]])
+        subgroups: List[List[int]] = []
+        for trip in trips:
+            lo, hi = tt.trip_offsets[trip], tt.trip_offsets[trip + 1]
+            for group in subgroups:
+                last = group[-1]
+                llo, lhi = tt.trip_offsets[last], tt.trip_offsets[last + 1]
+                if np.all(tt.st_departure[llo:lhi] <= tt.st_departure[lo:hi]):
+                    group.append(trip)
+                    break
+            else:
+                subgroups.append([trip])
+        for group in subgroups:
+            patterns.append((stops, group, int(tt.trip_route[group[0]])))
+    return patterns
+
+
+def _build_transfers(tt: Timetable):
+    """Walking links between stops within MAX_WALK_METRES, via a coarse lat/lng grid."""
+    cell = MAX_WALK_METRES / 111_000
+    cells: Dict[Tuple[int, int], List[int]] = {}
+    keys = np.stack([np.floor(tt.stop_lat / cell), np.floor(tt.stop_lon / cell)], axis=1).astype(np.int64)
+    for stop, (x, y) in enumerate(keys.tolist()):
+        cells.setdefault((x, y), []).append(stop)
+
+    offsets = np.zeros(tt.n_stops + 1, dtype=np.int64)
+    to_stops, seconds = [], []
+    for stop, (x, y) in enumerate(keys.tolist()):
+        near = [s for dx in (-1, 0, 1) for dy in (-2, -1, 0, 1, 2) for s in cells.get((x + dx, y + dy), ())
+                if s != stop]
+        if near:
+            near = np.array(near)
+            metres = haversine_metres(tt.stop_lat[stop], tt.stop_lon[stop], tt.stop_lat[near], tt.stop_lon[near])
+            keep = metres <= MAX_WALK_METRES
+            to_stops.extend(near[keep].tolist())
+            seconds.extend(np.ceil(metres[keep] / WALK_SPEED_MPS).astype(int).tolist())
+        offsets[stop + 1] = len(to_stops)
+    return offsets, np.array(to_stops, dtype=np.int32), np.array(seconds, dtype=np.int32)
+
+
+def build_network(tt: Timetable) -> RaptorNetwork:
+    patterns = _build_patterns(tt)
+    n = len(patterns)
+    pattern_route = np.array([route for _, _, route in patterns], dtype=np.int32)
+    stop_offsets = np.zeros(n + 1, dtype=np.int64)
+    trip_offsets = np.zeros(n + 1, dtype=np.int64)
+    time_offsets = np.zeros(n + 1, dtype=np.int64)
+    for p, (stops, trips, _) in enumerate(patterns):
+        stop_offsets[p + 1] = stop_offsets[p] + len(stops)
+        trip_offsets[p + 1] = trip_offsets[p] + len(trips)
+        time_offsets[p + 1] = time_offsets[p] + len(stops) * len(trips)
+
+    pattern_stops = np.concatenate([np.array(s, dtype=np.int32) for s, _, _ in patterns]) if n else np.empty(0, np.int32)
+    pattern_trips = np.concatenate([np.array(t, dtype=np.int32) for _, t, _ in patterns]) if n else np.empty(0, np.int32)
+    arrivals = np.empty(time_offsets[-1], dtype=np.int32)
+    departures = np.empty(time_offsets[-1], dtype=np.int32)
+    for p, (stops, trips, _) in enumerate(patterns):
+        rows = tt.trip_offsets[np.array(trips)][None, :] + np.arange(len(stops))[:, None]
+        arrivals[time_offsets[p]:time_offsets[p + 1]] = tt.st_arrival[rows].ravel()
+        departures[time_offsets[p]:time_offsets[p + 1]] = tt.st_departure[rows].ravel()
+
+    # Stop → serving patterns, sorted by stop
+    pos_in_pattern = np.concatenate([np.arange(len(s), dtype=np.int32) for s, _, _ in patterns]) if n else np.empty(0, np.int32)
+    pattern_of = np.repeat(np.arange(n, dtype=np.int32), np.diff(stop_offsets))
+    order = np.argsort(pattern_stops, kind="stable")
+    stop_pattern_offsets = np.zeros(tt.n_stops + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pattern_stops, minlength=tt.n_stops), out=stop_pattern_offsets[1:])
+
+    transfer_offsets, transfer_to, transfer_seconds = _build_transfers(tt)
+    centre = haversine_metres(CENTRE_LAT, CENTRE_LNG, tt.stop_lat, tt.stop_lon) <= CENTRE_RADIUS_METRES
+
+    return RaptorNetwork(
+        timetable=tt,
+        pattern_route=pattern_route,
+        pattern_stop_offsets=stop_offsets,
+        pattern_stops=pattern_stops,
+        pattern_trip_offsets=trip_offsets,
+        pattern_trips=pattern_trips,
+        pattern_time_offsets=time_offsets,
+        pattern_arrivals=arrivals,
+        pattern_departures=departures,
+        stop_pattern_offsets=stop_pattern_offsets,
+        stop_patterns=pattern_of[order],
+        stop_pattern_pos=pos_in_pattern[order],
+        transfer_offsets=transfer_offsets,
+        transfer_to=transfer_to,
+        transfer_seconds=transfer_seconds,
+        centre=centre,
+    )
+
+
+def closure_disruption(network: RaptorNetwork, affected: Iterable[AffectedRoute]) -> Disruption:
+    """Suspend or delay every pattern of the routes a road closure affects (matched by route name)."""
+    tt = network.timetable
+    by_name: Dict[str, List[int]] = {}
+    for p, route in enumerate(network.pattern_route.tolist()):
+        by_name.setdefault(tt.route_names[route], []).append(p)
+    suspended, delays = set(), {}
+    for route in affected:
+        for p in by_name.get(route.route, ()):
+            if route.impact == "suspended":
+                suspended.add(p)
+            elif route.extra_minutes:
+                delays[p] = delays.get(p, 0) + route.extra_minutes * 60
+    return Disruption(frozenset(suspended), {p: d for p, d in delays.items() if p not in suspended})
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+# The "network" and "disruption" entries of the dataset registry, swapped
+# together since pattern numbers are per network.
+
+NO_DISRUPTION = Disruption()
+
+
+def init_planner(timetable: Optional[Timetable], prebuilt: Optional[RaptorNetwork] = None) -> Optional[RaptorNetwork]:
+    network = prebuilt if prebuilt is not None else build_network(timetable) if timetable is not None else None
+    registry.publish(network=network, disruption=NO_DISRUPTION)
+    return network
+
+
+def get_planner() -> Optional[RaptorNetwork]:
+    return registry.get("network")
+
+
+def set_disruption(disruption: Disruption) -> None:
+    """Service changes every search applies from now on (see app.routers.admin closures)."""
+    registry.publish(disruption=disruption)
+
+
+def get_disruption() -> Disruption:
+    return registry.get("disruption", NO_DISRUPTION)
+
+
+def disruption_version() -> int:
+    """Changes whenever the active disruption changes; part of dependent cache keys."""
+    return registry.version("disruption")
@@ -0,0 +1,204 @@
+"""
+Sampling Profiler — opt-in stack sampling for slow requests, flamegraph-ready.
+
+A background thread snapshots the Python stack of every other thread (the
+event loop and the worker threads running `asyncio.to_thread` jobs) every
+`interval` seconds into a time-stamped ring buffer. Nothing runs until the
+profiler is started, and the cost per request is two clock reads.
+
+Ways to get a profile (all gated on SMARTBEE_ADMIN_TOKEN, see app.routers.admin):
+
+  - `X-Profile: <token>` on any request samples while it runs; the profile id
+    comes back in the `X-Profile-Id` response header
+  - arming slow-request capture (`POST /admin/profiler?slow_ms=250`) keeps
+    the sampler running and stores a profile for every request slower than that
+  - `GET /admin/profile?seconds=5` captures the whole process for a while
+
+Profiles are collapsed stacks ("thread;outer;...;inner count" per line), the
+input format of flamegraph.pl, speedscope and inferno.
+
+HACKATHON: One event loop per process, so a request's profile also contains
+           whatever else the loop ran concurrently.
+PRODUCTION: Use py-spy for native frames and whole-fleet sampling.
+"""
+
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Tuple
+
+DEFAULT_INTERVAL = 0.005
+MAX_STACK_DEPTH = 128
+# Innermost frames of threads that are parked, not working (idle pool workers, the loop's select)
+IDLE_FRAMES = {
+    ("wait", "threading.py"), ("get", "queue.py"), ("_worker", "thread.py"),
+    ("select", "selectors.py"), ("_run_once", "base_events.py"),
+}
+
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse_stack(frame, thread_name: str) -> str:
+    stack: List[str] = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    stack.append(thread_name)
+    return ";".join(reversed(stack))
+
+
+@dataclass
+class Profile:
+    id: int
+    method: str
+    path: str
+    started_at: float
+    duration_ms: float
+    stacks: Dict[str, int] = field(repr=False)
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def summary(self) -> Dict[str, object]:
+        return {"id": self.id, "method": self.method, "path": self.path,
+                "started_at": self.started_at, "duration_ms": round(self.duration_ms, 1),
+                "samples": self.samples}
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+
+class SamplingProfiler:
+    def __init__(self, interval: float = DEFAULT_INTERVAL, window_seconds: float = 120.0,
+                 max_profiles: int = 50):
+        self.interval = interval
+        self.slow_ms: Optional[float] = None      # armed slow-request capture threshold
+        self.profiles: "OrderedDict[int, Profile]" = OrderedDict()
+        self.max_profiles = max_profiles
+        self._samples: Deque[Tuple[float, str]] = deque(maxlen=int(window_seconds / interval))
+        self._lock = threading.Lock()
+        self._users = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop: Optional[threading.Event] = None
+        self._ids = itertools.count(1)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def acquire(self) -> None:
+        """Start sampling (reference counted: every `acquire` needs a `release`)."""
+        with self._lock:
+            self._users += 1
+            if self._thread is None:
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,),
+                                                name="smartbee-profiler", daemon=True)
+                self._thread.start()
+
+    def release(self) -> None:
+        with self._lock:
+            self._users = max(0, self._users - 1)
+            if self._users or self._thread is None:
+                return
+            # Don't join: the sampler notices within one interval and the caller may be the event loop
+            self._thread = None
+            self._stop.set()
+
+    def arm(self, slow_ms: float) -> None:
+        if self.slow_ms is None:
+            self.acquire()
+        self.slow_ms = slow_ms
+
+    def disarm(self) -> None:
+        if self.slow_ms is not None:
+            self.slow_ms = None
+            self.release()
+
+    def _run(self, stop: threading.Event) -> None:
+        own = threading.get_ident()
+        while not stop.wait(self.interval):
+            now = time.perf_counter()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                code = frame.f_code
+                if ident != own and (code.co_name, os.path.basename(code.co_filename)) not in IDLE_FRAMES:
+                    self._samples.append((now, collapse_stack(frame, names.get(ident, str(ident)))))
+
+    def stacks_between(self, start: float, end: float) -> Dict[str, int]:
+        return dict(Counter(stack for t, stack in list(self._samples) if start <= t <= end))
+
+    def record(self, method: str, path: str, start: float, end: float) -> Profile:
+        """Store the samples taken between perf_counter() `start` and `end` as a profile."""
+        profile = Profile(
+            id=next(self._ids), method=method, path=path,
+            started_at=time.time() - (time.perf_counter() - start),
+            duration_ms=(end - start) * 1000, stacks=self.stacks_between(start, end),
+        )
+        self.profiles[profile.id] = profile
+        while len(self.profiles) > self.max_profiles:
+            self.profiles.popitem(last=False)
+        return profile
+
+
+class ProfilingMiddleware:
+    """Profiles requests carrying `X-Profile: <token>`, and slow requests while armed."""
+
+    def __init__(self, app, profiler: SamplingProfiler, token: Optional[str]):
+        self.app = app
+        self.profiler = profiler
+        self.token = token.encode() if token else None
+
+    async def __call__(self, scope, receive, send):
+        profiler = self.profiler
+        if scope["type"] != "http" or self.token is None:
+            await self.app(scope, receive, send)
+            return
+
+        requested = any(name == b"x-profile" and value == self.token for name, value in scope["headers"])
+        if not requested and profiler.slow_ms is None:
+            await self.app(scope, receive, send)
+            return
+
+        if requested:
+            profiler.acquire()
+        start = time.perf_counter()
+        streaming = False
+
+        async def send_wrapper(message):
+            nonlocal streaming
+            if message["type"] == "http.response.start":
+                streaming = any(name == b"content-type" and value.startswith(b"text/event-stream")
+                                for name, value in message.get("headers", ()))
+            if requested and message["type"] == "http.response.start":
+                # Sampling stops at the first response byte; the profile id goes in its headers
+                end = time.perf_counter()
+                profile = profiler.record(scope["method"], scope["path"], start, end)
+                message = {**message, "headers": [*message.get("headers", ()),
+                                                  (b"x-profile-id", str(profile.id).encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            end = time.perf_counter()
+            if requested:
+                profiler.release()
+            elif not streaming and profiler.slow_ms is not None and (end - start) * 1000 >= profiler.slow_ms:
+                profiler.record(scope["method"], scope["path"], start, end)
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+
+_profiler = SamplingProfiler()
+
+
+def get_profiler() -> SamplingProfiler:
+    return _profiler
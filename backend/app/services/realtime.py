@@ -0,0 +1,168 @@
+"""
+GTFS-Realtime Ingestion — background TripUpdates polling with delta application.
+
+A `RealtimePoller` task (started from the app lifespan) fetches a GTFS-RT
+TripUpdates feed every `GTFS_RT_POLL_SECONDS`, decodes it off the event loop
+and hands the per-trip (delay, cancelled) pairs to `RealtimeState.apply`.
+
+`RealtimeState` holds two arrays aligned with the timetable's trips. Each
+update diffs the new feed against the previous one and writes only the trips
+whose delay or cancellation changed (plus resets for trips that dropped out of
+the feed), so the cost is O(changed trips) and the arrival index itself is
+never rebuilt. Requests read the arrays directly and never wait on upstream I/O.
+
+The source may be an http(s) URL, fetched through the "gtfs_rt" upstream client
+(app.services.upstream: pooled, deadline-bounded, retried, circuit-broken), or
+a local file path (handy for replaying a captured feed in development).
+
+HACKATHON: One delay per trip (the first stop_time_update with a delay).
+PRODUCTION: Keep per-stop delays and propagate them downstream along the trip.
+"""
+
+import asyncio
+import logging
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from app import config
+from app.services import registry
+from app.services.timetable import Timetable
+from app.services.upstream import Upstream, UpstreamError, get_upstream, open_upstream
+
+logger = logging.getLogger(__name__)
+
+TripDeltas = Dict[str, Tuple[int, bool]]   # trip_id -> (delay seconds, cancelled)
+
+
+def decode_trip_updates(payload: bytes) -> Tuple[int, TripDeltas]:
+    """Decode a TripUpdates FeedMessage into (header timestamp, per-trip deltas)."""
+    from google.transit import gtfs_realtime_pb2
+
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.ParseFromString(payload)
+    canceled = gtfs_realtime_pb2.TripDescriptor.CANCELED
+    deltas: TripDeltas = {}
+    for entity in feed.entity:
+        if not entity.HasField("trip_update"):
+            continue
+        update = entity.trip_update
+        trip_id = update.trip.trip_id
+        if not trip_id:
+            continue
+        delay = update.delay if update.HasField("delay") else 0
+        for stu in update.stop_time_update:
+            event = stu.departure if stu.HasField("departure") else stu.arrival
+            if event.HasField("delay"):
+                delay = event.delay
+                break
+        deltas[trip_id] = (delay, update.trip.schedule_relationship == canceled)
+    return feed.header.timestamp, deltas
+
+
+class RealtimeState:
+    """Live per-trip delays and cancellations over a loaded timetable."""
+
+    def __init__(self, timetable: Timetable):
+        self.trip_index = {trip_id: i for i, trip_id in enumerate(timetable.trip_ids)}
+        self.trip_delay = np.zeros(timetable.n_trips, dtype=np.int32)       # seconds
+        self.trip_cancelled = np.zeros(timetable.n_trips, dtype=bool)
+        self.version = 0
+        self.feed_timestamp = 0
+        self._current: Dict[int, Tuple[int, bool]] = {}
+
+    def rebased(self, timetable: Timetable) -> "RealtimeState":
+        """A state for a newly loaded `timetable` carrying the last applied feed over."""
+        trip_ids = {i: trip_id for trip_id, i in self.trip_index.items()}
+        state = RealtimeState(timetable)
+        state.apply(self.feed_timestamp, {trip_ids[t]: value for t, value in self._current.items()})
+        return state
+
+    def apply(self, feed_timestamp: int, deltas: TripDeltas) -> int:
+        """Apply one decoded feed; returns the number of trips whose state changed."""
+        if feed_timestamp and feed_timestamp == self.feed_timestamp:
+            return 0
+        incoming = {}
+        for trip_id, value in deltas.items():
+            trip = self.trip_index.get(trip_id)
+            if trip is not None:
+                incoming[trip] = value
+        changed = [t for t, value in incoming.items() if self._current.get(t) != value]
+        dropped = [t for t in self._current if t not in incoming]
+
+        if changed:
+            trips = np.array(changed, dtype=np.int64)
+            self.trip_delay[trips] = [incoming[t][0] for t in changed]
+            self.trip_cancelled[trips] = [incoming[t][1] for t in changed]
+        if dropped:
+            trips = np.array(dropped, dtype=np.int64)
+            self.trip_delay[trips] = 0
+            self.trip_cancelled[trips] = False
+
+        self._current = incoming
+        self.feed_timestamp = feed_timestamp
+        if changed or dropped:
+            self.version += 1
+        return len(changed) + len(dropped)
+
+
+def read_feed(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+class RealtimePoller:
+    """Applies each feed to the latest published state (a timetable reload swaps it)."""
+
+    def __init__(self, source: str, interval: float, upstream: Optional[Upstream] = None):
+        self.source = source
+        self.interval = interval
+        self.upstream = upstream
+
+    async def poll_once(self) -> int:
+        # File reads and the protobuf decode run in a worker thread; only the
+        # O(changed) array writes happen on the event loop.
+        if self.upstream is not None:
+            response = await self.upstream.get()
+            if response.stale:
+                return 0    # upstream down: the stale copy was applied when it was fresh
+            if response.status != 200:
+                raise UpstreamError(self.upstream.name, f"HTTP {response.status}")
+            payload = response.content
+        else:
+            payload = await asyncio.to_thread(read_feed, self.source)
+        feed_timestamp, deltas = await asyncio.to_thread(decode_trip_updates, payload)
+        state = registry.latest().get("realtime")
+        return state.apply(feed_timestamp, deltas) if state is not None else 0
+
+    async def run(self) -> None:
+        while True:
+            try:
+                changed = await self.poll_once()
+                logger.debug("GTFS-RT update applied: %d trips changed", changed)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("GTFS-RT poll of %s failed", self.source, exc_info=True)
+            await asyncio.sleep(self.interval)
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+# The "realtime" entry of the dataset registry, swapped along with the timetable.
+
+def start_realtime(timetable: Optional[Timetable], source: Optional[str] = None) -> Optional[asyncio.Task]:
+    """Create the realtime state and start polling; returns the task (None if disabled)."""
+    source = source or config.GTFS_RT_URL
+    if timetable is None or not source:
+        registry.publish(realtime=None)
+        return None
+    registry.publish(realtime=RealtimeState(timetable))
+    client = None
+    if source.startswith(("http://", "https://")):
+        client = get_upstream("gtfs_rt") or open_upstream("gtfs_rt", source)
+    poller = RealtimePoller(source, config.GTFS_RT_POLL_SECONDS, client)
+    return asyncio.create_task(poller.run(), name="gtfs-rt-poller")
+
+
+def get_realtime() -> Optional[RealtimeState]:
+    return registry.get("realtime")
@@ -0,0 +1,117 @@
+"""
+Dataset Registry — versioned, immutable snapshots of the loaded datasets.
+
+Every dataset requests read (timetable, stop resolver, RAPTOR network and its
+disruption, road graph and its closures, heatmap tiles, stop event history,
+demand model, realtime state, travel-time matrix) is an entry of one
+`Snapshot`: a read-only mapping plus a version number. A published snapshot
+is never modified. Writers build new datasets off the event loop (a worker
+thread, or a separate process for a full reload; see
+app.services.snapshot.reload_datasets) and `publish` the changed entries,
+which creates the next snapshot and rebinds the module reference to it: one
+atomic assignment, and no lock anywhere on the read path.
+
+Readers pin one snapshot per request. `RegistryMiddleware` stores the latest
+snapshot in a context variable, which `asyncio.to_thread` and child tasks
+inherit, so every `get_*()` a request makes (and every cache-key version it
+computes) sees the same datasets even if a swap lands mid-request. Requests
+already running finish on the snapshot they started with; the old datasets
+are freed when the last of them ends.
+
+`Snapshot.version` is sent as the `X-Data-Version` response header. Each
+entry also keeps the version that last replaced it (`version(name)`), which
+the services' `data_version()` report, so swapping one dataset leaves cache
+entries built on the others valid.
+
+HACKATHON: Realtime delays are still written in place, O(changed trips) per
+           feed (app.services.realtime); only a new timetable swaps them.
+           The history store's partitions are appended in place too; only
+           `init_history` swaps the store (app.services.history).
+PRODUCTION: Publish through app.serve's shared file so every worker swaps.
+"""
+
+import contextlib
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Iterator, Mapping, Optional
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    version: int
+    entries: Mapping[str, Any]
+    versions: Mapping[str, int]     # entry -> snapshot version that last replaced it
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return self.entries.get(name, default)
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+
+_current = Snapshot(0, MappingProxyType({}), MappingProxyType({}))
+_pinned: ContextVar[Optional[Snapshot]] = ContextVar("smartbee_datasets", default=None)
+_publishing = threading.Lock()      # serialises writers; readers never take it
+
+
+def current() -> Snapshot:
+    """The snapshot pinned for this request (or task), else the latest one."""
+    return _pinned.get() or _current
+
+
+def latest() -> Snapshot:
+    return _current
+
+
+def get(name: str, default: Any = None) -> Any:
+    return current().get(name, default)
+
+
+def version(name: str) -> int:
+    """Snapshot version that last replaced entry `name` (0 = never published)."""
+    return current().versions.get(name, 0)
+
+
+def publish(**entries: Any) -> Snapshot:
+    """Swap in a new snapshot with `entries` replaced; requests see it from their next pin."""
+    global _current
+    with _publishing:
+        number = _current.version + 1
+        _current = Snapshot(
+            number,
+            MappingProxyType({**_current.entries, **entries}),
+            MappingProxyType({**_current.versions, **dict.fromkeys(entries, number)}),
+        )
+        return _current
+
+
+@contextlib.contextmanager
+def pinned(snapshot: Optional[Snapshot] = None) -> Iterator[Snapshot]:
+    """Pin `snapshot` (default: the latest) for the code inside the block."""
+    token = _pinned.set(snapshot or _current)
+    try:
+        yield _pinned.get()
+    finally:
+        _pinned.reset(token)
+
+
+class RegistryMiddleware:
+    """Pin the latest snapshot for each HTTP request and report its version (`X-Data-Version`)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with pinned() as snapshot:
+            header = (b"x-data-version", str(snapshot.version).encode())
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    message = {**message, "headers": [*message.get("headers", []), header]}
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
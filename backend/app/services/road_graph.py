@@ -0,0 +1,371 @@
+"""
+Road Closure Engine — road graph, route-to-edge mapping and detour search.
+
+Loads a road graph from a local JSON file:
+
+    {
+      "nodes":  [[node_id, lat, lng], ...],
+      "edges":  [[from_node, to_node, length_m, speed_kph, road_id, road_name], ...],
+      "routes": {"42": [[lat, lng], ...], ...}
+    }
+
+Edges are directed (two-way roads list both directions). Each route shape is
+snapped to the graph and expanded to an edge path once at load time, and an
+edge → routes index (CSR) records every route crossing every edge. A closure
+therefore only touches the routes on the closed edges, and only the closed
+stretches of those routes are re-routed: each detour is a bounded A* search
+between the nodes either side of the closure, shared between routes that
+cross the same stretch. Results are memoised per road. Passenger numbers
+come from app.services.demand.
+
+HACKATHON: Detours use free-flow speeds.
+PRODUCTION: Feed live link speeds from the TfGM Traffic Management feed.
+"""
+
+import heapq
+import json
+import math
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app import config
+from app.models.schemas import AffectedRoute, ClosureImpactResponse
+from app.services import registry
+from app.services.planner import haversine_metres
+
+# Extra minutes a diversion can add before the route is treated as suspended
+MAX_DETOUR_MINUTES = 45
+# Closures adding at most this many minutes are absorbed as delays, not diversions
+DELAY_ONLY_MINUTES = 5
+
+SNAP_CELL_DEGREES = 0.002
+
+
+@dataclass
+class Detour:
+    extra_seconds: float
+    via_road: Optional[int]    # road index carrying most of the detour, None if suspended
+
+
+@dataclass
+class RoadGraph:
+    node_ids: List[str]
+    road_ids: List[str]
+    road_names: List[str]
+    route_names: List[str]
+
+    node_lat: np.ndarray            # float64[n_nodes]
+    node_lng: np.ndarray            # float64[n_nodes]
+    edge_from: np.ndarray           # int32[n_edges]
+    edge_to: np.ndarray             # int32[n_edges]
+    edge_seconds: np.ndarray        # float32[n_edges], free-flow travel time
+    edge_road: np.ndarray           # int32[n_edges]
+    adj_offsets: np.ndarray         # int64[n_nodes + 1], CSR over edges sorted by edge_from
+    adj_edges: np.ndarray           # int32[n_edges]
+    road_offsets: np.ndarray        # int64[n_roads + 1], CSR over edges grouped by road
+    road_edges: np.ndarray          # int32[n_edges]
+    route_offsets: np.ndarray       # int64[n_routes + 1], CSR over each route's edge path
+    route_edges: np.ndarray         # int32[...]
+    edge_route_offsets: np.ndarray  # int64[n_edges + 1], CSR: routes crossing each edge
+    edge_routes: np.ndarray         # int32[...]
+
+    road_index: Dict[str, int] = field(init=False, repr=False)
+    _max_speed: float = field(init=False, repr=False)
+    _adjacency: List[List[Tuple[int, int, float]]] = field(init=False, repr=False)
+    _impacts: Dict[str, List[AffectedRoute]] = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.road_index = {road_id: i for i, road_id in enumerate(self.road_ids)}
+        # One pass over all edges, then plain list slices per node (no per-node NumPy calls)
+        edges = self.adj_edges.tolist()
+        arcs = list(zip(edges, self.edge_to[self.adj_edges].tolist(), self.edge_seconds[self.adj_edges].tolist()))
+        self._adjacency = [arcs[a:b] for a, b in zip(self.adj_offsets[:-1].tolist(), self.adj_offsets[1:].tolist())]
+        self._max_speed = float(np.max(
+            haversine_metres(self.node_lat[self.edge_from], self.node_lng[self.edge_from],
+                             self.node_lat[self.edge_to], self.node_lng[self.edge_to])
+            / np.maximum(self.edge_seconds, 1e-3)
+        )) if len(self.edge_from) else 1.0
+        self._impacts = {}
+
+    def has_road(self, road_id: str) -> bool:
+        return road_id in self.road_index
+
+    def edges_of_road(self, road: int) -> np.ndarray:
+        return self.road_edges[self.road_offsets[road]:self.road_offsets[road + 1]]
+
+    def route_path(self, route: int) -> np.ndarray:
+        return self.route_edges[self.route_offsets[route]:self.route_offsets[route + 1]]
+
+    def routes_crossing(self, edges: np.ndarray) -> np.ndarray:
+        if not len(edges):
+            return np.empty(0, dtype=np.int32)
+        return np.unique(np.concatenate(
+            [self.edge_routes[self.edge_route_offsets[e]:self.edge_route_offsets[e + 1]] for e in edges]
+        ))
+
+    # ─── Shortest paths ───────────────────────────────────────────────────────
+
+    def shortest_path(self, source: int, target: int, blocked: frozenset = frozenset(),
+                      limit: float = math.inf) -> Optional[Tuple[float, List[int]]]:
+        """A* from `source` to `target` avoiding `blocked` edges; (seconds, edge path) or None."""
+        lat, lng = self.node_lat, self.node_lng
+        t_lat, t_lng = lat[target], lng[target]
+
+        def h(node):
+            return haversine_metres(lat[node], lng[node], t_lat, t_lng) / self._max_speed
+
+        dist = {source: 0.0}
+        via: Dict[int, int] = {}
+        heap = [(h(source), 0.0, source)]
+        while heap:
+            _, d, node = heapq.heappop(heap)
+            if node == target:
+                path = []
+                while node != source:
+                    edge = via[node]
+                    path.append(edge)
+                    node = int(self.edge_from[edge])
+                return d, path[::-1]
+            if d > dist.get(node, math.inf):
+                continue
+            for edge, to_node, seconds in self._adjacency[node]:
+                nd = d + seconds
+                if edge in blocked or nd > limit or nd >= dist.get(to_node, math.inf):
+                    continue
+                dist[to_node] = nd
+                via[to_node] = edge
+                heapq.heappush(heap, (nd + h(to_node), nd, to_node))
+        return None
+
+    def _detour(self, run: Sequence[int], blocked: frozenset) -> Detour:
+        """Re-route one closed stretch of a route (consecutive closed edges)."""
+        original = float(self.edge_seconds[list(run)].sum())
+        found = self.shortest_path(int(self.edge_from[run[0]]), int(self.edge_to[run[-1]]),
+                                   blocked, limit=original + MAX_DETOUR_MINUTES * 60)
+        if found is None:
+            return Detour(extra_seconds=0.0, via_road=None)
+        seconds, path = found
+        if not path:
+            # The stretch starts and ends at the same node (an out-and-back spur): just skip it
+            return Detour(extra_seconds=0.0, via_road=int(self.edge_road[run[0]]))
+        roads = np.bincount(self.edge_road[path], weights=self.edge_seconds[path])
+        return Detour(extra_seconds=max(0.0, seconds - original), via_road=int(np.argmax(roads)))
+
+    # ─── Closure impact ───────────────────────────────────────────────────────
+
+    def closure_impact(self, road_id: str) -> List[AffectedRoute]:
+        """Routes affected by closing `road_id`, most severe first (memoised per road)."""
+        if road_id in self._impacts:
+            return self._impacts[road_id]
+
+        closed_edges = self.edges_of_road(self.road_index[road_id])
+        blocked = frozenset(closed_edges.tolist())
+        detours: Dict[Tuple[int, ...], Detour] = {}
+        affected = []
+        for route in self.routes_crossing(closed_edges).tolist():
+            path = self.route_path(route)
+            closed = np.isin(path, closed_edges)
+            # Split the closed positions into maximal runs of consecutive edges
+            positions = np.flatnonzero(closed)
+            runs = np.split(positions, np.flatnonzero(np.diff(positions) > 1) + 1)
+            results = []
+            for run in runs:
+                key = tuple(path[run].tolist())
+                if key not in detours:
+                    detours[key] = self._detour(key, blocked)
+                results.append(detours[key])
+            affected.append(self._affected_route(route, results))
+
+        affected.sort(key=lambda r: (r.impact != "suspended", -r.extra_minutes))
+        self._impacts[road_id] = affected
+        return affected
+
+    def _affected_route(self, route: int, detours: List[Detour]) -> AffectedRoute:
+        name = self.route_names[route]
+        if any(d.via_road is None for d in detours):
+            return AffectedRoute(route=name, impact="suspended", extra_minutes=0,
+                                 alternative="No road diversion available — suspend the affected section")
+        extra = int(round(sum(d.extra_seconds for d in detours) / 60))
+        if extra <= DELAY_ONLY_MINUTES:
+            return AffectedRoute(route=name, impact="delayed", extra_minutes=extra, alternative=None)
+        main = max(detours, key=lambda d: d.extra_seconds)
+        return AffectedRoute(route=name, impact="diverted", extra_minutes=extra,
+                             alternative=f"Via {self.road_names[main.via_road]}")
+
+    def simulate(self, road_id: str) -> ClosureImpactResponse:
+        """Impact of closing `road_id`; passengers are left at 0 for app.services.demand to estimate."""
+        affected = self.closure_impact(road_id)
+        return ClosureImpactResponse(
+            road_id=road_id,
+            road_name=self.road_names[self.road_index[road_id]],
+            affected_routes=affected,
+            estimated_passengers_affected=0,
+            recommended_action=recommend_action(affected),
+        )
+
+
+def recommend_action(affected: List[AffectedRoute]) -> str:
+    suspended = [r.route for r in affected if r.impact == "suspended"]
+    worst = max((r.extra_minutes for r in affected), default=0)
+    if suspended:
+        return (f"Arrange replacement buses for suspended route(s) {', '.join(suspended)}. "
+                "Alert passengers via Bee Network app.")
+    if worst >= 15:
+        return "Deploy additional vehicles on diversion corridors. Alert passengers via Bee Network app."
+    if affected:
+        return "Apply standard diversion protocol and update real-time displays."
+    return "No bus services cross this road. Monitor general traffic."
+
+
+# ─── Loader ───────────────────────────────────────────────────────────────────
+
+def _csr(keys: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(offsets, order) grouping positions of `keys` (values in [0, n)) by key."""
+    order = np.argsort(keys, kind="stable").astype(np.int32)
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n), out=offsets[1:])
+    return offsets, order
+
+
+def _snap(graph: RoadGraph, cells: Dict[Tuple[int, int], List[int]], lat: float, lng: float) -> int:
+    """Nearest node to (lat, lng), searching grid rings outwards."""
+    cx, cy = int(lat // SNAP_CELL_DEGREES), int(lng // SNAP_CELL_DEGREES)
+    for radius in range(0, 64):
+        near = [n for dx in range(-radius, radius + 1) for dy in range(-radius, radius + 1)
+                if max(abs(dx), abs(dy)) == radius for n in cells.get((cx + dx, cy + dy), ())]
+        if near:
+            # One more ring can hold a closer node, so include it before choosing
+            near += [n for dx in range(-radius - 1, radius + 2) for dy in range(-radius - 1, radius + 2)
+                     if max(abs(dx), abs(dy)) == radius + 1 for n in cells.get((cx + dx, cy + dy), ())]
+            near = np.array(near)
+            return int(near[np.argmin(haversine_metres(lat, lng, graph.node_lat[near], graph.node_lng[near]))])
+    raise ValueError(f"No road node near ({lat}, {lng})")
+
+
+def _map_shape(graph: RoadGraph, cells, shape: Sequence[Sequence[float]]) -> List[int]:
+    """Snap a route shape to nodes and join consecutive nodes with shortest paths."""
+    nodes = []
+    for lat, lng in shape:
+        node = _snap(graph, cells, lat, lng)
+        if not nodes or nodes[-1] != node:
+            nodes.append(node)
+    edges: List[int] = []
+    for a, b in zip(nodes[:-1], nodes[1:]):
+        found = graph.shortest_path(a, b)
+        if found is not None:
+            edges.extend(found[1])
+    return edges
+
+
+def load_road_graph(path: str) -> RoadGraph:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    node_ids = [str(n[0]) for n in data["nodes"]]
+    node_index = {node_id: i for i, node_id in enumerate(node_ids)}
+    node_lat = np.array([n[1] for n in data["nodes"]], dtype=np.float64)
+    node_lng = np.array([n[2] for n in data["nodes"]], dtype=np.float64)
+
+    road_ids, road_names, road_index = [], [], {}
+    edge_from, edge_to, edge_seconds, edge_road = [], [], [], []
+    for u, v, length_m, speed_kph, road_id, road_name in data["edges"]:
+        if road_id not in road_index:
+            road_index[road_id] = len(road_ids)
+            road_ids.append(road_id)
+            road_names.append(road_name or road_id)
+        edge_from.append(node_index[str(u)])
+        edge_to.append(node_index[str(v)])
+        edge_seconds.append(length_m / (speed_kph / 3.6))
+        edge_road.append(road_index[road_id])
+
+    edge_from = np.array(edge_from, dtype=np.int32)
+    edge_road = np.array(edge_road, dtype=np.int32)
+    adj_offsets, adj_edges = _csr(edge_from, len(node_ids))
+    road_offsets, road_edges = _csr(edge_road, len(road_ids))
+
+    routes = data.get("routes", {})
+    graph = RoadGraph(
+        node_ids=node_ids,
+        road_ids=road_ids,
+        road_names=road_names,
+        route_names=list(routes),
+        node_lat=node_lat,
+        node_lng=node_lng,
+        edge_from=edge_from,
+        edge_to=np.array(edge_to, dtype=np.int32),
+        edge_seconds=np.array(edge_seconds, dtype=np.float32),
+        edge_road=edge_road,
+        adj_offsets=adj_offsets,
+        adj_edges=adj_edges,
+        road_offsets=road_offsets,
+        road_edges=road_edges,
+        route_offsets=np.zeros(1, dtype=np.int64),
+        route_edges=np.empty(0, dtype=np.int32),
+        edge_route_offsets=np.zeros(len(edge_from) + 1, dtype=np.int64),
+        edge_routes=np.empty(0, dtype=np.int32),
+    )
+
+    # Map route shapes onto edges, then invert into the edge → routes index
+    cells: Dict[Tuple[int, int], List[int]] = {}
+    for i, (lat, lng) in enumerate(zip(node_lat.tolist(), node_lng.tolist())):
+        cells.setdefault((int(lat // SNAP_CELL_DEGREES), int(lng // SNAP_CELL_DEGREES)), []).append(i)
+    paths = [np.array(_map_shape(graph, cells, shape), dtype=np.int32) for shape in routes.values()]
+    graph.route_offsets = np.zeros(len(paths) + 1, dtype=np.int64)
+    np.cumsum([len(p) for p in paths], out=graph.route_offsets[1:])
+    graph.route_edges = np.concatenate(paths) if paths else np.empty(0, dtype=np.int32)
+
+    crossing_route = np.repeat(np.arange(len(paths), dtype=np.int32), [len(p) for p in paths])
+    pairs = np.unique(np.stack([graph.route_edges, crossing_route], axis=1), axis=0) if paths else np.empty((0, 2), np.int32)
+    graph.edge_route_offsets, order = _csr(pairs[:, 0], len(edge_from))
+    graph.edge_routes = pairs[order, 1].astype(np.int32)
+    return graph
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+# The graph is the "road_graph" entry of the dataset registry; roads actually
+# closed are the "closures" entry (road_id -> impact), a read-only mapping
+# replaced on every change and published with the disruption it implies.
+
+NO_CLOSURES: Mapping[str, List[AffectedRoute]] = MappingProxyType({})
+
+
+def init_road_graph(path: Optional[str] = None, prebuilt: Optional[RoadGraph] = None) -> Optional[RoadGraph]:
+    path = path or config.ROAD_GRAPH_PATH
+    graph = prebuilt if prebuilt is not None else load_road_graph(path) if path else None
+    registry.publish(road_graph=graph, closures=NO_CLOSURES)
+    return graph
+
+
+def get_road_graph() -> Optional[RoadGraph]:
+    return registry.get("road_graph")
+
+
+def closed_roads() -> Mapping[str, List[AffectedRoute]]:
+    return registry.get("closures", NO_CLOSURES)
+
+
+def with_road_closed(road_id: str) -> Mapping[str, List[AffectedRoute]]:
+    """Current closures plus `road_id` (unlike `simulate`, for journey planning; see app.routers.admin)."""
+    return MappingProxyType({**closed_roads(), road_id: get_road_graph().closure_impact(road_id)})
+
+
+def with_road_reopened(road_id: str) -> Optional[Mapping[str, List[AffectedRoute]]]:
+    """Current closures without `road_id`; None if it isn't closed."""
+    closed = closed_roads()
+    if road_id not in closed:
+        return None
+    return MappingProxyType({other: impact for other, impact in closed.items() if other != road_id})
+
+
+def reclose_roads(graph: RoadGraph) -> Mapping[str, List[AffectedRoute]]:
+    """The current closures' impacts on `graph` (a reload about to be published); roads it lacks reopen."""
+    closed = registry.latest().get("closures", NO_CLOSURES)
+    return MappingProxyType({road_id: graph.closure_impact(road_id) for road_id in closed if graph.has_road(road_id)})
+
+
+def data_version() -> int:
+    """Changes on every (re)load of the road graph; part of dependent cache keys."""
+    return registry.version("road_graph")
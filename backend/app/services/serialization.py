@@ -0,0 +1,51 @@
+"""
+Fast JSON serialization helpers for pre-encoded responses.
+
+  - `dumps` encodes plain Python data with orjson when it is installed (falling
+    back to the stdlib); Pydantic models go through pydantic-core's encoder.
+  - Response bodies that embed a timestamp carry the time their data version
+    was first built (`with_timestamp`), not the time of each request, so a
+    cached body is final: it can be served, revalidated (ETag) and diffed
+    byte for byte (app.services.conditional).
+"""
+
+import json
+from datetime import datetime
+from typing import Any, Callable
+
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+
+def dumps(data: Any) -> bytes:
+    if isinstance(data, BaseModel):
+        return data.model_dump_json().encode()
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, separators=(",", ":"), default=str).encode()
+
+
+def loads(body: bytes) -> Any:
+    return orjson.loads(body) if orjson is not None else json.loads(body)
+
+
+def with_timestamp(result: Any, field: str, value: str) -> Any:
+    """Copy of `result` (model or dict) with `field` set to `value`."""
+    if isinstance(result, BaseModel):
+        return result.model_copy(update={field: value})
+    return {**result, field: value}
+
+
+def clock_time(now: datetime) -> str:
+    return now.strftime("%H:%M:%S")
+
+
+def iso_time(now: datetime) -> str:
+    return now.isoformat()
+
+
+TimestampFormat = Callable[[datetime], str]
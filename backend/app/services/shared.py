@@ -0,0 +1,125 @@
+"""
+Shared Datasets — build the static datasets once, attach them from every worker.
+
+`publish` writes a dict of loaded datasets (timetable, RAPTOR network, stop
+resolver, road graph, heatmap tiles) to one file:
+
+    magic "SBSHARED" | uint32 header length | JSON header | pickle | array buffers
+
+The JSON header holds the layout, a BLAKE2b checksum of everything after
+it, and caller metadata (app.services.snapshot keeps its versions there).
+
+The pickle uses protocol 5 with out-of-band buffers, so every NumPy array's
+bytes go to their own 64-byte-aligned slice of the file instead of the
+pickle stream. `attach` maps the file read-only and hands those slices back
+as buffers: arrays are zero-copy views of the mapping, shared by every
+process through the page cache (on tmpfs such as /dev/shm, that *is* shared
+memory). Dataclasses are pickled as their constructor arguments, so derived
+indexes are rebuilt by `__post_init__` on attach rather than stored twice.
+
+The file is written beside its final path and renamed into place, so a
+reader never sees a partial file.
+
+HACKATHON: String tables (stop names, trip IDs) and the planner's hot-loop
+           Python lists are still per process; only the arrays are shared.
+PRODUCTION: Intern string tables into offset + bytes arrays so they share too.
+"""
+
+import dataclasses
+import hashlib
+import io
+import json
+import mmap
+import os
+import pickle
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+MAGIC = b"SBSHARED"
+ALIGN = 64
+
+_HEADER = struct.Struct("<8sI")
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+class _Pickler(pickle.Pickler):
+    def reducer_override(self, obj):
+        # Constructor arguments only: fields built in __post_init__ are rebuilt on load
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            return type(obj), tuple(getattr(obj, f.name) for f in dataclasses.fields(obj) if f.init)
+        return NotImplemented
+
+
+def publish(datasets: Dict[str, Any], path: str, meta: Optional[Dict[str, Any]] = None) -> int:
+    """Write `datasets` to `path` (atomically) with `meta` in its header; returns the file size."""
+    buffers: List[pickle.PickleBuffer] = []
+    stream = io.BytesIO()
+    _Pickler(stream, protocol=5, buffer_callback=buffers.append).dump(datasets)
+    payload = stream.getvalue()
+
+    # Body: the pickle, then each buffer, each padded to ALIGN; offsets are relative to the body
+    chunks, spans, offset = [payload], [], len(payload)
+    for buffer in buffers:
+        raw = buffer.raw()
+        chunks.append(bytes(_aligned(offset) - offset))
+        offset = _aligned(offset)
+        spans.append([offset, raw.nbytes])
+        chunks.append(raw)
+        offset += raw.nbytes
+    chunks.append(bytes(_aligned(offset) - offset))
+    checksum = hashlib.blake2b(digest_size=32)
+    for chunk in chunks:
+        checksum.update(chunk)
+    header = json.dumps({
+        "pickle": len(payload), "buffers": spans, "size": _aligned(offset),
+        "checksum": checksum.hexdigest(), "meta": meta or {},
+    }).encode()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, len(header)))
+        f.write(header)
+        f.write(bytes(_aligned(_HEADER.size + len(header)) - _HEADER.size - len(header)))
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp, path)
+    return _aligned(_HEADER.size + len(header)) + _aligned(offset)
+
+
+def _map(path: str) -> Tuple[mmap.mmap, Dict[str, Any], int]:
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(mapped) < _HEADER.size:
+        raise ValueError(f"{path} is truncated")
+    magic, header_size = _HEADER.unpack_from(mapped)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a SmartBee shared dataset file")
+    header = json.loads(mapped[_HEADER.size:_HEADER.size + header_size])
+    base = _aligned(_HEADER.size + header_size)
+    if len(mapped) != base + header["size"]:
+        raise ValueError(f"{path} is truncated")
+    return mapped, header, base
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """The header of a published file (layout, checksum and `meta`) without loading it."""
+    mapped, header, _ = _map(path)
+    mapped.close()
+    return header
+
+
+def attach(path: str, verify: bool = False) -> Dict[str, Any]:
+    """Map a published file read-only and rebuild its datasets around zero-copy array views.
+
+    With `verify`, the body's checksum is checked first (reads every page once).
+    """
+    mapped, header, base = _map(path)
+    view = memoryview(mapped)
+    if verify and hashlib.blake2b(view[base:], digest_size=32).hexdigest() != header["checksum"]:
+        raise ValueError(f"{path} is corrupt: checksum mismatch")
+    buffers = [view[base + start:base + start + size] for start, size in header["buffers"]]
+    return pickle.loads(view[base:base + header["pickle"]], buffers=buffers)
@@ -0,0 +1,214 @@
+"""
+Dataset Snapshots — the loaded datasets compiled into one versioned binary file.
+
+Parsing the GTFS CSVs and building every index takes tens of seconds at
+Greater Manchester scale. `python -m app.snapshot build` does it once, offline,
+and writes the timetable, RAPTOR network, stop resolver, road graph and heatmap
+tiles (arrays, string tables and indexes) to one app.services.shared file.
+Its header records:
+
+  - format: SNAPSHOT_FORMAT, bumped whenever a dataset class changes shape
+  - sources: path, size and mtime of every input file, and the GTFS feed version
+  - checksum: BLAKE2b of the body, verified by `python -m app.snapshot check`
+    (and at startup only with config.SNAPSHOT_VERIFY: hashing reads every page)
+
+With config.SNAPSHOT_PATH set, startup maps the snapshot instead of loading:
+well under a second, since arrays are read lazily from the page cache. A
+snapshot that is missing, truncated, unreadable, of another format or built
+from other source files is rejected; the datasets are then loaded from source as
+before and the snapshot rebuilt for the next start.
+
+`reload_datasets` (POST /admin/reload) loads the sources again while serving:
+in a worker thread, or in a separate process that writes a snapshot for this
+one to map (no GIL contention with request handling). The derived datasets
+are rebuilt and everything is swapped in with one app.services.registry publish.
+
+HACKATHON: Staleness is judged by file size and mtime, not content.
+PRODUCTION: Build the snapshot in CI with the feed and ship it in the image.
+"""
+
+import asyncio
+import csv
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import pickle
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from app import config
+from app.services import matrix, registry, shared
+from app.services.demand import DemandModel
+from app.services.planner import NO_DISRUPTION, build_network, closure_disruption
+from app.services.road_graph import NO_CLOSURES, load_road_graph, reclose_roads
+from app.services.stop_resolver import StopResolver
+from app.services.tiles import load_events
+from app.services.timetable import load_gtfs
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+
+
+def load_datasets() -> Dict[str, Any]:
+    """Load every dataset from its configured source, keyed as app.main's lifespan expects."""
+    timetable = load_gtfs(config.GTFS_PATH) if config.GTFS_PATH else None
+    return {
+        "timetable": timetable,
+        "stops": StopResolver.from_timetable(timetable) if timetable is not None else None,
+        "network": build_network(timetable) if timetable is not None else None,
+        "road_graph": load_road_graph(config.ROAD_GRAPH_PATH) if config.ROAD_GRAPH_PATH else None,
+        "tiles": load_events(config.HEATMAP_EVENTS_PATH) if config.HEATMAP_EVENTS_PATH else {},
+    }
+
+
+def feed_version(gtfs_path: str) -> str:
+    """feed_info.txt's feed_version if the feed has one, else a hash of the zip."""
+    with zipfile.ZipFile(gtfs_path) as feed:
+        if "feed_info.txt" in feed.namelist():
+            with feed.open("feed_info.txt") as f:
+                row = next(csv.DictReader(io.TextIOWrapper(f, encoding="utf-8-sig")), None) or {}
+            if row.get("feed_version"):
+                return row["feed_version"]
+    digest = hashlib.blake2b(digest_size=8)
+    with open(gtfs_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sources() -> Dict[str, Optional[list]]:
+    """Fingerprint of the configured source files: [path, size, mtime_ns], None if unset."""
+    fingerprint = {}
+    for name, path in (("gtfs", config.GTFS_PATH), ("road_graph", config.ROAD_GRAPH_PATH),
+                       ("heatmap_events", config.HEATMAP_EVENTS_PATH)):
+        if path:
+            stat = os.stat(path)
+            fingerprint[name] = [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+        else:
+            fingerprint[name] = None
+    return fingerprint
+
+
+def build_snapshot(path: str) -> Dict[str, Any]:
+    """Load from source and write the snapshot; returns its header metadata."""
+    start = time.perf_counter()
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "sources": sources(),
+        "feed_version": feed_version(config.GTFS_PATH) if config.GTFS_PATH else None,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    size = shared.publish(load_datasets(), path, meta)
+    logger.info("Built snapshot %s (feed %s, %.1f MB) in %.1fs",
+                path, meta["feed_version"], size / 1e6, time.perf_counter() - start)
+    return meta
+
+
+def stale_reason(path: str) -> Optional[str]:
+    """Why the snapshot at `path` can't be used for the current configuration; None if it can."""
+    if not os.path.exists(path):
+        return "missing"
+    try:
+        meta = shared.read_header(path)["meta"]
+    except (OSError, ValueError, KeyError) as exc:
+        return f"unreadable: {exc}"
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        return f"format {meta.get('format')}, expected {SNAPSHOT_FORMAT}"
+    if meta.get("sources") != sources():
+        return "source files changed"
+    return None
+
+
+def open_snapshot(path: str, verify: Optional[bool] = None) -> Dict[str, Any]:
+    """Map the snapshot at `path`, rebuilding it first if stale or corrupt.
+
+    The body checksum is only verified with `verify` (default config.SNAPSHOT_VERIFY).
+    """
+    global _meta
+    reason = stale_reason(path)
+    if reason is None:
+        try:
+            datasets = shared.attach(path, verify=config.SNAPSHOT_VERIFY if verify is None else verify)
+            _meta = shared.read_header(path)["meta"]
+            return datasets
+        except (ValueError, pickle.UnpicklingError, TypeError, EOFError) as exc:
+            reason = str(exc)
+    logger.warning("Snapshot %s rejected (%s); loading from source and rebuilding", path, reason)
+    _meta = build_snapshot(path)
+    return shared.attach(path)
+
+
+# ─── Hot reload ───────────────────────────────────────────────────────────────
+
+def _build_elsewhere(processes: bool) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Load from source in this thread, or in a child process via a snapshot file (returns datasets, meta)."""
+    if not processes:
+        return load_datasets(), None
+    path = config.SNAPSHOT_PATH
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="smartbee-reload-", suffix=".bin", dir=config.SHARED_DATA_DIR)
+        os.close(fd)
+    try:
+        # spawn: a fork would copy the serving process, threads and event loop included
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            meta = pool.submit(build_snapshot, path).result()
+        return shared.attach(path), meta if path == config.SNAPSHOT_PATH else None
+    finally:
+        if path != config.SNAPSHOT_PATH:
+            os.unlink(path)     # the mapping stays valid
+
+
+async def reload_datasets(processes: bool = False) -> registry.Snapshot:
+    """Load every dataset again and publish them, with what's derived from them, as one snapshot.
+
+    Requests keep serving the previous snapshot until the swap. Closed roads,
+    the latest realtime feed and the travel-time matrix carry over to the new
+    datasets.
+    """
+    global _meta
+    start = time.perf_counter()
+    datasets, meta = await asyncio.to_thread(_build_elsewhere, processes)
+    timetable, network, graph = datasets["timetable"], datasets["network"], datasets["road_graph"]
+    closed = reclose_roads(graph) if graph is not None else NO_CLOSURES
+    disruption = NO_DISRUPTION
+    if network is not None:
+        disruption = closure_disruption(network, [route for impact in closed.values() for route in impact])
+    await matrix.stop_matrix()
+    travel_times = await asyncio.to_thread(matrix.open_matrix, network)
+    if travel_times is not None:
+        travel_times.set_disruption(disruption)
+    model = await asyncio.to_thread(DemandModel.from_timetable, timetable)
+
+    # No awaits from here: the poller can't apply a feed between the rebase and the swap
+    live = registry.latest().get("realtime")
+    published = registry.publish(
+        **datasets,
+        closures=closed,
+        demand=model,
+        disruption=disruption,
+        matrix=travel_times,
+        realtime=live.rebased(timetable) if live is not None and timetable is not None else None,
+    )
+    matrix.start_matrix()
+    if meta is not None:
+        _meta = meta
+    logger.info("Reloaded datasets as version %d in %.1fs (%s)", published.version,
+                time.perf_counter() - start, "process" if processes else "thread")
+    return published
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+
+_meta: Optional[Dict[str, Any]] = None
+
+
+def snapshot_info() -> Optional[Dict[str, Any]]:
+    """Header metadata of the snapshot this process started from (None without one)."""
+    return _meta
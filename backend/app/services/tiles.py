@@ -0,0 +1,207 @@
+"""
+Heatmap Tile Engine — multi-resolution grid aggregation of raw point events.
+
+Raw events (smart-ticketing taps, vehicle delay observations, ...) are binned
+once into slippy-map tiles for every zoom level between MIN_ZOOM and MAX_ZOOM.
+Each level is a set of NumPy columns sorted by (x, y) tile key:
+
+  - tile x / y, event count, summed weight
+  - weighted centroid (so a cell is drawn where its events are, not at the tile corner)
+  - pre-computed 0–1 intensity and the label of the heaviest labelled event
+
+A viewport query is two binary searches on x plus a vectorised y mask, so the
+response size depends on what is on screen, not on how many raw events exist.
+
+HACKATHON: Built from the hand-crafted mock points unless an events file is set.
+PRODUCTION: Rebuild from the last-15-min stop events on a schedule.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app import config
+from app.models.schemas import HeatmapPoint
+from app.services import registry
+
+MIN_ZOOM = 10
+MAX_ZOOM = 18
+
+
+def tile_xy(lat: np.ndarray, lng: np.ndarray, zoom: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Slippy-map tile coordinates of each point at `zoom` (vectorised)."""
+    n = 1 << zoom
+    lat = np.clip(np.asarray(lat, dtype=np.float64), -85.0511, 85.0511)
+    x = np.floor((np.asarray(lng, dtype=np.float64) + 180.0) / 360.0 * n)
+    y = np.floor((1.0 - np.arcsinh(np.tan(np.radians(lat))) / math.pi) / 2.0 * n)
+    return np.clip(x, 0, n - 1).astype(np.int64), np.clip(y, 0, n - 1).astype(np.int64)
+
+
+@dataclass
+class TileLevel:
+    zoom: int
+    x: np.ndarray           # int64[n_cells], sorted together with y
+    y: np.ndarray           # int64[n_cells]
+    count: np.ndarray       # int64[n_cells]
+    lat: np.ndarray         # float64[n_cells], weighted centroid
+    lng: np.ndarray         # float64[n_cells]
+    intensity: np.ndarray   # float32[n_cells], 0.0 – 1.0
+    label: np.ndarray       # int32[n_cells], -1 = no label
+
+    def query(self, x_min: int, x_max: int, y_min: int, y_max: int) -> np.ndarray:
+        """Indexes of cells with x_min ≤ x ≤ x_max and y_min ≤ y ≤ y_max."""
+        lo = np.searchsorted(self.x, x_min, side="left")
+        hi = np.searchsorted(self.x, x_max, side="right")
+        ys = self.y[lo:hi]
+        return lo + np.flatnonzero((ys >= y_min) & (ys <= y_max))
+
+
+@dataclass
+class TileGrid:
+    """Pre-aggregated tiles for one metric.
+
+    `aggregate` is "sum" (e.g. tap counts) or "mean" (e.g. delay minutes).
+    With `normalize`, intensities are scaled by the largest cell of each level;
+    without it the aggregated weight is used as-is (weights already 0–1).
+    """
+
+    levels: Dict[int, TileLevel]
+    labels: List[str]
+    n_events: int = 0
+    aggregate: str = "sum"
+
+    @classmethod
+    def build(cls, lat: np.ndarray, lng: np.ndarray, weight: np.ndarray,
+              label: Optional[np.ndarray] = None, labels: Sequence[str] = (),
+              aggregate: str = "sum", normalize: bool = True) -> "TileGrid":
+        lat = np.asarray(lat, dtype=np.float64)
+        lng = np.asarray(lng, dtype=np.float64)
+        weight = np.asarray(weight, dtype=np.float64)
+        label = np.full(len(lat), -1, dtype=np.int32) if label is None else np.asarray(label, dtype=np.int32)
+        levels = {}
+        for zoom in range(MIN_ZOOM, MAX_ZOOM + 1):
+            x, y = tile_xy(lat, lng, zoom)
+            key = (x << 32) | y
+            cells, cell_of = np.unique(key, return_inverse=True)
+            n = len(cells)
+            count = np.bincount(cell_of, minlength=n)
+            total = np.bincount(cell_of, weights=weight, minlength=n)
+            # Centroids are weighted by event weight; plain means for zero-weight cells
+            w = np.bincount(cell_of, weights=np.abs(weight), minlength=n)
+            safe_w = np.where(w > 0, w, 1.0)
+            c_lat = np.where(w > 0, np.bincount(cell_of, weights=lat * np.abs(weight), minlength=n) / safe_w,
+                             np.bincount(cell_of, weights=lat, minlength=n) / count)
+            c_lng = np.where(w > 0, np.bincount(cell_of, weights=lng * np.abs(weight), minlength=n) / safe_w,
+                             np.bincount(cell_of, weights=lng, minlength=n) / count)
+
+            value = total / count if aggregate == "mean" else total
+            if normalize and n and value.max() > 0:
+                value = value / value.max()
+
+            # Label of the heaviest labelled event in each cell
+            cell_label = np.full(n, -1, dtype=np.int32)
+            labelled = np.flatnonzero(label >= 0)
+            if len(labelled):
+                order = labelled[np.lexsort((weight[labelled], cell_of[labelled]))]
+                last = np.r_[cell_of[order][1:] != cell_of[order][:-1], True]
+                cell_label[cell_of[order][last]] = label[order][last]
+
+            levels[zoom] = TileLevel(
+                zoom=zoom,
+                x=cells >> 32,
+                y=cells & 0xFFFFFFFF,
+                count=count,
+                lat=c_lat,
+                lng=c_lng,
+                intensity=np.clip(value, 0.0, 1.0).astype(np.float32),
+                label=cell_label,
+            )
+        return cls(levels=levels, labels=list(labels), n_events=len(lat), aggregate=aggregate)
+
+    @classmethod
+    def from_points(cls, points: Sequence[HeatmapPoint], aggregate: str = "mean") -> "TileGrid":
+        """Grid over points that already carry 0–1 intensities (e.g. the mock point clouds)."""
+        labels = [p.label for p in points if p.label]
+        label_index = {name: i for i, name in enumerate(labels)}
+        return cls.build(
+            lat=np.array([p.lat for p in points]),
+            lng=np.array([p.lng for p in points]),
+            weight=np.array([p.intensity for p in points]),
+            label=np.array([label_index[p.label] if p.label else -1 for p in points]),
+            labels=labels,
+            aggregate=aggregate,
+            normalize=False,
+        )
+
+    def cell_rows(self, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None) -> List[dict]:
+        """Pre-aggregated cells at `zoom` (clamped to the built range) inside `bbox`, as plain dicts.
+
+        `bbox` is (min_lng, min_lat, max_lng, max_lat); None means everything.
+        Rows have the `HeatmapPoint` fields and are encoded directly, without
+        building a model per cell.
+        """
+        level = self.levels[min(max(zoom, MIN_ZOOM), MAX_ZOOM)]
+        if bbox is None:
+            idx = np.arange(len(level.x))
+        else:
+            min_lng, min_lat, max_lng, max_lat = bbox
+            (x_min, x_max), (y_max, y_min) = tile_xy(
+                np.array([min_lat, max_lat]), np.array([min_lng, max_lng]), level.zoom
+            )
+            idx = level.query(int(x_min), int(x_max), int(y_min), int(y_max))
+        lats = np.round(level.lat[idx].astype(np.float64), 6).tolist()
+        lngs = np.round(level.lng[idx].astype(np.float64), 6).tolist()
+        intensities = np.round(level.intensity[idx].astype(np.float64), 3).tolist()
+        labels = level.label[idx].tolist()
+        return [
+            {"lat": la, "lng": ln, "intensity": i, "label": self.labels[lb] if lb >= 0 else None}
+            for la, ln, i, lb in zip(lats, lngs, intensities, labels)
+        ]
+
+    def cells(self, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None) -> List[HeatmapPoint]:
+        return [HeatmapPoint(**row) for row in self.cell_rows(zoom, bbox)]
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """Parse "min_lng,min_lat,max_lng,max_lat"; raises ValueError if malformed."""
+    parts = [float(v) for v in value.split(",")]
+    if len(parts) != 4 or parts[0] > parts[2] or parts[1] > parts[3]:
+        raise ValueError("bbox must be min_lng,min_lat,max_lng,max_lat")
+    return parts[0], parts[1], parts[2], parts[3]
+
+
+# ─── Loader ───────────────────────────────────────────────────────────────────
+# Events file: a .npz with "<metric>_lat", "<metric>_lng", "<metric>_weight" arrays
+# for each metric (e.g. demand_* = tap-ons, delay_* = delay minutes per observation).
+
+METRIC_AGGREGATES = {"demand": "sum", "delay": "mean"}
+
+
+def load_events(path: str) -> Dict[str, TileGrid]:
+    grids = {}
+    with np.load(path) as events:
+        for metric, aggregate in METRIC_AGGREGATES.items():
+            if f"{metric}_lat" in events:
+                grids[metric] = TileGrid.build(
+                    events[f"{metric}_lat"], events[f"{metric}_lng"], events[f"{metric}_weight"],
+                    aggregate=aggregate,
+                )
+    return grids
+
+
+def init_tiles(path: Optional[str] = None, prebuilt: Optional[Dict[str, TileGrid]] = None) -> Dict[str, TileGrid]:
+    path = path or config.HEATMAP_EVENTS_PATH
+    grids = prebuilt if prebuilt is not None else load_events(path) if path else {}
+    registry.publish(tiles=grids)
+    return grids
+
+
+def data_version() -> int:
+    """Changes on every (re)load of the tile grids; part of dependent cache keys."""
+    return registry.version("tiles")
+
+
+def get_grid(metric: str) -> Optional[TileGrid]:
+    return registry.get("tiles", {}).get(metric)
@@ -0,0 +1,354 @@
+"""
+GTFS Timetable Engine — in-memory static schedule for arrivals and planning.
+
+Loads a local GTFS zip (stops.txt, trips.txt, stop_times.txt and, if present,
+routes.txt) into flat NumPy column arrays:
+
+  - stop, route, trip and headsign IDs are interned to dense int32 indexes
+  - stop_times are stored as int32 columns sorted by (trip, stop_sequence)
+  - a per-stop departure index (CSR layout) holds departures sorted by time,
+    so "next N departures at stop X" is a binary search, not a scan
+
+Memory is predictable: ~20 bytes per stop_times row plus the string tables,
+so a multi-million-row Greater Manchester feed fits in well under 200 MB.
+
+GTFS times are seconds after the service day's midnight and may pass 24:00:00,
+so in the small hours a board also looks up `now + 1 day` in the departure
+index: yesterday's late-night trips (see `Timetable.service_days`).
+
+HACKATHON: Calendars (calendar.txt / calendar_dates.txt) are not applied —
+           every trip in the feed is treated as running every day.
+PRODUCTION: Filter trips by active service_id for the requested service day.
+"""
+
+import csv
+import io
+import zipfile
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app import config
+from app.models.schemas import ArrivalItem
+from app.services import registry
+
+# Real-time boards still show vehicles up to this late against their schedule
+MAX_LATE_SECONDS = 60 * 60
+# Delays from this many seconds are shown as "late"
+LATE_THRESHOLD_SECONDS = 120
+SECONDS_PER_DAY = 24 * 3600
+
+
+def normalize_stop_key(name: str) -> str:
+    """Normalise a stop name the same way the arrivals endpoint keys its stops."""
+    return name.strip().lower().replace(" ", "_")
+
+
+def parse_gtfs_time(value: str) -> int:
+    """Parse a GTFS "HH:MM:SS" time (hours may exceed 23) into seconds, -1 if blank."""
+    value = value.strip()
+    if not value:
+        return -1
+    hours, minutes, seconds = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+@dataclass
+class Timetable:
+    # String tables — index position is the interned ID
+    stop_ids: List[str]
+    stop_names: List[str]
+    stop_platforms: List[str]
+    route_ids: List[str]
+    route_names: List[str]
+    trip_ids: List[str]
+    headsigns: List[str]
+
+    # Per-stop / per-route / per-trip columns
+    stop_lat: np.ndarray        # float64[n_stops]
+    stop_lon: np.ndarray        # float64[n_stops]
+    route_type: np.ndarray      # int16[n_routes], GTFS route_type
+    trip_route: np.ndarray      # int32[n_trips]
+    trip_headsign: np.ndarray   # int32[n_trips], -1 = use last stop name
+
+    # stop_times columns, sorted by (trip, stop_sequence)
+    st_trip: np.ndarray         # int32[n_rows]
+    st_stop: np.ndarray         # int32[n_rows]
+    st_arrival: np.ndarray      # int32[n_rows], seconds after service-day midnight
+    st_departure: np.ndarray    # int32[n_rows]
+    trip_offsets: np.ndarray    # int64[n_trips + 1], row range of each trip
+
+    # Per-stop departure index (CSR): departures of stop s are
+    # dep_rows[stop_offsets[s]:stop_offsets[s + 1]], sorted by dep_times
+    stop_offsets: np.ndarray    # int64[n_stops + 1]
+    dep_rows: np.ndarray        # int32[n_departures], row into stop_times
+    dep_times: np.ndarray       # int32[n_departures]
+
+    stop_index: Dict[str, int] = field(init=False, repr=False)
+    name_index: Dict[str, List[int]] = field(init=False, repr=False)
+    last_departure: int = field(init=False, repr=False)     # latest departure time, -1 if none
+
+    def __post_init__(self):
+        self.stop_index = {stop_id: i for i, stop_id in enumerate(self.stop_ids)}
+        self.last_departure = int(self.dep_times.max()) if len(self.dep_times) else -1
+        self.name_index = {}
+        for i, name in enumerate(self.stop_names):
+            self.name_index.setdefault(normalize_stop_key(name), []).append(i)
+
+    @property
+    def n_stops(self) -> int:
+        return len(self.stop_ids)
+
+    @property
+    def n_trips(self) -> int:
+        return len(self.trip_ids)
+
+    def stops_named(self, name: str) -> List[int]:
+        """All stop indexes whose stop_id or normalised name matches `name`."""
+        if name in self.stop_index:
+            return [self.stop_index[name]]
+        return self.name_index.get(normalize_stop_key(name), [])
+
+    def trip_destination(self, trip: int) -> str:
+        headsign = self.trip_headsign[trip]
+        if headsign >= 0:
+            return self.headsigns[headsign]
+        last_row = self.trip_offsets[trip + 1] - 1
+        return self.stop_names[self.st_stop[last_row]]
+
+    def service_days(self, now: int, lookback: int = 0) -> List[int]:
+        """Offsets to add to `now` (seconds after midnight) to query each service day running then.
+
+        Today's trips are at `now` itself; yesterday's, while it still has trips
+        after 24:00:00 (from `now - lookback`), at `now + 1 day`.
+        """
+        if now + SECONDS_PER_DAY - lookback <= self.last_departure:
+            return [0, SECONDS_PER_DAY]
+        return [0]
+
+    def next_departures(self, stops: Sequence[int], after: int, limit: int,
+                        since: Optional[int] = None) -> np.ndarray:
+        """Rows of the next `limit` departures at any of `stops` at or after `after` seconds.
+
+        With `since`, every departure scheduled in [since, after) is returned as
+        well, so late-running vehicles can still be shown.
+        """
+        candidates = []
+        for stop in stops:
+            lo, hi = self.stop_offsets[stop], self.stop_offsets[stop + 1]
+            times = self.dep_times[lo:hi]
+            start = lo + np.searchsorted(times, after, side="left")
+            first = lo + np.searchsorted(times, since, side="left") if since is not None else start
+            candidates.append(np.arange(first, min(start + limit, hi)))
+        if not candidates:
+            return np.empty(0, dtype=np.int32)
+        positions = np.concatenate(candidates)
+        if since is None:
+            positions = positions[np.argsort(self.dep_times[positions], kind="stable")[:limit]]
+        return self.dep_rows[positions]
+
+    def arrival_board(self, stops: Sequence[int], now: int, limit: int = 10,
+                      delays: Optional[np.ndarray] = None,
+                      cancelled: Optional[np.ndarray] = None) -> List[ArrivalItem]:
+        """Build `ArrivalItem`s for the next departures at `stops`.
+
+        `delays` / `cancelled` are optional per-trip real-time arrays (see
+        app.services.realtime); without them the board shows scheduled times.
+        """
+        lookback = MAX_LATE_SECONDS if delays is not None else 0
+        found, times = [], []
+        for offset in self.service_days(now, lookback):
+            at = now + offset
+            if delays is None:
+                rows = self.next_departures(stops, at, limit)
+                expected = self.st_departure[rows] - offset
+            else:
+                rows = self.next_departures(stops, at, limit, since=at - MAX_LATE_SECONDS)
+                expected = self.st_departure[rows] + delays[self.st_trip[rows]] - offset
+                keep = expected >= now
+                rows, expected = rows[keep], expected[keep]
+            found.append(rows)
+            times.append(expected)
+        rows, expected = np.concatenate(found), np.concatenate(times)
+        order = np.argsort(expected, kind="stable")[:limit]
+        rows, expected = rows[order], expected[order]
+
+        items = []
+        for row, when in zip(rows.tolist(), expected.tolist()):
+            trip = self.st_trip[row]
+            stop = self.st_stop[row]
+            delay = int(delays[trip]) if delays is not None else 0
+            if cancelled is not None and cancelled[trip]:
+                status = "cancelled"
+            else:
+                status = "late" if delay >= LATE_THRESHOLD_SECONDS else "ontime"
+            items.append(ArrivalItem(
+                route=self.route_names[self.trip_route[trip]],
+                destination=self.trip_destination(trip),
+                due_minutes=max(0, (when - now) // 60),
+                status=status,
+                delay_minutes=round(delay / 60) if status == "late" else None,
+                stop_name=self.stop_names[stop],
+                platform=self.stop_platforms[stop] or None,
+            ))
+        return items
+
+
+# ─── Loader ───────────────────────────────────────────────────────────────────
+
+def _read_csv(feed: zipfile.ZipFile, name: str) -> Iterator[Dict[str, str]]:
+    with feed.open(name) as raw:
+        yield from csv.DictReader(io.TextIOWrapper(raw, encoding="utf-8-sig"))
+
+
+def _interpolate_blank_times(times: np.ndarray) -> None:
+    """Fill -1 (non-timepoint) entries in place by linear interpolation between timepoints.
+
+    GTFS requires the first and last stop of every trip to be timed, so the
+    bracketing timepoints of any blank always belong to the same trip.
+    """
+    blank = times < 0
+    if blank.any():
+        known = np.flatnonzero(~blank)
+        times[blank] = np.interp(np.flatnonzero(blank), known, times[known]).astype(np.int32)
+
+
+def load_gtfs(path: str) -> Timetable:
+    """Parse a GTFS zip into a `Timetable`, streaming stop_times row by row."""
+    with zipfile.ZipFile(path) as feed:
+        names = set(feed.namelist())
+
+        stop_ids, stop_names, stop_platforms = [], [], []
+        stop_lat, stop_lon = array("d"), array("d")
+        for row in _read_csv(feed, "stops.txt"):
+            stop_ids.append(row["stop_id"])
+            stop_names.append(row.get("stop_name", "") or row["stop_id"])
+            stop_platforms.append(row.get("platform_code", "") or "")
+            stop_lat.append(float(row.get("stop_lat") or 0.0))
+            stop_lon.append(float(row.get("stop_lon") or 0.0))
+        stop_index = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+
+        route_ids, route_names, route_types = [], [], array("h")
+        route_index: Dict[str, int] = {}
+        if "routes.txt" in names:
+            for row in _read_csv(feed, "routes.txt"):
+                route_index[row["route_id"]] = len(route_ids)
+                route_ids.append(row["route_id"])
+                route_names.append(row.get("route_short_name") or row.get("route_long_name") or row["route_id"])
+                route_types.append(int(row.get("route_type") or 3))
+
+        trip_ids, headsigns = [], []
+        headsign_index: Dict[str, int] = {}
+        trip_index: Dict[str, int] = {}
+        trip_route, trip_headsign = array("i"), array("i")
+        for row in _read_csv(feed, "trips.txt"):
+            route_id = row["route_id"]
+            if route_id not in route_index:
+                route_index[route_id] = len(route_ids)
+                route_ids.append(route_id)
+                route_names.append(route_id)
+                route_types.append(3)
+            headsign = (row.get("trip_headsign") or "").strip()
+            if headsign and headsign not in headsign_index:
+                headsign_index[headsign] = len(headsigns)
+                headsigns.append(headsign)
+            trip_index[row["trip_id"]] = len(trip_ids)
+            trip_ids.append(row["trip_id"])
+            trip_route.append(route_index[route_id])
+            trip_headsign.append(headsign_index[headsign] if headsign else -1)
+
+        st_trip, st_stop, st_seq = array("i"), array("i"), array("i")
+        st_arrival, st_departure = array("i"), array("i")
+        for row in _read_csv(feed, "stop_times.txt"):
+            trip = trip_index.get(row["trip_id"])
+            stop = stop_index.get(row["stop_id"])
+            if trip is None or stop is None:
+                continue
+            arrival = parse_gtfs_time(row.get("arrival_time", ""))
+            departure = parse_gtfs_time(row.get("departure_time", ""))
+            st_trip.append(trip)
+            st_stop.append(stop)
+            st_seq.append(int(row["stop_sequence"]))
+            st_arrival.append(arrival if arrival >= 0 else departure)
+            st_departure.append(departure if departure >= 0 else arrival)
+
+    return build_timetable(
+        stop_ids=stop_ids,
+        stop_names=stop_names,
+        stop_platforms=stop_platforms,
+        route_ids=route_ids,
+        route_names=route_names,
+        trip_ids=trip_ids,
+        headsigns=headsigns,
+        stop_lat=np.frombuffer(stop_lat, dtype=np.float64).copy(),
+        stop_lon=np.frombuffer(stop_lon, dtype=np.float64).copy(),
+        route_type=np.frombuffer(route_types, dtype=np.int16).copy(),
+        trip_route=np.frombuffer(trip_route, dtype=np.int32).copy(),
+        trip_headsign=np.frombuffer(trip_headsign, dtype=np.int32).copy(),
+        st_trip=np.frombuffer(st_trip, dtype=np.int32),
+        st_stop=np.frombuffer(st_stop, dtype=np.int32),
+        st_seq=np.frombuffer(st_seq, dtype=np.int32),
+        st_arrival=np.frombuffer(st_arrival, dtype=np.int32),
+        st_departure=np.frombuffer(st_departure, dtype=np.int32),
+    )
+
+
+def build_timetable(*, st_seq: np.ndarray, **columns) -> Timetable:
+    """Sort raw stop_times columns and build the trip and per-stop departure indexes."""
+    order = np.lexsort((st_seq, columns["st_trip"]))
+    st_trip = columns.pop("st_trip")[order].astype(np.int32)
+    st_stop = columns.pop("st_stop")[order].astype(np.int32)
+    st_arrival = columns.pop("st_arrival")[order].astype(np.int32)
+    st_departure = columns.pop("st_departure")[order].astype(np.int32)
+    _interpolate_blank_times(st_arrival)
+    _interpolate_blank_times(st_departure)
+
+    n_trips = len(columns["trip_ids"])
+    n_stops = len(columns["stop_ids"])
+    trip_offsets = np.zeros(n_trips + 1, dtype=np.int64)
+    np.cumsum(np.bincount(st_trip, minlength=n_trips), out=trip_offsets[1:])
+
+    # A trip's last stop is an arrival only — leave it out of the departure index
+    is_last = np.zeros(len(st_trip), dtype=bool)
+    is_last[trip_offsets[1:][trip_offsets[1:] > trip_offsets[:-1]] - 1] = True
+    departing = np.flatnonzero(~is_last)
+    dep_order = np.lexsort((st_departure[departing], st_stop[departing]))
+    dep_rows = departing[dep_order].astype(np.int32)
+
+    stop_offsets = np.zeros(n_stops + 1, dtype=np.int64)
+    np.cumsum(np.bincount(st_stop[dep_rows], minlength=n_stops), out=stop_offsets[1:])
+
+    return Timetable(
+        st_trip=st_trip,
+        st_stop=st_stop,
+        st_arrival=st_arrival,
+        st_departure=st_departure,
+        trip_offsets=trip_offsets,
+        stop_offsets=stop_offsets,
+        dep_rows=dep_rows,
+        dep_times=st_departure[dep_rows],
+        **columns,
+    )
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+# Loaded at startup (see app.main lifespan) into the dataset registry, the
+# "timetable" entry; None keeps routers on mock data.
+
+def init_timetable(path: Optional[str] = None, prebuilt: Optional[Timetable] = None) -> Optional[Timetable]:
+    """Load the feed at `path` (default config.GTFS_PATH), or install an already loaded timetable."""
+    path = path or config.GTFS_PATH
+    timetable = prebuilt if prebuilt is not None else load_gtfs(path) if path else None
+    registry.publish(timetable=timetable)
+    return timetable
+
+
+def get_timetable() -> Optional[Timetable]:
+    return registry.get("timetable")
+
+
+def data_version() -> int:
+    """Changes on every (re)load of the timetable; part of dependent cache keys."""
+    return registry.version("timetable")
@@ -0,0 +1,294 @@
+"""
+Upstream Clients — pooled, deadline-bounded async HTTP to external services.
+
+One `Upstream` per external service (the GTFS-RT feed today; TfGM SIRI-SM,
+Traveline, OTP and Highways England as they are wired in), opened in the app
+lifespan and closed on shutdown. Each one owns:
+
+  - its own httpx connection pool (bounded connections and keep-alives), so a
+    slow upstream can only exhaust its own sockets; waiting for a free
+    connection counts against the call's deadline
+  - a deadline per call covering every attempt, backoff and hedge: callers get
+    an answer or an error in bounded time
+  - retries of transport errors, timeouts, 429 and 5xx, with full-jitter
+    exponential backoff
+  - optional hedging: if an attempt hasn't answered after `hedge_after`
+    seconds a second one is sent, and the first good response wins
+  - a circuit breaker: after `breaker_failures` consecutive failed calls the
+    upstream isn't called for `breaker_reset_seconds`, then a single probe
+    is let through (half-open) to decide whether to close it again
+  - a stale store: the last good response per URL, served (marked `stale`)
+    while the breaker is open or a call fails, up to `stale_seconds` old
+
+All I/O is asyncio on the event loop; nothing blocks a thread on a socket.
+An `Upstream` accepts any httpx transport, so it can be pointed at a local stub
+server (just a URL) or an in-process `httpx.MockTransport`.
+
+HACKATHON: Breaker state and stale responses are per process.
+PRODUCTION: Share both through Redis so every worker sees an outage at once.
+"""
+
+import asyncio
+import dataclasses
+import logging
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional
+from urllib.parse import urlencode
+
+import httpx
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# Statuses worth another attempt (and counted as failures when attempts run out)
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamError(Exception):
+    """A call failed (or was refused by the open breaker) and nothing stale could be served."""
+
+    def __init__(self, upstream: str, reason: str):
+        super().__init__(f"{upstream}: {reason}")
+        self.upstream = upstream
+        self.reason = reason
+
+
+@dataclass
+class UpstreamSettings:
+    base_url: str
+    deadline: float = 5.0                  # seconds per call, retries and hedges included
+    connect_timeout: float = 2.0
+    max_connections: int = 20
+    max_keepalive: int = 10
+    retries: int = 2
+    backoff: float = 0.1                   # first retry waits up to this, doubling per retry
+    backoff_cap: float = 2.0
+    hedge_after: Optional[float] = None    # None = never hedge
+    breaker_failures: int = 5
+    breaker_reset_seconds: float = 30.0
+    stale_seconds: float = 600.0
+    stale_entries: int = 256
+
+    @classmethod
+    def from_config(cls, base_url: str) -> "UpstreamSettings":
+        return cls(
+            base_url=base_url,
+            deadline=config.UPSTREAM_DEADLINE_SECONDS,
+            max_connections=config.UPSTREAM_MAX_CONNECTIONS,
+            max_keepalive=max(1, config.UPSTREAM_MAX_CONNECTIONS // 2),
+            retries=config.UPSTREAM_RETRIES,
+            hedge_after=config.UPSTREAM_HEDGE_SECONDS,
+            breaker_failures=config.UPSTREAM_BREAKER_FAILURES,
+            breaker_reset_seconds=config.UPSTREAM_BREAKER_RESET_SECONDS,
+            stale_seconds=config.UPSTREAM_STALE_SECONDS,
+        )
+
+
+@dataclass
+class UpstreamResponse:
+    status: int
+    content: bytes
+    headers: Dict[str, str]
+    fetched_at: float           # time.time() when the upstream answered
+    stale: bool = False         # served from the stale store, not this call
+
+
+class CircuitBreaker:
+    """closed → open after `failures` consecutive failures → half-open (one probe) after `reset_seconds`."""
+
+    def __init__(self, failures: int, reset_seconds: float):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.consecutive = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_seconds else "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record(self, ok: bool) -> None:
+        self._probing = False
+        if ok:
+            self.consecutive = 0
+            self.opened_at = None
+            return
+        self.consecutive += 1
+        # A failed probe re-opens straight away
+        if self.opened_at is not None or self.consecutive >= self.failures:
+            self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """The allowed call was cancelled before it finished: let the next call probe instead."""
+        self._probing = False
+
+
+class Upstream:
+    def __init__(self, name: str, settings: UpstreamSettings,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.name = name
+        self.settings = settings
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.deadline, connect=settings.connect_timeout),
+            limits=httpx.Limits(max_connections=settings.max_connections,
+                                max_keepalive_connections=settings.max_keepalive),
+            transport=transport,
+            follow_redirects=True,
+        )
+        self.breaker = CircuitBreaker(settings.breaker_failures, settings.breaker_reset_seconds)
+        self.counters = {"calls": 0, "attempts": 0, "retries": 0, "hedges": 0,
+                         "failures": 0, "rejected": 0, "stale": 0}
+        self._stale: "OrderedDict[str, UpstreamResponse]" = OrderedDict()
+
+    def url(self, path: str = "", params: Optional[Mapping[str, Any]] = None) -> str:
+        # Joined by hand: httpx's base_url would add a trailing slash to a bare feed URL
+        url = self.settings.base_url
+        if path:
+            url = f"{url.rstrip('/')}/{path.lstrip('/')}"
+        if params:
+            url = f"{url}{'&' if '?' in url else '?'}{urlencode(params, doseq=True)}"
+        return url
+
+    async def get(self, path: str = "", params: Optional[Mapping[str, Any]] = None,
+                  headers: Optional[Mapping[str, str]] = None) -> UpstreamResponse:
+        """GET `path` within the deadline; a stale response, or UpstreamError, if that fails."""
+        url = self.url(path, params)
+        self.counters["calls"] += 1
+        if not self.breaker.allow():
+            self.counters["rejected"] += 1
+            return self._stale_or_raise(url, "circuit open")
+        try:
+            # wait_for, not asyncio.timeout: that needs Python 3.11, and no minimum is declared
+            response = await asyncio.wait_for(self._attempts(url, headers), self.settings.deadline)
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            raise
+        except (httpx.HTTPError, asyncio.TimeoutError) as exc:
+            self.breaker.record(False)
+            self.counters["failures"] += 1
+            timed_out = isinstance(exc, asyncio.TimeoutError)
+            reason = f"no answer within {self.settings.deadline:g}s" if timed_out else str(exc)
+            logger.warning("Upstream %s: GET %s failed (%s)", self.name, url, reason or type(exc).__name__)
+            return self._stale_or_raise(url, reason)
+        self.breaker.record(True)
+        if 200 <= response.status < 300:
+            self._stale[url] = response
+            self._stale.move_to_end(url)
+            while len(self._stale) > self.settings.stale_entries:
+                self._stale.popitem(last=False)
+        return response
+
+    async def _attempts(self, url: str, headers: Optional[Mapping[str, str]]) -> UpstreamResponse:
+        settings = self.settings
+        for attempt in range(settings.retries + 1):
+            try:
+                return await self._hedged(url, headers)
+            except (httpx.TransportError, httpx.HTTPStatusError):
+                if attempt == settings.retries:
+                    raise
+                self.counters["retries"] += 1
+                await asyncio.sleep(random.uniform(0, min(settings.backoff_cap, settings.backoff * 2 ** attempt)))
+        raise AssertionError("unreachable")
+
+    async def _hedged(self, url: str, headers: Optional[Mapping[str, str]]) -> UpstreamResponse:
+        if self.settings.hedge_after is None:
+            return await self._send(url, headers)
+        tasks = [asyncio.ensure_future(self._send(url, headers))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.settings.hedge_after)
+            if not done:
+                self.counters["hedges"] += 1
+                tasks.append(asyncio.ensure_future(self._send(url, headers)))
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            # The loser (or both, on cancellation) is cancelled, releasing its connection
+            for task in tasks:
+                task.cancel()
+
+    async def _send(self, url: str, headers: Optional[Mapping[str, str]]) -> UpstreamResponse:
+        self.counters["attempts"] += 1
+        response = await self.client.get(url, headers=headers)
+        if response.status_code in RETRY_STATUSES:
+            raise httpx.HTTPStatusError(f"HTTP {response.status_code}", request=response.request, response=response)
+        return UpstreamResponse(status=response.status_code, content=response.content,
+                                headers=dict(response.headers), fetched_at=time.time())
+
+    def _stale_or_raise(self, url: str, reason: str) -> UpstreamResponse:
+        kept = self._stale.get(url)
+        if kept is not None and time.time() - kept.fetched_at <= self.settings.stale_seconds:
+            self.counters["stale"] += 1
+            return dataclasses.replace(kept, stale=True)
+        raise UpstreamError(self.name, reason)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"url": self.settings.base_url, "circuit": self.breaker.state,
+                "stale_entries": len(self._stale), **self.counters}
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+# ─── Module state ─────────────────────────────────────────────────────────────
+# Opened in the app lifespan (before the realtime poller starts), closed on shutdown.
+
+_upstreams: Dict[str, Upstream] = {}
+
+
+def configured_urls() -> Dict[str, str]:
+    """Upstreams to open: config.UPSTREAM_URLS, plus "gtfs_rt" when the GTFS-RT feed is a URL."""
+    urls = dict(config.UPSTREAM_URLS)
+    if config.GTFS_RT_URL and config.GTFS_RT_URL.startswith(("http://", "https://")):
+        urls.setdefault("gtfs_rt", config.GTFS_RT_URL)
+    return urls
+
+
+def open_upstream(name: str, base_url: str, transport: Optional[httpx.AsyncBaseTransport] = None,
+                  settings: Optional[UpstreamSettings] = None) -> Upstream:
+    """Register a client for `name` (settings from config unless given); replaces any open one."""
+    previous = _upstreams.pop(name, None)
+    if previous is not None:
+        asyncio.get_running_loop().create_task(previous.close())
+    _upstreams[name] = Upstream(name, settings or UpstreamSettings.from_config(base_url), transport)
+    return _upstreams[name]
+
+
+def open_upstreams(urls: Optional[Mapping[str, str]] = None) -> Dict[str, Upstream]:
+    for name, url in (configured_urls() if urls is None else urls).items():
+        open_upstream(name, url)
+    return _upstreams
+
+
+async def close_upstreams() -> None:
+    clients = list(_upstreams.values())
+    _upstreams.clear()
+    await asyncio.gather(*(client.close() for client in clients))
+
+
+def get_upstream(name: str) -> Optional[Upstream]:
+    return _upstreams.get(name)
+
+
+def upstreams() -> Dict[str, Upstream]:
+    return _upstreams
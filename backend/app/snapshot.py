@@ -0,0 +1,49 @@
+"""
+Build or inspect the dataset snapshot (app.services.snapshot).
+
+    python -m app.snapshot build [--output PATH]   load from SMARTBEE_* sources, write the snapshot
+    python -m app.snapshot check [PATH]            print its header, verify its checksum; exit 1 if stale or corrupt
+
+PATH defaults to SMARTBEE_SNAPSHOT_PATH.
+"""
+
+import argparse
+import json
+import logging
+import sys
+
+from app import config
+from app.services import shared, snapshot
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.snapshot", description=__doc__.split("\n\n")[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile the configured datasets into a snapshot")
+    build.add_argument("--output", default=config.SNAPSHOT_PATH)
+    check = commands.add_parser("check", help="verify a snapshot against the configured sources")
+    check.add_argument("path", nargs="?", default=config.SNAPSHOT_PATH)
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(message)s")
+
+    path = args.output if args.command == "build" else args.path
+    if not path:
+        parser.error("no snapshot path: pass one or set SMARTBEE_SNAPSHOT_PATH")
+    if args.command == "build":
+        snapshot.build_snapshot(path)
+        return 0
+
+    reason = snapshot.stale_reason(path)
+    if reason != "missing" and not (reason or "").startswith("unreadable"):
+        print(json.dumps(shared.read_header(path)["meta"], indent=2))
+        if reason is None:
+            try:
+                shared.attach(path, verify=True)
+            except ValueError as exc:
+                reason = str(exc)
+    print(f"{path}: {reason or 'ok'}", file=sys.stderr)
+    return 1 if reason else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,14 @@
+"""
+SmartBee benchmark suite.
+
+Run from backend/:
+
+    python -m benchmarks                          # scale 0.1, micro + load, results.json
+    python -m benchmarks --scale 1 --out gm.json  # Greater Manchester-sized data
+    python -m benchmarks --baseline old.json      # also print the change vs an earlier run
+
+Modules:
+    synthetic  seeded dataset generator (GTFS, GTFS-RT, road graph, heatmap events)
+    micro      direct timings of the engines behind each endpoint
+    load       in-process HTTP load driver (httpx + ASGITransport)
+"""
@@ -0,0 +1,105 @@
+"""Command-line entry point: `python -m benchmarks --help`."""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Tuple
+
+from benchmarks import load, micro, synthetic
+
+# Metrics compared against a baseline run, and whether higher is better
+TRACKED = {"p50_ms": False, "p95_ms": False, "p99_ms": False, "throughput_rps": True}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def prepare_data(directory: str, scale: float) -> Dict[str, Any]:
+    """Generate the datasets, reusing an earlier generation at the same scale."""
+    manifest_path = os.path.join(directory, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest["scale"] == scale and all(os.path.exists(p) for p in manifest["paths"].values()):
+            return manifest
+    manifest = synthetic.generate(directory, scale)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def tracked_metrics(results: Dict[str, Any], prefix: str = "") -> Iterator[Tuple[str, float]]:
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from tracked_metrics(value, f"{prefix}{key}.")
+        elif key in TRACKED:
+            yield f"{prefix}{key}", value
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any]) -> None:
+    before = dict(tracked_metrics({k: baseline.get(k, {}) for k in ("micro", "load")}))
+    print(f"\nChange vs baseline {baseline['meta']['commit']} (+ = better)")
+    for name, value in tracked_metrics({k: current.get(k, {}) for k in ("micro", "load")}):
+        old = before.get(name)
+        if not old:
+            continue
+        change = (value - old) / old * 100
+        better = change if TRACKED[name.rsplit(".", 1)[1]] else -change
+        print(f"  {better:+7.1f}%  {name}: {old} -> {value}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("--scale", type=float, default=0.1,
+                        help="dataset size relative to Greater Manchester (1.0 = full size)")
+    parser.add_argument("--data", default=".bench-data", help="directory for generated datasets")
+    parser.add_argument("--out", default="benchmark-results.json", help="where to write the results JSON")
+    parser.add_argument("--only", choices=["micro", "load"], help="run one suite only")
+    parser.add_argument("--iterations", type=int, default=200, help="micro-benchmark iterations")
+    parser.add_argument("--requests", type=int, default=500, help="HTTP requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent HTTP clients")
+    parser.add_argument("--distinct", type=int, default=100,
+                        help="distinct parameter sets per endpoint (controls the cache hit ratio)")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    args = parser.parse_args(argv)
+
+    manifest = prepare_data(args.data, args.scale)
+    results: Dict[str, Any] = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "args": vars(args),
+            "dataset": manifest["counts"],
+        },
+    }
+    if args.only in (None, "micro"):
+        print("Running micro-benchmarks...", file=sys.stderr)
+        results["micro"] = micro.run(manifest["paths"], args.iterations)
+    if args.only in (None, "load"):
+        print("Running HTTP load...", file=sys.stderr)
+        results["load"] = load.run(manifest["paths"], args.requests, args.concurrency, args.distinct)
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps({k: v for k, v in results.items() if k != "meta"}, indent=2))
+    print(f"\nResults written to {args.out}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
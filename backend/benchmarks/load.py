@@ -0,0 +1,122 @@
+"""
+In-process HTTP load driver for every /api endpoint.
+
+Runs the real FastAPI app (lifespan included) against the synthetic datasets
+through httpx's ASGITransport, so numbers cover routing, validation, caching
+and encoding but not sockets. Each scenario fires `requests` calls from
+`concurrency` workers; parameters are drawn from a pool of `distinct` values,
+so the pool size controls the response-cache hit ratio.
+
+Reported per endpoint: throughput (req/s), p50/p95/p99 latency, status codes,
+`X-Cache` outcomes and mean response size.
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+import httpx
+import numpy as np
+
+from app import config
+
+from benchmarks.micro import summarize
+from benchmarks.synthetic import CENTRE
+
+Request = Tuple[str, str, Dict[str, Any]]   # method, url, httpx kwargs
+
+
+def configure(paths: Dict[str, str]) -> None:
+    """Point the app's lifespan loaders at the synthetic datasets."""
+    config.GTFS_PATH = paths.get("gtfs")
+    config.GTFS_RT_URL = paths.get("gtfs_rt")
+    config.ROAD_GRAPH_PATH = paths.get("road_graph")
+    config.HEATMAP_EVENTS_PATH = paths.get("events")
+    config.HISTORY_PATH = paths.get("history")
+
+
+def scenarios(timetable, graph, distinct: int, seed: int = 20) -> Dict[str, Callable[[int], Request]]:
+    rng = np.random.default_rng(seed)
+    names = [timetable.stop_names[s] for s in rng.integers(0, len(timetable.stop_ids), distinct * 2).tolist()]
+    roads = [graph.road_ids[r] for r in rng.integers(0, len(graph.road_ids), distinct).tolist()]
+    zooms = rng.integers(12, 17, distinct).tolist()
+    lat = (CENTRE[0] + rng.normal(0.0, 0.05, distinct)).tolist()
+    lng = (CENTRE[1] + rng.normal(0.0, 0.08, distinct)).tolist()
+    bboxes = [f"{ln - 0.03:.4f},{la - 0.02:.4f},{ln + 0.03:.4f},{la + 0.02:.4f}" for la, ln in zip(lat, lng)]
+
+    return {
+        "GET /api/arrivals": lambda i: (
+            "GET", "/api/arrivals", {"params": {"stop": names[i % distinct]}}),
+        "POST /api/arrivals/batch": lambda i: (
+            "POST", "/api/arrivals/batch",
+            {"json": {"stops": [names[(i + k) % distinct] for k in range(20)]}}),
+        "GET /api/routes": lambda i: (
+            "GET", "/api/routes",
+            {"params": {"origin": names[i % distinct], "destination": names[distinct + i % distinct]}}),
+        "GET /api/stops/search": lambda i: (
+            "GET", "/api/stops/search", {"params": {"q": names[i % distinct][:1 + i % 8]}}),
+        "GET /api/heatmap": lambda i: (
+            "GET", "/api/heatmap",
+            {"params": {"metric": ("demand", "delay", "crowding")[i % 3], "bbox": bboxes[i % distinct],
+                        "zoom": zooms[i % distinct]}}),
+        "POST /api/road-closure-impact": lambda i: (
+            "POST", "/api/road-closure-impact",
+            {"json": {"road_id": roads[i % distinct], "duration_hours": 2}}),
+        "POST /api/road-closure-impact/batch": lambda i: (
+            "POST", "/api/road-closure-impact/batch",
+            {"json": {"scenarios": [{"road_id": roads[(i + k) % distinct], "duration_hours": 1 + k % 8,
+                                     "start_hour": (i + 3 * k) % 24} for k in range(100)]}}),
+        "GET /health": lambda i: ("GET", "/health", {}),
+    }
+
+
+async def drive(client: httpx.AsyncClient, make: Callable[[int], Request],
+                requests: int, concurrency: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    cache: Counter = Counter()
+    sizes: List[int] = []
+    counter = iter(range(requests))
+
+    async def worker():
+        for i in counter:
+            method, url, kwargs = make(i)
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] += 1
+            cache[response.headers.get("x-cache", "-")] += 1
+            sizes.append(len(response.content))
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return {
+        "throughput_rps": round(requests / elapsed, 1),
+        "latency": summarize(latencies),
+        "status": dict(statuses),
+        "cache": dict(cache),
+        "mean_bytes": int(np.mean(sizes)),
+    }
+
+
+async def run_async(paths: Dict[str, str], requests: int, concurrency: int,
+                    distinct: int) -> Dict[str, Any]:
+    configure(paths)
+    from app.main import app
+    from app.services.road_graph import get_road_graph
+    from app.services.timetable import get_timetable
+
+    results: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, make in scenarios(get_timetable(), get_road_graph(), distinct).items():
+                results[name] = await drive(client, make, requests, concurrency)
+    return results
+
+
+def run(paths: Dict[str, str], requests: int = 500, concurrency: int = 16,
+        distinct: int = 100) -> Dict[str, Any]:
+    return asyncio.run(run_async(paths, requests, concurrency, distinct))
@@ -0,0 +1,194 @@
+"""
+Micro-benchmarks for the core engines, called directly (no HTTP, no cache).
+
+Each benchmark loads its engine from the synthetic files once (load time is
+reported separately), then times individual operations over a seeded random
+workload:
+
+  - arrivals:  `Timetable.arrival_board` for a random stop at a random time
+  - routes:    `RaptorNetwork.plan` between two random stops; filling one travel-time
+               matrix row, and a `detail=false` lookup once rows are filled
+  - heatmap:   `TileGrid.cell_rows` for a random viewport and zoom
+  - closure:   `RoadGraph.simulate` for a random road, cold (memo cleared) and warm, and
+               `DemandModel.estimate` for a batch of 500 random closure windows
+  - history:   15-minute window over 30 days of stop events, and the heatmap grid built from it
+  - stops:     `StopResolver.search` for every keystroke of random stop names, and for misspellings
+"""
+
+import statistics
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.services.demand import DemandModel
+from app.services.history import HistoryStore
+from app.services.matrix import BANDS, TravelTimeMatrix
+from app.services.planner import build_network
+from app.services.road_graph import load_road_graph
+from app.services.stop_resolver import StopResolver
+from app.services.tiles import MAX_ZOOM, MIN_ZOOM, load_events
+from app.services.timetable import load_gtfs
+
+from benchmarks.synthetic import CENTRE, SERVICE_END, SERVICE_START
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds for a list of durations in seconds."""
+    ms = np.array(samples) * 1000.0
+    return {
+        "n": len(samples),
+        "mean_ms": round(float(ms.mean()), 4),
+        "p50_ms": round(float(np.percentile(ms, 50)), 4),
+        "p95_ms": round(float(np.percentile(ms, 95)), 4),
+        "p99_ms": round(float(np.percentile(ms, 99)), 4),
+        "max_ms": round(float(ms.max()), 4),
+        "stdev_ms": round(statistics.pstdev(ms.tolist()), 4),
+    }
+
+
+def measure(operation: Callable[[int], object], iterations: int, warmup: int = 5) -> Dict[str, float]:
+    """Time `operation(i)` for i in range(iterations) after `warmup` untimed calls."""
+    for i in range(warmup):
+        operation(i)
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        operation(i)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def timed(load: Callable[[], object]):
+    start = time.perf_counter()
+    value = load()
+    return value, round(time.perf_counter() - start, 3)
+
+
+def bench_arrivals(gtfs_path: str, iterations: int, seed: int = 10) -> Dict[str, object]:
+    timetable, load_seconds = timed(lambda: load_gtfs(gtfs_path))
+    rng = np.random.default_rng(seed)
+    stops = rng.integers(0, len(timetable.stop_ids), iterations + 5).tolist()
+    times = rng.integers(SERVICE_START, SERVICE_END, iterations + 5).tolist()
+    return {
+        "load_seconds": load_seconds,
+        "board": measure(lambda i: timetable.arrival_board([stops[i]], times[i], 10), iterations),
+        "board_by_name": measure(
+            lambda i: timetable.arrival_board(timetable.stops_named(timetable.stop_names[stops[i]]),
+                                              times[i], 10),
+            iterations,
+        ),
+    }
+
+
+def bench_routes(gtfs_path: str, iterations: int, seed: int = 11) -> Dict[str, object]:
+    timetable = load_gtfs(gtfs_path)
+    network, build_seconds = timed(lambda: build_network(timetable))
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, len(timetable.stop_ids), (iterations + 5, 2)).tolist()
+    departs = rng.integers(SERVICE_START, SERVICE_END - 3 * 3600, iterations + 5).tolist()
+    results = {
+        "build_seconds": build_seconds,
+        "plan": measure(lambda i: network.plan([pairs[i][0]], [pairs[i][1]], departs[i], 3), iterations),
+    }
+    with tempfile.TemporaryDirectory() as root:
+        band = BANDS[1]
+        matrix = TravelTimeMatrix(root, network, [band])
+        rows = max(5, iterations // 20)
+        results["matrix_row"] = measure(
+            lambda i: matrix.bands[band.name].fill(network, pairs[i][0], matrix.disruption), rows, warmup=0
+        )
+        results["matrix_lookup"] = measure(
+            lambda i: matrix.lookup([pairs[i % rows][0]], [pairs[i][1]], band.depart), iterations, warmup=0
+        )
+    return results
+
+
+def bench_heatmap(events_path: str, iterations: int, seed: int = 12) -> Dict[str, object]:
+    grids, load_seconds = timed(lambda: load_events(events_path))
+    rng = np.random.default_rng(seed)
+    zooms = rng.integers(MIN_ZOOM, MAX_ZOOM + 1, iterations + 5).tolist()
+    # Viewports of a typical phone/desktop map (~1280×800 px of tiles) around the centre
+    span = [360.0 / 2 ** z * 5 for z in zooms]
+    lat = (CENTRE[0] + rng.normal(0.0, 0.05, iterations + 5)).tolist()
+    lng = (CENTRE[1] + rng.normal(0.0, 0.08, iterations + 5)).tolist()
+    bboxes = [(ln - s / 2, la - s / 3, ln + s / 2, la + s / 3) for la, ln, s in zip(lat, lng, span)]
+    results: Dict[str, object] = {"load_seconds": load_seconds}
+    for metric, grid in grids.items():
+        results[f"{metric}_viewport"] = measure(lambda i: grid.cell_rows(zooms[i], bboxes[i]), iterations)
+        results[f"{metric}_full_z{MIN_ZOOM}"] = measure(
+            lambda i: grid.cell_rows(MIN_ZOOM), max(10, iterations // 10)
+        )
+    return results
+
+
+def bench_closure(graph_path: str, gtfs_path: str, iterations: int, seed: int = 13) -> Dict[str, object]:
+    graph, load_seconds = timed(lambda: load_road_graph(graph_path))
+    rng = np.random.default_rng(seed)
+    roads = [graph.road_ids[r] for r in rng.integers(0, len(graph.road_ids), iterations + 5).tolist()]
+
+    def cold(i):
+        graph._impacts.clear()
+        graph.simulate(roads[i])
+
+    results = {"load_seconds": load_seconds, "simulate_cold": measure(cold, iterations)}
+    for road in roads:
+        graph.simulate(road)
+    results["simulate_warm"] = measure(lambda i: graph.simulate(roads[i]), iterations)
+
+    demand = DemandModel.from_timetable(load_gtfs(gtfs_path))
+    affected = [[r.route for r in graph.closure_impact(road)] for road in roads]
+    batch = 500
+    starts, durations = rng.uniform(0, 24, batch), rng.integers(1, 49, batch)
+    results["estimate_batch_500"] = measure(
+        lambda i: demand.estimate([affected[(i + k) % len(affected)] for k in range(batch)], starts, durations),
+        iterations)
+    return results
+
+
+def bench_history(history_path: str, iterations: int, seed: int = 14) -> Dict[str, object]:
+    store = HistoryStore(history_path)
+    rng = np.random.default_rng(seed)
+    midnight = datetime.combine(max(store.days(), default=date.today()), datetime.min.time())
+    ends = [midnight + timedelta(seconds=s) for s in rng.integers(6 * 3600, 23 * 3600, iterations + 5).tolist()]
+    return {
+        "window_15min_30days": measure(lambda i: store.window(ends[i], 15, 30), iterations),
+        "window_hourly_buckets": measure(lambda i: store.window(ends[i], 60, 30, bucket_minutes=15),
+                                         max(10, iterations // 4)),
+        "delay_grid": measure(lambda i: store.heat_grid("delay", ends[i], 15, 30), max(10, iterations // 4)),
+    }
+
+
+def bench_stops(gtfs_path: str, iterations: int, seed: int = 15) -> Dict[str, object]:
+    timetable = load_gtfs(gtfs_path)
+    resolver, build_seconds = timed(lambda: StopResolver.from_timetable(timetable))
+    rng = np.random.default_rng(seed)
+    names = [timetable.stop_names[s] for s in rng.integers(0, len(timetable.stop_ids), iterations + 5).tolist()]
+    # Every prefix a user types on the way to the full name
+    keystrokes = [name[:n] for name in names for n in range(1, len(name) + 1)][:iterations + 5]
+
+    def misspell(name: str, i: int) -> str:
+        j = 1 + i % max(1, len(name) - 2)
+        return name[:j] + name[j + 1] + name[j] + name[j + 2:]   # swap two letters
+
+    typos = [misspell(name, i) for i, name in enumerate(names)]
+    return {
+        "build_seconds": build_seconds,
+        "places": resolver.n_places,
+        "search_keystroke": measure(lambda i: resolver.search(keystrokes[i], 10), iterations),
+        "search_typo": measure(lambda i: resolver.search(typos[i], 10), iterations),
+        "resolve_typo": measure(lambda i: resolver.resolve(typos[i]), iterations),
+    }
+
+
+def run(paths: Dict[str, str], iterations: int = 200) -> Dict[str, object]:
+    return {
+        "arrivals": bench_arrivals(paths["gtfs"], iterations),
+        "routes": bench_routes(paths["gtfs"], iterations),
+        "heatmap": bench_heatmap(paths["events"], iterations),
+        "closure": bench_closure(paths["road_graph"], paths["gtfs"], max(10, iterations // 4)),
+        "history": bench_history(paths["history"], max(10, iterations // 2)),
+        "stops": bench_stops(paths["gtfs"], iterations),
+    }
@@ -0,0 +1,297 @@
+"""
+Synthetic Greater Manchester-sized datasets for benchmarks.
+
+Writes the same file formats the app loads in production (see app.config):
+
+  - gtfs.zip       GTFS static feed: stops clustered on the city centre, radial
+                   routes through it, trips every 6–30 minutes from 05:00
+  - gtfs_rt.pb     GTFS-RT TripUpdates delaying / cancelling a share of trips
+                   (only when gtfs-realtime-bindings is installed)
+  - road_graph.json  grid road network with bus route shapes along it
+  - events.npz     raw demand and delay events for the heatmap tiles
+  - history/       30 days of observed stop events (app.services.history)
+
+`scale=1.0` approximates the real network (≈12.5k stops, ≈600 routes,
+≈57k trips / 2M stop_times a day, ≈90k road nodes, ≈2.5M heatmap events,
+≈2M stop events a day of history).
+Everything is seeded, so the same scale always produces identical data.
+"""
+
+import json
+import math
+import os
+import shutil
+import zipfile
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Dict, List
+
+import numpy as np
+
+from app.services.history import HistoryStore
+
+# Greater Manchester bounding box and Piccadilly Gardens (the demo's centre)
+GM_BBOX = (-2.73, 53.33, -1.91, 53.69)  # min_lng, min_lat, max_lng, max_lat
+CENTRE = (53.4779, -2.2323)
+
+# Stops the mock data and the frontend demo refer to by name
+KEY_STOPS = [
+    ("piccadilly", "Piccadilly Gardens", 53.4779, -2.2323),
+    ("deansgate", "Deansgate", 53.4786, -2.2491),
+    ("chorlton", "Chorlton", 53.4450, -2.2753),
+    ("fallowfield", "Fallowfield", 53.4424, -2.2175),
+    ("salford_quays", "Salford Quays", 53.4715, -2.2992),
+    ("airport", "Manchester Airport", 53.3658, -2.2723),
+]
+
+SERVICE_START = 5 * 3600
+SERVICE_END = 24 * 3600
+
+
+@dataclass
+class Sizes:
+    stops: int
+    routes: int
+    stops_per_route: int
+    road_grid: int          # road graph is road_grid × road_grid nodes
+    road_routes: int
+    demand_events: int
+    delay_events: int
+    history_days: int
+    history_events_per_day: int
+
+    @classmethod
+    def for_scale(cls, scale: float) -> "Sizes":
+        stops_per_route = 35
+        return cls(
+            # Each route picks from the 3 × stops_per_route stops nearest its line
+            stops=max(len(KEY_STOPS) + 3 * stops_per_route, int(12_500 * scale)),
+            routes=max(10, int(600 * scale)),
+            stops_per_route=stops_per_route,
+            road_grid=max(20, int(300 * math.sqrt(scale))),
+            road_routes=max(10, int(600 * scale)),
+            demand_events=max(1_000, int(2_000_000 * scale)),
+            delay_events=max(1_000, int(500_000 * scale)),
+            history_days=30,
+            history_events_per_day=max(1_000, int(2_000_000 * scale)),
+        )
+
+
+def _csv(header: str, rows: List[str]) -> str:
+    return header + "\n" + "\n".join(rows) + "\n"
+
+
+def _hms(seconds: np.ndarray) -> List[str]:
+    seconds = seconds.astype(np.int64)
+    return [f"{h:02d}:{m:02d}:{s:02d}" for h, m, s in
+            zip((seconds // 3600).tolist(), (seconds % 3600 // 60).tolist(), (seconds % 60).tolist())]
+
+
+def stop_positions(n: int, rng: np.random.Generator) -> np.ndarray:
+    """(lat, lng) for `n` stops: dense around the centre, thinning out to the boundary."""
+    min_lng, min_lat, max_lng, max_lat = GM_BBOX
+    radius = np.abs(rng.normal(0.0, 0.09, n))
+    angle = rng.uniform(0.0, 2 * math.pi, n)
+    lat = np.clip(CENTRE[0] + radius * np.sin(angle), min_lat, max_lat)
+    lng = np.clip(CENTRE[1] + radius * 1.6 * np.cos(angle), min_lng, max_lng)
+    return np.stack([lat, lng], axis=1)
+
+
+def write_gtfs(path: str, sizes: Sizes, seed: int = 1) -> Dict[str, int]:
+    rng = np.random.default_rng(seed)
+    n_extra = sizes.stops - len(KEY_STOPS)
+    positions = stop_positions(n_extra, rng)
+    stop_ids = [s[0] for s in KEY_STOPS] + [f"gm{i:05d}" for i in range(n_extra)]
+    stop_names = [s[1] for s in KEY_STOPS] + [f"Stop {i:05d}" for i in range(n_extra)]
+    lat = np.concatenate([[s[2] for s in KEY_STOPS], positions[:, 0]])
+    lng = np.concatenate([[s[3] for s in KEY_STOPS], positions[:, 1]])
+    stops = [f"{sid},{name},{la:.6f},{ln:.6f}," for sid, name, la, ln in
+             zip(stop_ids, stop_names, lat.tolist(), lng.tolist())]
+
+    # Radial routes: stops near a random line through the centre, ordered along it
+    routes, trips, stop_times = [], [], []
+    n_trips = 0
+    y = (lat - CENTRE[0]) * 111_000
+    x = (lng - CENTRE[1]) * 111_000 * math.cos(math.radians(CENTRE[0]))
+    for r in range(sizes.routes):
+        theta = rng.uniform(0.0, math.pi)
+        offset = rng.normal(0.0, 1500.0)
+        across = np.abs(-x * math.sin(theta) + y * math.cos(theta) - offset)
+        along = x * math.cos(theta) + y * math.sin(theta)
+        near = np.argpartition(across, sizes.stops_per_route * 3)[:sizes.stops_per_route * 3]
+        chosen = rng.choice(near, sizes.stops_per_route, replace=False)
+        if r % 2 == 0 and 0 not in chosen:
+            chosen[0] = 0  # half the routes serve Piccadilly Gardens
+        pattern = chosen[np.argsort(along[chosen])]
+        if r % 2:
+            pattern = pattern[::-1]
+
+        tram = r % 15 == 0
+        route_type = 0 if tram else 3
+        name = f"{r + 1}" if not tram else f"M{r + 1}"
+        routes.append(f"r{r},{name},,{route_type}")
+
+        hop = np.hypot(np.diff(x[pattern]), np.diff(y[pattern]))
+        speed = 11.0 if tram else 5.5                                  # metres per second
+        offsets = np.concatenate([[0.0], np.cumsum(hop / speed + 20.0)])
+        headway = int(rng.choice([6, 10, 12, 15, 20, 30])) * 60
+        starts = np.arange(SERVICE_START + int(rng.integers(0, headway)), SERVICE_END, headway)
+        headsign = stop_names[pattern[-1]]
+        for start in starts.tolist():
+            trip_id = f"t{n_trips}"
+            n_trips += 1
+            trips.append(f"r{r},weekday,{trip_id},{headsign}")
+            times = _hms(start + offsets)
+            stop_times.extend(
+                f"{trip_id},{t},{t},{stop_ids[s]},{k + 1}"
+                for k, (t, s) in enumerate(zip(times, pattern.tolist()))
+            )
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as feed:
+        feed.writestr("stops.txt", _csv("stop_id,stop_name,stop_lat,stop_lon,platform_code", stops))
+        feed.writestr("routes.txt", _csv("route_id,route_short_name,route_long_name,route_type", routes))
+        feed.writestr("trips.txt", _csv("route_id,service_id,trip_id,trip_headsign", trips))
+        feed.writestr("stop_times.txt",
+                      _csv("trip_id,arrival_time,departure_time,stop_id,stop_sequence", stop_times))
+    return {"stops": len(stops), "routes": len(routes), "trips": n_trips, "stop_times": len(stop_times)}
+
+
+def write_trip_updates(path: str, n_trips: int, fraction: float = 0.2, seed: int = 3) -> int:
+    """GTFS-RT feed delaying (and occasionally cancelling) `fraction` of trips t0..t{n-1}."""
+    from google.transit import gtfs_realtime_pb2
+
+    rng = np.random.default_rng(seed)
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = 1
+    chosen = rng.choice(n_trips, int(n_trips * fraction), replace=False)
+    for i, trip in enumerate(np.sort(chosen).tolist()):
+        entity = feed.entity.add()
+        entity.id = str(i)
+        update = entity.trip_update
+        update.trip.trip_id = f"t{trip}"
+        if rng.random() < 0.02:
+            update.trip.schedule_relationship = gtfs_realtime_pb2.TripDescriptor.CANCELED
+        else:
+            stu = update.stop_time_update.add()
+            stu.stop_sequence = 1
+            stu.departure.delay = int(rng.gamma(2.0, 90.0))
+    with open(path, "wb") as f:
+        f.write(feed.SerializeToString())
+    return len(chosen)
+
+
+def write_road_graph(path: str, sizes: Sizes, seed: int = 2) -> Dict[str, int]:
+    """Grid network over the GM bbox; row `n // 2` is Oxford Road, routes follow rows/columns."""
+    rng = np.random.default_rng(seed)
+    n = sizes.road_grid
+    min_lng, min_lat, max_lng, max_lat = GM_BBOX
+    lats = np.linspace(min_lat, max_lat, n)
+    lngs = np.linspace(min_lng, max_lng, n)
+    dy = (lats[1] - lats[0]) * 111_000
+    dx = (lngs[1] - lngs[0]) * 111_000 * math.cos(math.radians(CENTRE[0]))
+
+    nodes = [[f"n{i}_{j}", round(float(lats[i]), 6), round(float(lngs[j]), 6)]
+             for i in range(n) for j in range(n)]
+    edges = []
+    for i in range(n):
+        row = ("oxford_road", "Oxford Road (A34)") if i == n // 2 else (f"row_{i}", f"Row Road {i}")
+        speed = 48 if i == n // 2 else int(rng.choice([30, 40, 50]))
+        for j in range(n - 1):
+            a, b = f"n{i}_{j}", f"n{i}_{j + 1}"
+            edges += [[a, b, round(dx, 1), speed, *row], [b, a, round(dx, 1), speed, *row]]
+    for j in range(n):
+        col = (f"col_{j}", f"Column Street {j}")
+        speed = int(rng.choice([30, 40, 50]))
+        for i in range(n - 1):
+            a, b = f"n{i}_{j}", f"n{i + 1}_{j}"
+            edges += [[a, b, round(dy, 1), speed, *col], [b, a, round(dy, 1), speed, *col]]
+
+    routes = {}
+    step = max(1, n // 30)
+    for r in range(sizes.road_routes):
+        fixed = n // 2 if r < 6 else int(rng.integers(n))
+        lo, hi = sorted(rng.choice(n, 2, replace=False).tolist())
+        if r % 2 == 0:
+            shape = [[float(lats[fixed]), float(lngs[j])] for j in range(lo, hi + 1, step)]
+        else:
+            shape = [[float(lats[i]), float(lngs[fixed])] for i in range(lo, hi + 1, step)]
+        routes[str(r + 1)] = shape
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"nodes": nodes, "edges": edges, "routes": routes}, f)
+    return {"nodes": len(nodes), "edges": len(edges), "routes": len(routes)}
+
+
+def write_events(path: str, sizes: Sizes, seed: int = 4) -> Dict[str, int]:
+    rng = np.random.default_rng(seed)
+    demand = stop_positions(sizes.demand_events, rng)
+    delay = stop_positions(sizes.delay_events, rng)
+    np.savez(
+        path,
+        demand_lat=demand[:, 0], demand_lng=demand[:, 1],
+        demand_weight=rng.integers(1, 4, sizes.demand_events).astype(np.float32),
+        delay_lat=delay[:, 0], delay_lng=delay[:, 1],
+        delay_weight=rng.gamma(2.0, 120.0, sizes.delay_events).astype(np.float32),
+    )
+    return {"demand_events": sizes.demand_events, "delay_events": sizes.delay_events}
+
+
+def write_history(directory: str, sizes: Sizes, seed: int = 5, today: date = None) -> Dict[str, int]:
+    """`history_days` sealed days (up to yesterday) plus a partial unsealed today.
+
+    Stop events peak at 08:00 and 17:00; delays and load factors rise with the
+    peaks and towards the centre.
+    """
+    rng = np.random.default_rng(seed)
+    store = HistoryStore(directory)
+    stop_rng = np.random.default_rng(1)   # same stop layout as write_gtfs
+    positions = stop_positions(sizes.stops - len(KEY_STOPS), stop_rng)
+    lat = np.concatenate([[s[2] for s in KEY_STOPS], positions[:, 0]])
+    lng = np.concatenate([[s[3] for s in KEY_STOPS], positions[:, 1]])
+    stop_ids = [s[0] for s in KEY_STOPS] + [f"gm{i:05d}" for i in range(len(positions))]
+    names = [s[1] for s in KEY_STOPS] + [f"Stop {i:05d}" for i in range(len(positions))]
+    store.register_stops(stop_ids, names, lat, lng)
+    centrality = np.exp(-np.hypot(lat - CENTRE[0], (lng - CENTRE[1]) / 1.6) / 0.05)
+
+    today = today or date.today()
+    n = sizes.history_events_per_day
+    rows = 0
+    for back in range(sizes.history_days, -1, -1):
+        day = today - timedelta(days=back)
+        count = n if back else n // 2
+        peak = rng.choice([8 * 3600, 17 * 3600, 13 * 3600], count, p=[0.35, 0.35, 0.3])
+        seconds = np.sort(np.clip(rng.normal(peak, 2.5 * 3600), SERVICE_START, 86_399).astype(np.int32))
+        stops = rng.integers(0, len(stop_ids), count)
+        rush = np.exp(-np.minimum(np.abs(seconds - 8 * 3600), np.abs(seconds - 17 * 3600)) / 5400.0)
+        pressure = 0.3 + 0.7 * rush * (0.4 + 0.6 * centrality[stops])
+        delays = rng.gamma(1.5, 60.0 + 360.0 * pressure) - 60.0
+        loads = np.clip(rng.beta(2.0, 2.0, count) * 1.3 * pressure + 0.05, 0.0, 1.5)
+        rows += store.append(day, [stop_ids[s] for s in stops.tolist()], seconds, delays, loads)
+    store.seal_before(today)
+    return {"history_days": sizes.history_days + 1, "history_rows": rows}
+
+
+def generate(directory: str, scale: float = 0.1) -> Dict[str, object]:
+    """Write every dataset into `directory`; returns their paths and row counts."""
+    os.makedirs(directory, exist_ok=True)
+    sizes = Sizes.for_scale(scale)
+    paths = {
+        "gtfs": os.path.join(directory, "gtfs.zip"),
+        "road_graph": os.path.join(directory, "road_graph.json"),
+        "events": os.path.join(directory, "events.npz"),
+        "history": os.path.join(directory, "history"),
+    }
+    counts: Dict[str, int] = {}
+    counts.update(write_gtfs(paths["gtfs"], sizes))
+    counts.update({f"road_{k}": v for k, v in write_road_graph(paths["road_graph"], sizes).items()})
+    counts.update(write_events(paths["events"], sizes))
+    shutil.rmtree(paths["history"], ignore_errors=True)
+    counts.update(write_history(paths["history"], sizes))
+    try:
+        rt_path = os.path.join(directory, "gtfs_rt.pb")
+        counts["realtime_trips"] = write_trip_updates(rt_path, counts["trips"])
+        paths["gtfs_rt"] = rt_path
+    except ImportError:
+        pass
+    return {"scale": scale, "sizes": asdict(sizes), "paths": paths, "counts": counts}
@@ -0,0 +1,22 @@
+"""
+Shared fixtures. Run from backend/: `python -m pytest -q`.
+
+Services keep module state (the dataset registry, the response cache), so
+every test starts from an empty registry and a fresh in-process cache.
+"""
+
+import pytest
+
+from app.services import cache, registry
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(monkeypatch):
+    monkeypatch.setattr(registry, "_current", registry.Snapshot(0, {}, {}))
+    monkeypatch.setattr(cache, "_cache", cache.ResponseCache(cache.LRUCache(1000)))
+    yield
@@ -0,0 +1,74 @@
+"""Tiny hand-written datasets in the formats the app loads."""
+
+import json
+import zipfile
+from typing import Iterable, Sequence, Tuple
+
+# A line of stops ~600 m apart, west to east through the city centre
+STOPS = [
+    ("A", "Alpha", 53.4780, -2.2600),
+    ("B", "Bravo", 53.4780, -2.2510),
+    ("C", "Piccadilly Gardens", 53.4779, -2.2323),
+    ("D", "Delta", 53.4780, -2.2200),
+]
+
+
+def write_feed(path, trips: Iterable[Tuple[str, str, str, Sequence[Tuple[str, str]]]],
+               stops=STOPS, routes=(("r1", "1", 3), ("r2", "2", 3))) -> str:
+    """GTFS zip with `trips` as (trip_id, route_id, headsign, [(stop_id, "HH:MM:SS"), ...])."""
+    with zipfile.ZipFile(path, "w") as feed:
+        feed.writestr("stops.txt", "stop_id,stop_name,stop_lat,stop_lon\n" + "".join(
+            f"{stop_id},{name},{lat},{lng}\n" for stop_id, name, lat, lng in stops))
+        feed.writestr("routes.txt", "route_id,route_short_name,route_type\n" + "".join(
+            f"{route_id},{name},{kind}\n" for route_id, name, kind in routes))
+        feed.writestr("trips.txt", "route_id,service_id,trip_id,trip_headsign\n" + "".join(
+            f"{route_id},daily,{trip_id},{headsign}\n" for trip_id, route_id, headsign, _ in trips))
+        feed.writestr("stop_times.txt", "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n" + "".join(
+            f"{trip_id},{time},{time},{stop_id},{seq}\n"
+            for trip_id, _, _, calls in trips for seq, (stop_id, time) in enumerate(calls, 1)))
+    return str(path)
+
+
+def hms(seconds: int) -> str:
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+def publish_feed(path, trips) -> None:
+    """Load a feed into the dataset registry the way the app lifespan does (timetable, stops, network)."""
+    from app.services import planner, stop_resolver, timetable
+
+    loaded = timetable.init_timetable(write_feed(path, trips))
+    stop_resolver.init_resolver(loaded)
+    planner.init_planner(loaded)
+
+
+# Main Street runs west to east; Side Road is a slower loop around it; the
+# spur beyond it is the only way to its end node.
+ROAD_NODES = [
+    ("n0", 53.000, -2.000), ("n1", 53.000, -1.993), ("n2", 53.000, -1.986),
+    ("n3", 53.010, -2.000), ("n4", 53.010, -1.986), ("n5", 53.000, -1.979),
+]
+ROADS = [
+    ("n0", "n1", 30, "main", "Main Street"), ("n1", "n2", 30, "main", "Main Street"),
+    ("n0", "n3", 20, "side", "Side Road"), ("n3", "n4", 20, "side", "Side Road"),
+    ("n4", "n2", 20, "side", "Side Road"), ("n2", "n5", 30, "spur", "Spur Lane"),
+    ("n3", "n0", 20, "north", "North Link"),
+]
+ROUTE_SHAPES = {
+    "1": [[53.000, -2.000], [53.000, -1.993], [53.000, -1.986]],
+    "2": [[53.000, -1.986], [53.000, -1.979]],
+}
+
+
+def write_road_graph(path) -> str:
+    """Road graph JSON (app.services.road_graph) with two-way edges of geographic length."""
+    from app.services.planner import haversine_metres
+
+    position = {node: (lat, lng) for node, lat, lng in ROAD_NODES}
+    edges = []
+    for u, v, speed, road_id, name in ROADS:
+        metres = float(haversine_metres(*position[u], *position[v]))
+        edges += [[u, v, metres, speed, road_id, name], [v, u, metres, speed, road_id, name]]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"nodes": [list(n) for n in ROAD_NODES], "edges": edges, "routes": ROUTE_SHAPES}, f)
+    return str(path)
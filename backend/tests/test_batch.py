@@ -0,0 +1,54 @@
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.routers import arrivals, routes
+
+from tests.helpers import hms, publish_feed
+
+ALL_DAY = [(f"t{m}", "r1", "Delta", [("A", hms(m * 60)), ("B", hms(m * 60 + 300)), ("D", hms(m * 60 + 900))])
+           for m in range(0, 24 * 60, 20)]
+
+
+def counting(monkeypatch, module, name):
+    calls = []
+    build = getattr(module, name)
+    monkeypatch.setattr(module, name, lambda *args, **kwargs: calls.append(kwargs) or build(*args, **kwargs))
+    return calls
+
+
+def test_arrivals_batch_keeps_order_and_builds_repeats_once(monkeypatch):
+    calls = counting(monkeypatch, arrivals, "build_arrivals")
+    response = TestClient(app).post("/api/arrivals/batch",
+                                    json={"stops": ["deansgate", "piccadilly", "deansgate"], "limit": 2})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["stop"] for r in results] == ["Deansgate", "Piccadilly Gardens", "Deansgate"]
+    assert all(len(r["arrivals"]) == 2 for r in results)
+    assert len(calls) == 2
+
+
+def test_arrivals_batch_shares_the_single_stop_cache(monkeypatch):
+    client = TestClient(app)
+    single = client.get("/api/arrivals", params={"stop": "chorlton", "limit": 3}).json()
+    calls = counting(monkeypatch, arrivals, "build_arrivals")
+    [batched] = client.post("/api/arrivals/batch", json={"stops": ["chorlton"], "limit": 3}).json()["results"]
+    assert batched == single and calls == []
+
+
+def test_arrivals_batch_fails_on_an_unknown_stop():
+    client = TestClient(app)
+    assert client.post("/api/arrivals/batch", json={"stops": ["piccadilly", "atlantis"]}).status_code == 404
+    assert client.post("/api/arrivals/batch", json={"stops": []}).status_code == 422
+
+
+def test_routes_batch_plans_each_distinct_pair_once(tmp_path, monkeypatch):
+    publish_feed(tmp_path / "gtfs.zip", ALL_DAY)
+    calls = counting(monkeypatch, routes, "build_routes")
+    pairs = [{"origin": "Alpha", "destination": "Delta"}, {"origin": "Alpha", "destination": "Bravo"},
+             {"origin": "Alpha", "destination": "Delta"}]
+    response = TestClient(app).post("/api/routes/batch", json={"pairs": pairs})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [(r["origin"], r["destination"]) for r in results] == [("Alpha", "Delta"), ("Alpha", "Bravo"),
+                                                                  ("Alpha", "Delta")]
+    assert results[0] == results[2] and len(calls) == 2
@@ -0,0 +1,19 @@
+import json
+import os
+import subprocess
+import sys
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_benchmark_suite_runs_end_to_end_at_a_tiny_scale(tmp_path):
+    # A subprocess: the load suite reconfigures and starts the app
+    out = tmp_path / "results.json"
+    subprocess.run(
+        [sys.executable, "-m", "benchmarks", "--scale", "0.002", "--data", str(tmp_path / "data"),
+         "--out", str(out), "--iterations", "3", "--requests", "10", "--concurrency", "2", "--distinct", "3"],
+        cwd=BACKEND, check=True, capture_output=True, timeout=300,
+    )
+    results = json.loads(out.read_text())
+    assert set(results["micro"]) == {"arrivals", "routes", "heatmap", "closure", "history", "stops"}
+    assert all(set(endpoint["status"]) == {"200"} for endpoint in results["load"].values())
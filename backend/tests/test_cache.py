@@ -0,0 +1,186 @@
+import asyncio
+
+import pytest
+
+from app.services import cache
+from app.services.cache import LRUCache, RedisCache, ResponseCache, make_key
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeRedis:
+    """The slice of redis.asyncio.Redis that RedisCache uses, with a controllable clock."""
+
+    def __init__(self):
+        self.store = {}
+        self.now = 0.0
+
+    async def get(self, key):
+        entry = self.store.get(key)
+        if entry is None or entry[0] <= self.now:
+            return None
+        return entry[1]
+
+    async def set(self, key, value, px):
+        self.store[key] = (self.now + px / 1000, value)
+
+
+class BrokenBackend:
+    async def get(self, key):
+        raise ConnectionError("down")
+
+    async def set(self, key, value, ttl):
+        raise ConnectionError("down")
+
+
+def frozen_clock(monkeypatch, start=1000.0):
+    clock = [start]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: clock[0])
+    return clock
+
+
+async def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_entries=2)
+    await lru.set("a", b"1", 60)
+    await lru.set("b", b"2", 60)
+    assert await lru.get("a") == b"1"       # "b" is now the least recently used
+    await lru.set("c", b"3", 60)
+    assert len(lru) == 2
+    assert await lru.get("b") is None
+    assert await lru.get("a") == b"1"
+    assert await lru.get("c") == b"3"
+
+
+async def test_lru_entries_expire_after_ttl(monkeypatch):
+    clock = frozen_clock(monkeypatch)
+    lru = LRUCache()
+    await lru.set("a", b"1", 30)
+    clock[0] += 29.9
+    assert await lru.get("a") == b"1"
+    clock[0] += 0.2
+    assert await lru.get("a") is None
+    assert len(lru) == 0
+
+
+async def test_concurrent_misses_compute_once():
+    responses = ResponseCache(LRUCache())
+    calls = 0
+    release = asyncio.Event()
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return b"body"
+
+    waiters = [asyncio.create_task(responses.get_or_compute("k", 60, compute)) for _ in range(50)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert {body for body, _ in results} == {b"body"}
+    assert sorted(status for _, status in results) == ["COALESCED"] * 49 + ["MISS"]
+    assert responses.stats()["misses"] == 1 and responses.stats()["coalesced"] == 49
+    assert await responses.get_or_compute("k", 60, compute) == (b"body", "HIT")
+
+
+async def test_compute_error_reaches_every_waiter_and_is_not_cached():
+    responses = ResponseCache(LRUCache())
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise ValueError("boom")
+
+    waiters = [asyncio.create_task(responses.get_or_compute("k", 60, failing)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+    async def ok():
+        return b"fine"
+
+    assert await responses.get_or_compute("k", 60, ok) == (b"fine", "MISS")
+
+
+async def test_cancelled_leader_hands_over_to_a_follower():
+    responses = ResponseCache(LRUCache())
+    started = []
+    release = asyncio.Event()
+
+    async def compute():
+        started.append(1)
+        await release.wait()
+        return b"body"
+
+    leader = asyncio.create_task(responses.get_or_compute("k", 60, compute))
+    await asyncio.sleep(0)
+    followers = [asyncio.create_task(responses.get_or_compute("k", 60, compute)) for _ in range(3)]
+    await asyncio.sleep(0)
+    leader.cancel()
+    await asyncio.sleep(0)
+    release.set()
+
+    results = await asyncio.gather(*followers)
+    assert leader.cancelled()
+    assert [body for body, _ in results] == [b"body"] * 3
+    assert len(started) == 2        # the cancelled leader's compute, then one follower's
+
+
+async def test_redis_backend_round_trip_and_expiry():
+    fake = FakeRedis()
+    backend = RedisCache(fake, prefix="test:")
+    await backend.set("k", b"v", 0.5)
+    assert set(fake.store) == {"test:k"}
+    assert fake.store["test:k"][0] == 0.5      # px is milliseconds
+    assert await backend.get("k") == b"v"
+    fake.now = 1.0
+    assert await backend.get("k") is None
+
+
+async def test_response_cache_over_redis_shares_hits():
+    fake = FakeRedis()
+    worker_a, worker_b = ResponseCache(RedisCache(fake)), ResponseCache(RedisCache(fake))
+
+    async def compute():
+        return b"shared"
+
+    assert await worker_a.get_or_compute("k", 60, compute) == (b"shared", "MISS")
+    assert await worker_b.get_or_compute("k", 60, compute) == (b"shared", "HIT")
+
+
+async def test_backend_errors_fall_back_to_computing():
+    responses = ResponseCache(BrokenBackend())
+
+    async def compute():
+        return b"body"
+
+    assert await responses.get_or_compute("k", 60, compute) == (b"body", "MISS")
+    assert responses.stats()["errors"] == 2
+
+
+def test_keys_ignore_case_whitespace_and_order():
+    assert make_key("arrivals", {"stop": " Piccadilly ", "limit": 10}) == \
+        make_key("arrivals", {"limit": 10, "stop": "piccadilly"})
+    assert make_key("arrivals", {"stop": "piccadilly"}) != make_key("routes", {"stop": "piccadilly"})
+    assert make_key("arrivals", {"stop": "piccadilly"}) != make_key("arrivals", {"stop": "deansgate"})
+
+
+async def test_cached_json_keys_on_data_version():
+    version = [1]
+    calls = []
+
+    async def compute():
+        calls.append(version[0])
+        return {"version": version[0]}
+
+    first, _ = await cache.cached_json("ns", {"a": 1}, compute, version=lambda: version[0])
+    again, status = await cache.cached_json("ns", {"a": 1}, compute, version=lambda: version[0])
+    version[0] = 2
+    changed, _ = await cache.cached_json("ns", {"a": 1}, compute, version=lambda: version[0])
+    assert first == b'{"version":1}'
+    assert (again, status) == (first, "HIT")
+    assert changed == b'{"version":2}'
+    assert calls == [1, 2]
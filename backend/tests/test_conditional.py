@@ -0,0 +1,121 @@
+import gzip
+
+import numpy as np
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import conditional, tiles
+from app.services.cache import get_response_cache
+from app.services.conditional import MIN_COMPRESS_BYTES, keyed_delta
+from app.services.tiles import TileGrid
+
+TOKEN = "ab" * 20
+
+
+def demand(lat, lng, weight):
+    tiles.init_tiles(prebuilt={"demand": TileGrid.build(np.array(lat), np.array(lng), np.array(weight))})
+
+
+def test_entity_tags_and_if_none_match():
+    assert conditional.digest(b"{}") == conditional.digest(b"{}") != conditional.digest(b"[]")
+    assert len(conditional.digest(b"{}")) == 40
+    assert conditional.entity_tag(TOKEN) == f'W/"{TOKEN}"'
+    assert conditional.not_modified(f'"other", W/"{TOKEN}"', TOKEN)
+    assert not conditional.not_modified("*", TOKEN)
+    assert not conditional.not_modified('"other"', TOKEN) and not conditional.not_modified(None, TOKEN)
+
+
+def test_since_accepts_bare_digests_and_etags_only():
+    assert conditional.since_digest(f'W/"{"AB" * 20}"') == "ab" * 20
+    assert conditional.since_digest("ab" * 20) == "ab" * 20
+    assert conditional.since_digest("yesterday") is None and conditional.since_digest(None) is None
+
+
+def test_accepted_encoding_honours_quality_values(monkeypatch):
+    monkeypatch.setattr(conditional, "brotli", None)
+    assert conditional.accepted_encoding("gzip, deflate") == "gzip"
+    assert conditional.accepted_encoding("br;q=1, gzip;q=0") is None
+    assert conditional.accepted_encoding("*") == "gzip"
+    assert conditional.accepted_encoding("identity") is None and conditional.accepted_encoding(None) is None
+
+
+def test_gzip_is_deterministic():
+    body = b'{"points": []}' * 100
+    assert conditional.compress(body, "gzip") == conditional.compress(body, "gzip")
+    assert gzip.decompress(conditional.compress(body, "gzip")) == body
+
+
+def test_keyed_delta_reports_changed_and_removed_rows():
+    delta = keyed_delta("rows", lambda rows: [row["id"] for row in rows])
+    old = {"rows": [{"id": 1, "v": 1}, {"id": 2, "v": 2}], "stamp": "old"}
+    new = {"rows": [{"id": 1, "v": 1}, {"id": 3, "v": 3}], "stamp": "new"}
+    assert delta(old, new) == {"stamp": "new", "changed": [{"id": 3, "v": 3, "key": 3}], "removed": [2]}
+
+
+def test_heatmap_etag_304_and_since_delta():
+    client = TestClient(app)
+    demand([53.48, 53.49, 53.20], [-2.24, -2.23, -2.24], [1.0, 1.0, 2.0])
+    first = client.get("/api/heatmap")
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "public, max-age=60"
+
+    again = client.get("/api/heatmap", headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.headers["etag"] == etag and not again.content
+
+    demand([53.48, 53.49], [-2.24, -2.23], [1.0, 1.0])
+    full = client.get("/api/heatmap").json()
+    changes = client.get("/api/heatmap", params={"since": etag}).json()
+    assert changes["since"] == conditional.since_digest(etag)
+    assert changes["version"] == conditional.since_digest(client.get("/api/heatmap").headers["etag"])
+    assert len(changes["changed"]) == 2 and len(changes["removed"]) == 1 and "points" not in changes
+    assert len(full["points"]) == 2
+
+    # A version no longer cached (or never seen) gets the full body
+    assert "since" not in client.get("/api/heatmap", params={"since": "cd" * 20}).json()
+
+
+def test_large_heatmaps_are_compressed_once_per_version():
+    client = TestClient(app)
+    rng = np.random.default_rng(0)
+    demand(53.4 + rng.random(200) * 0.2, -2.3 + rng.random(200) * 0.2, np.ones(200))
+
+    plain = client.get("/api/heatmap", headers={"Accept-Encoding": "identity"})
+    assert len(plain.content) >= MIN_COMPRESS_BYTES and "content-encoding" not in plain.headers
+    packed = client.get("/api/heatmap", headers={"Accept-Encoding": "gzip"})
+    assert packed.headers["content-encoding"] == "gzip" and packed.headers["vary"] == "Accept-Encoding"
+    assert packed.json() == plain.json()                 # httpx decodes it
+    assert packed.headers["etag"] == plain.headers["etag"]
+
+
+def test_if_none_match_never_hides_a_bad_request():
+    client = TestClient(app)
+    assert client.get("/api/arrivals", params={"stop": "atlantis"}, headers={"If-None-Match": "*"}).status_code == 404
+    board = client.get("/api/arrivals", params={"stop": "deansgate"})
+    assert client.get("/api/arrivals", params={"stop": "deansgate"},
+                      headers={"If-None-Match": "*"}).status_code == 200
+    assert client.get("/api/arrivals", params={"stop": "deansgate"},
+                      headers={"If-None-Match": board.headers["etag"]}).status_code == 304
+
+
+def test_a_recomputed_body_gets_a_new_etag(monkeypatch):
+    client = TestClient(app)
+    demand([53.48], [-2.24], [1.0])
+    first = client.get("/api/heatmap")
+    # Same data version, but the cached body is gone and the rebuild differs
+    get_response_cache().backend._entries.clear()
+    other = TileGrid.build(np.array([53.49]), np.array([-2.23]), np.array([1.0]))
+    monkeypatch.setattr("app.routers.heatmap.get_grid", lambda metric: other)
+    second = client.get("/api/heatmap", headers={"If-None-Match": first.headers["etag"]})
+    assert second.status_code == 200 and second.headers["etag"] != first.headers["etag"]
+
+
+def test_compressed_copies_and_deltas_are_not_counted_as_lookups():
+    client = TestClient(app)
+    rng = np.random.default_rng(1)
+    demand(53.4 + rng.random(200) * 0.2, -2.3 + rng.random(200) * 0.2, np.ones(200))
+    etag = client.get("/api/heatmap", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+    demand(53.4 + rng.random(200) * 0.2, -2.3 + rng.random(200) * 0.2, np.ones(200))
+    client.get("/api/heatmap", params={"since": etag}, headers={"Accept-Encoding": "gzip"})
+
+    stats = get_response_cache().stats()
+    assert (stats["hits"], stats["misses"], stats["coalesced"]) == (0, 2, 0)
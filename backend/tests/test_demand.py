@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from app.services.demand import DEFAULT_FREQUENCY, LOAD_PROFILE, VEHICLE_CAPACITY, DemandModel
+from app.services.timetable import load_gtfs
+
+from tests.helpers import hms, write_feed
+
+PER_HOUR = DEFAULT_FREQUENCY * LOAD_PROFILE * VEHICLE_CAPACITY
+
+
+@pytest.fixture
+def model():
+    return DemandModel.from_timetable(None)
+
+
+def test_window_integrates_the_hourly_profile(model):
+    [one_hour, two_half] = model.estimate([["x"], ["x"]], [8, 8], [1, 2.5])
+    assert one_hour == round(PER_HOUR[8])
+    assert two_half == round(PER_HOUR[8] + PER_HOUR[9] + PER_HOUR[10] / 2)
+
+
+def test_windows_wrap_midnight_and_span_days(model):
+    day = PER_HOUR.sum()
+    [overnight, week, empty] = model.estimate([["x"], ["x"], ["x"]], [23, 10, 10], [2, 24 * 7, 0])
+    assert overnight == round(PER_HOUR[23] + PER_HOUR[0])
+    assert week == round(7 * day)
+    assert empty == 0
+
+
+def test_scenarios_sum_their_routes(model):
+    [none, one, two] = model.estimate([[], ["a"], ["a", "b"]], [8] * 3, [1] * 3)
+    assert none == 0 and abs(two - 2 * one) <= 1
+
+
+def test_timetable_frequency_per_route_and_hour(tmp_path):
+    trips = [(f"t{i}", "r1", "Delta", [("A", hms(7 * 3600 + i * 600)), ("D", hms(8 * 3600))]) for i in range(6)]
+    timetable = load_gtfs(write_feed(tmp_path / "gtfs.zip", trips))
+    model = DemandModel.from_timetable(timetable)
+    assert model.route_names == ["1", "2"]
+    assert model.frequency[0, 7] == 6 and model.frequency[0].sum() == 6
+    assert model.frequency[1].sum() == 0          # in the feed, but without trips
+    assert np.array_equal(model.frequency[-1], DEFAULT_FREQUENCY)
@@ -0,0 +1,73 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.services.history import HistoryStore, aggregate
+
+DAY = date(2024, 3, 14)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history"))
+    store.register_stops(["A", "B"], ["Alpha", "Bravo"], [53.48, 53.44], [-2.24, -2.22])
+    return store
+
+
+def at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime(day.year, day.month, day.day, hour, minute)
+
+
+def test_aggregate_groups_by_stop_and_bucket():
+    stats = aggregate(np.array([1, 0, 1, 1, 0]), np.array([60, -30, 120, 0, 30]), np.array([50, 100, 70, 90, 0]),
+                      np.array([0, 0, 0, 1, 0]), n_buckets=2)
+    assert list(zip(stats.stop.tolist(), stats.bucket.tolist(), stats.count.tolist())) == [(0, 0, 2), (1, 0, 2), (1, 1, 1)]
+    assert stats.mean_delay.tolist() == [0.0, 90.0, 0.0]
+    assert stats.p90_delay.tolist() == [-30, 60, 0] and stats.mean_load.tolist() == [0.5, 0.6, 0.9]
+
+
+def test_stop_table_is_append_only(store, tmp_path):
+    store.register_stops(["B", "C"], ["Bravo", "Charlie"], [0, 53.5], [0, -2.3])
+    reopened = HistoryStore(str(tmp_path / "history"))
+    assert reopened.stop_ids == ["A", "B", "C"] and reopened.stop_lat.tolist() == [53.48, 53.44, 53.5]
+
+
+def test_window_reads_unsealed_and_sealed_days_alike(store):
+    store.append(DAY, ["A", "B", "A"], [8 * 3600 + 600, 8 * 3600 + 300, 7 * 3600], [120, 60, 999], [0.5, 1.0, 0.1])
+    unsealed = store.window(at(DAY, 8, 15), minutes=15, days=1)
+    store.seal(DAY)
+    assert store.read(DAY)[1]
+    sealed = store.window(at(DAY, 8, 15), minutes=15, days=1)
+    for stats in (unsealed, sealed):
+        assert stats.stop.tolist() == [0, 1] and stats.mean_delay.tolist() == [120.0, 60.0]
+
+
+def test_window_spans_days_and_midnight(store):
+    yesterday = DAY - timedelta(days=1)
+    store.append(yesterday, ["A"], [23 * 3600 + 55 * 60], [300], [0.5])
+    store.append(DAY, ["A"], [5 * 60], [100], [0.5])
+    store.append(DAY - timedelta(days=2), ["A"], [5 * 60], [50], [0.5])
+    stats = store.window(at(DAY, 0, 10), minutes=20, days=1, bucket_minutes=10)
+    assert stats.bucket.tolist() == [0, 1] and stats.mean_delay.tolist() == [300.0, 100.0]
+    assert store.window(at(DAY, 0, 10), minutes=20, days=3).count.tolist() == [3]
+
+
+def test_late_events_unseal_a_day(store):
+    store.append(DAY, ["A"], [3600], [0], [0.5])
+    store.seal_before(DAY + timedelta(days=1))
+    version = store.version
+    store.append(DAY, ["B"], [60], [0], [0.5])
+    assert not store.read(DAY)[1] and store.version > version
+    assert store.seal_before(DAY + timedelta(days=1)) == 1
+    assert store.read(DAY)[0]["second"].tolist() == [60, 3600]
+
+
+def test_heat_grid_labels_stops_and_is_memoised(store):
+    store.append(DAY, ["A", "B"], [8 * 3600] * 2, [600, -60], [0.9, 0.3])
+    now = at(DAY, 8, 10)
+    delay = store.heat_grid("delay", now, 15, 1)
+    assert sorted(delay.labels) == ["Alpha: avg +10 min (p90 +10)", "Bravo: avg -1 min (p90 -1)"]
+    assert store.heat_grid("delay", now, 15, 1) is delay
+    assert sorted(store.heat_grid("crowding", now, 15, 1).labels) == ["Alpha: 90% full", "Bravo: 30% full"]
+    assert store.heat_grid("delay", at(DAY, 12), 15, 1) is None
@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+import pytest
+
+from app.models.schemas import ArrivalItem, ArrivalsResponse
+from app.services.hub import ArrivalsHub, item_keys
+
+pytestmark = pytest.mark.anyio
+
+
+def item(route="42", due=5, status="ontime") -> ArrivalItem:
+    return ArrivalItem(route=route, destination="Didsbury", due_minutes=due, status=status, stop_name="Alpha")
+
+
+class Boards:
+    """Board source for the hub: counts builds and serves whatever `items` holds."""
+
+    def __init__(self, *items):
+        self.items = list(items)
+        self.builds = 0
+
+    def __call__(self, stop: str) -> ArrivalsResponse:
+        self.builds += 1
+        return ArrivalsResponse(stop=stop, last_updated="08:00:00", arrivals=list(self.items))
+
+
+def decode(message: bytes):
+    event, data = message.decode().strip().split("\n")
+    return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+def test_item_keys_number_repeated_services():
+    assert item_keys([item(due=2), item(due=9), item("43")]) == ["42|Didsbury||1", "42|Didsbury||2", "43|Didsbury||1"]
+
+
+async def test_subscribers_share_one_build_and_get_deltas():
+    boards = Boards(item(due=5), item("43", due=7))
+    hub = ArrivalsHub(boards, interval=0.01)
+    first, second = hub.subscribe("alpha"), hub.subscribe("alpha")
+    assert hub.stats() == {"topics": 1, "subscribers": 2}
+
+    event, snapshot = decode(await first.__anext__())
+    assert event == "snapshot" and [row["key"] for row in snapshot["arrivals"]] == ["42|Didsbury||1", "43|Didsbury||1"]
+    await second.__anext__()
+
+    boards.items = [item(due=4)]
+    update = await asyncio.wait_for(first.__anext__(), 1)
+    assert decode(update) == ("update", {
+        "stop": "alpha", "last_updated": "08:00:00",
+        "changed": [{**item(due=4).model_dump(), "key": "42|Didsbury||1"}], "removed": ["43|Didsbury||1"],
+    })
+    # The same encoded message for every subscriber, built once per tick
+    assert await asyncio.wait_for(second.__anext__(), 1) is update
+    builds = boards.builds
+    await asyncio.sleep(0.05)
+    assert boards.builds > builds and first.queue.empty()      # unchanged boards send nothing
+    await hub.close()
+
+
+async def test_slow_subscriber_is_resynced_with_a_snapshot():
+    boards = Boards(item(due=0))
+    hub = ArrivalsHub(boards, interval=0.005, max_queue=2)
+    slow = hub.subscribe("alpha")
+    for due in range(1, 6):
+        boards.items = [item(due=due)]
+        await asyncio.sleep(0.02)
+    assert slow.dropped > 0
+
+    event, snapshot = decode(await slow.__anext__())
+    assert event == "snapshot" and snapshot["arrivals"][0]["due_minutes"] == boards.items[0].due_minutes
+    await hub.close()
+
+
+async def test_last_unsubscribe_stops_the_producer():
+    hub = ArrivalsHub(Boards(item()), interval=0.01)
+    subscription = hub.subscribe("alpha")
+    task = subscription.topic.task
+    subscription.close()
+    await asyncio.sleep(0)
+    assert hub.stats() == {"topics": 0, "subscribers": 0} and task.cancelled()
@@ -0,0 +1,145 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services import matrix as matrix_module
+from app.services.matrix import BANDS, UNREACHABLE, TravelTimeMatrix, band_at
+from app.services.planner import Disruption, build_network
+from app.services.timetable import load_gtfs
+
+from tests.helpers import STOPS, hms, write_feed
+
+INTERPEAK = next(band for band in BANDS if band.name == "interpeak")
+
+
+def every_20_minutes(route, stops, prefix):
+    """Trips on `route` through [(stop, minutes from start), ...] every 20 minutes, 06:00–22:00."""
+    return [(f"{prefix}{m}", route, "x", [(stop, hms(m * 60 + offset * 60)) for stop, offset in stops])
+            for m in range(6 * 60, 22 * 60, 20)]
+
+
+BASE = every_20_minutes("r1", [("A", 0), ("B", 5), ("D", 15)], "a") + every_20_minutes("r2", [("A", 2), ("C", 12)], "b")
+
+
+def network_for(tmp_path, trips, name="gtfs.zip"):
+    return build_network(load_gtfs(write_feed(tmp_path / name, trips)))
+
+
+def filled(root, network, disruption=None) -> TravelTimeMatrix:
+    matrix = TravelTimeMatrix(str(root), network, [INTERPEAK])
+    band = matrix.bands["interpeak"]
+    for row in np.flatnonzero(~band.ready).tolist():
+        band.fill(network, row, disruption or matrix.disruption)
+    matrix.checkpoint()
+    return matrix
+
+
+def stop(network, stop_id):
+    return network.timetable.stop_index[stop_id]
+
+
+async def filled_band(band):
+    while not band.ready.all():
+        await asyncio.sleep(0.01)
+
+
+def test_band_at_wraps_the_small_hours_into_the_evening():
+    assert band_at(12 * 3600).name == "interpeak"
+    assert band_at(8 * 3600).name == "am_peak"
+    assert band_at(2 * 3600).name == "evening" and band_at(26 * 3600).name == "evening"
+
+
+def test_lookup_matches_a_full_search(tmp_path):
+    network = network_for(tmp_path, BASE)
+    matrix = filled(tmp_path / "matrix", network)
+    a, c, d = stop(network, "A"), stop(network, "C"), stop(network, "D")
+
+    journeys = network.search([a], [d], INTERPEAK.depart, 10)
+    expected = -(-(min(j.arrive for j in journeys) - INTERPEAK.depart) // 60)
+    assert matrix.lookup([a], [d], 12 * 3600) == (INTERPEAK, expected, 0)
+    assert matrix.lookup([d], [a], 12 * 3600).minutes is None        # nothing leaves D
+    assert matrix.bands["interpeak"].minutes[c, d] == UNREACHABLE
+
+
+def test_missing_rows_are_queued_and_planned_in_full(tmp_path):
+    network = network_for(tmp_path, BASE)
+    matrix = TravelTimeMatrix(str(tmp_path / "matrix"), network, [INTERPEAK])
+    a = stop(network, "A")
+    assert matrix.lookup([a], [stop(network, "D")], 12 * 3600) is None
+    assert ("interpeak", a) in matrix._wanted
+    assert matrix._next_batch()[1] == [a]
+
+
+def test_reopening_for_the_same_feed_keeps_every_row(tmp_path):
+    network = network_for(tmp_path, BASE)
+    filled(tmp_path / "matrix", network)
+    reopened = TravelTimeMatrix(str(tmp_path / "matrix"), network, [INTERPEAK])
+    assert reopened.bands["interpeak"].ready.all() and reopened.rows_refreshed == 0
+
+
+def test_suspension_invalidates_only_rows_riding_the_pattern(tmp_path):
+    network = network_for(tmp_path, BASE)
+    matrix = filled(tmp_path / "matrix", network)
+    r2 = [p for p in range(len(network.pattern_route)) if network.timetable.route_names[network.pattern_route[p]] == "2"]
+    matrix._apply([(sig, 0) for sig in matrix.signatures], Disruption(suspended=frozenset(r2)))
+
+    ready = matrix.bands["interpeak"].ready
+    assert not ready[stop(network, "A")] and ready[stop(network, "B")] and ready[stop(network, "D")]
+
+
+def test_new_feed_refreshes_rows_a_new_pattern_can_help(tmp_path):
+    filled(tmp_path / "matrix", network_for(tmp_path, BASE))
+    # A new B -> C service: B can now reach C, but A still gets there sooner on route 2
+    network = network_for(tmp_path, BASE + every_20_minutes("r2", [("B", 1), ("C", 4)], "c"), "new.zip")
+    reopened = TravelTimeMatrix(str(tmp_path / "matrix"), network, [INTERPEAK])
+
+    ready = reopened.bands["interpeak"].ready
+    assert not ready[stop(network, "B")]
+    assert ready[stop(network, "A")] and ready[stop(network, "C")] and ready[stop(network, "D")]
+
+
+def test_readers_refuse_a_matrix_for_another_feed(tmp_path):
+    filled(tmp_path / "matrix", network_for(tmp_path, BASE))
+    trips = every_20_minutes("r1", [("A", 0), ("B", 5)], "z")
+    other = build_network(load_gtfs(write_feed(tmp_path / "other.zip", trips, stops=STOPS[:2])))
+    with pytest.raises(ValueError):
+        TravelTimeMatrix(str(tmp_path / "matrix"), other, [INTERPEAK], readonly=True)
+
+
+@pytest.mark.anyio
+async def test_rows_wanted_from_request_threads_are_filled(tmp_path):
+    network = network_for(tmp_path, BASE)
+    matrix = TravelTimeMatrix(str(tmp_path / "matrix"), network, [INTERPEAK])
+    task = asyncio.create_task(matrix.run())
+    try:
+        # The routes routers look rows up from worker threads while the fill task iterates them
+        rows = range(network.timetable.n_stops)
+        await asyncio.gather(*(asyncio.to_thread(matrix.lookup, [row], [0], 12 * 3600)
+                               for row in rows for _ in range(20)))
+        await asyncio.wait_for(filled_band(matrix.bands["interpeak"]), 10)
+        assert not task.done()
+    finally:
+        task.cancel()
+
+
+@pytest.mark.anyio
+async def test_fill_task_survives_a_failed_step(tmp_path, monkeypatch):
+    network = network_for(tmp_path, BASE)
+    matrix = TravelTimeMatrix(str(tmp_path / "matrix"), network, [INTERPEAK])
+    monkeypatch.setattr(matrix_module, "RETRY_SECONDS", 0.0)
+    fill, failures = matrix._fill, []
+
+    def flaky_fill(*args):
+        if not failures:
+            failures.append(True)
+            raise OSError("disk full")
+        fill(*args)
+
+    monkeypatch.setattr(matrix, "_fill", flaky_fill)
+    task = asyncio.create_task(matrix.run())
+    try:
+        await asyncio.wait_for(filled_band(matrix.bands["interpeak"]), 10)
+    finally:
+        task.cancel()
+    assert failures
@@ -0,0 +1,97 @@
+import re
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.metrics import Histogram, Metrics
+from app.services.profiler import ProfilingMiddleware, SamplingProfiler
+
+
+def sample(text: str, name: str, **labels) -> float:
+    """Value of the sample `name{labels}` in Prometheus text, 0 if absent."""
+    rendered = ",".join(f'{k}="{v}"' for k, v in labels.items())
+    match = re.search(rf"^{re.escape(name)}{re.escape('{' + rendered + '}' if labels else '')} (\S+)$", text, re.M)
+    return float(match.group(1)) if match else 0.0
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    buckets = [(labels["le"], value) for name, labels, value in histogram.samples("h", {}) if name == "h_bucket"]
+    assert buckets == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+    assert histogram.sum == pytest.approx(3.65)
+
+
+def test_streams_are_counted_but_not_timed():
+    metrics = Metrics()
+    metrics.observe("GET", "/api/arrivals/stream", 200, 30.0, 10, streaming=True)
+    metrics.observe("GET", "/api/arrivals", 200, 0.002, 300, cache_status="HIT")
+    text = metrics.render()
+    assert sample(text, "smartbee_http_requests_total", method="GET", route="/api/arrivals/stream", status="200") == 1
+    assert "/api/arrivals/stream" not in "".join(line for line in text.splitlines() if "duration" in line)
+    assert sample(text, "smartbee_http_cache_total", route="/api/arrivals", result="hit") == 1
+
+
+def test_middleware_labels_by_route_template():
+    client = TestClient(app)
+    before = client.get("/metrics").text
+    client.get("/api/stops/search", params={"q": "picc"})
+    client.get("/api/nowhere/1")
+    client.get("/api/nowhere/2")
+    after = client.get("/metrics").text
+
+    def delta(**labels):
+        return sample(after, "smartbee_http_requests_total", **labels) - sample(before, "smartbee_http_requests_total", **labels)
+
+    assert delta(method="GET", route="/api/stops/search", status="200") == 1
+    assert delta(method="GET", route="unmatched", status="404") == 2
+    assert sample(after, "smartbee_http_request_duration_seconds_count", method="GET", route="/api/stops/search") >= 1
+
+
+def busy(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profiler_samples_working_threads_only_while_acquired():
+    profiler = SamplingProfiler(interval=0.001, window_seconds=5)
+    stop = threading.Event()
+    worker = threading.Thread(target=busy, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        profiler.acquire()
+        start = time.perf_counter()
+        time.sleep(0.05)
+        profile = profiler.record("GET", "/x", start, time.perf_counter())
+        profiler.release()
+    finally:
+        stop.set()
+        worker.join()
+    assert not profiler.running and profile.samples > 0
+    assert any(line.startswith("busy-worker;") and "busy (test_metrics.py" in line
+               for line in profile.collapsed().splitlines())
+
+
+def test_profile_header_returns_a_profile_id():
+    inner = FastAPI()
+
+    @inner.get("/slow")
+    def slow():
+        time.sleep(0.02)
+        return {}
+
+    profiler = SamplingProfiler(interval=0.001)
+    client = TestClient(ProfilingMiddleware(inner, profiler, token="secret"))
+    assert "x-profile-id" not in client.get("/slow").headers
+    response = client.get("/slow", headers={"X-Profile": "secret"})
+    assert int(response.headers["x-profile-id"]) in profiler.profiles and not profiler.running
+
+    profiler.arm(slow_ms=10)
+    client.get("/slow")
+    profiler.disarm()
+    assert [p.path for p in profiler.profiles.values()] == ["/slow", "/slow"]
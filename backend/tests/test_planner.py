@@ -0,0 +1,64 @@
+import pytest
+
+from app.models.schemas import AffectedRoute
+from app.services.planner import build_network, closure_disruption
+from app.services.timetable import load_gtfs
+
+from tests.helpers import hms, write_feed
+
+EIGHT = 8 * 3600
+
+
+@pytest.fixture
+def network(tmp_path):
+    trips = []
+    for i, t in enumerate(range(EIGHT, EIGHT + 3600, 600)):
+        trips.append((f"west{i}", "r1", "Bravo", [("A", hms(t)), ("B", hms(t + 300))]))
+        trips.append((f"east{i}", "r2", "Delta", [("B", hms(t + 420)), ("C", hms(t + 720)), ("D", hms(t + 900))]))
+    trips.append(("night", "r1", "Bravo", [("A", "24:40:00"), ("B", "24:45:00")]))
+    return build_network(load_gtfs(write_feed(tmp_path / "gtfs.zip", trips)))
+
+
+def stops(network, *names):
+    return [i for name in names for i in network.timetable.stops_named(name)]
+
+
+def test_direct_journey_takes_the_next_trip(network):
+    journeys = network.search(stops(network, "A"), stops(network, "B"), EIGHT + 60)
+    fastest = min(journeys, key=lambda j: j.arrive)
+    assert (fastest.depart, fastest.arrive, len(fastest.rides)) == (EIGHT + 600, EIGHT + 900, 1)
+
+
+def test_change_allows_minimum_connection_time(network):
+    journeys = network.search(stops(network, "A"), stops(network, "D"), EIGHT)
+    fastest = min(journeys, key=lambda j: j.arrive)
+    # 08:00 west reaches B at 08:05; the 08:07 east connection leaves 2 minutes later
+    assert [(leg.depart, leg.arrive) for leg in fastest.rides] == [(EIGHT, EIGHT + 300), (EIGHT + 420, EIGHT + 900)]
+
+
+def test_small_hours_search_uses_previous_service_day(network):
+    journeys = network.search(stops(network, "A"), stops(network, "B"), 30 * 60)
+    fastest = min(journeys, key=lambda j: j.arrive)
+    assert (fastest.depart, fastest.arrive) == (40 * 60, 45 * 60)
+    # and later in the morning, today's first trip
+    fastest = min(network.search(stops(network, "A"), stops(network, "B"), 2 * 3600), key=lambda j: j.arrive)
+    assert fastest.depart == EIGHT
+
+
+def test_suspended_route_is_not_ridden(network):
+    disruption = closure_disruption(network, [AffectedRoute(route="2", impact="suspended", extra_minutes=0)])
+    assert network.search(stops(network, "A"), stops(network, "D"), EIGHT, disruption=disruption) == []
+
+
+def test_delayed_route_arrives_later(network):
+    disruption = closure_disruption(network, [AffectedRoute(route="2", impact="diverted", extra_minutes=5)])
+    journeys = network.search(stops(network, "A"), stops(network, "D"), EIGHT, disruption=disruption)
+    assert min(j.arrive for j in journeys) == EIGHT + 900 + 300
+
+
+def test_plan_describes_fastest_option(network):
+    options = network.plan(stops(network, "A"), stops(network, "D"), EIGHT)
+    assert options[0].type == "fastest"
+    assert options[0].duration_minutes == 15
+    assert options[0].changes == 1
+    assert options[0].legs[0].startswith("Bus 1 from Alpha")
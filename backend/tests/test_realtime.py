@@ -0,0 +1,97 @@
+import httpx
+import pytest
+from google.transit import gtfs_realtime_pb2
+
+from app.services import registry
+from app.services.realtime import RealtimePoller, RealtimeState, decode_trip_updates
+from app.services.timetable import load_gtfs
+from app.services.upstream import Upstream, UpstreamSettings
+
+from tests.helpers import hms, write_feed
+
+
+def trip_updates(timestamp, updates) -> bytes:
+    """TripUpdates feed: `updates` maps trip_id -> delay seconds, or None for cancelled."""
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = timestamp
+    for trip_id, delay in updates.items():
+        update = feed.entity.add(id=trip_id).trip_update
+        update.trip.trip_id = trip_id
+        if delay is None:
+            update.trip.schedule_relationship = gtfs_realtime_pb2.TripDescriptor.CANCELED
+        else:
+            stop = update.stop_time_update.add(stop_sequence=1)
+            stop.departure.delay = delay
+    return feed.SerializeToString()
+
+
+@pytest.fixture
+def timetable(tmp_path):
+    trips = [(f"t{i}", "r1", "Delta", [("A", hms(8 * 3600 + i * 600)), ("D", hms(8 * 3600 + i * 600 + 900))])
+             for i in range(4)]
+    return load_gtfs(write_feed(tmp_path / "gtfs.zip", trips))
+
+
+def index(timetable, trip_id):
+    return timetable.trip_ids.index(trip_id)
+
+
+def test_decode_reads_stop_delays_and_cancellations():
+    timestamp, deltas = decode_trip_updates(trip_updates(100, {"t0": 120, "t1": None}))
+    assert timestamp == 100
+    assert deltas == {"t0": (120, False), "t1": (0, True)}
+
+
+def test_apply_writes_only_changes_and_resets_dropped_trips(timetable):
+    state = RealtimeState(timetable)
+    assert state.apply(100, {"t0": (120, False), "t1": (0, True), "unknown": (60, False)}) == 2
+    assert state.trip_delay[index(timetable, "t0")] == 120 and state.trip_cancelled[index(timetable, "t1")]
+
+    # t0 unchanged, t1 dropped out of the feed, t2 new
+    assert state.apply(200, {"t0": (120, False), "t2": (300, False)}) == 2
+    assert not state.trip_cancelled[index(timetable, "t1")] and state.trip_delay[index(timetable, "t2")] == 300
+    assert state.version == 2
+
+    # The same feed again is skipped outright
+    assert state.apply(200, {}) == 0 and state.trip_delay[index(timetable, "t2")] == 300
+
+
+def test_rebased_state_carries_the_feed_to_a_new_timetable(timetable, tmp_path):
+    state = RealtimeState(timetable)
+    state.apply(100, {"t3": (90, False)})
+    trips = [("t3", "r1", "Delta", [("A", hms(9 * 3600)), ("D", hms(9 * 3600 + 900))])]
+    reloaded = load_gtfs(write_feed(tmp_path / "reloaded.zip", trips))
+
+    rebased = state.rebased(reloaded)
+    assert rebased.trip_delay.tolist() == [90] and rebased.feed_timestamp == 100
+
+
+@pytest.mark.anyio
+async def test_poller_applies_a_file_feed_to_the_published_state(timetable, tmp_path):
+    path = tmp_path / "trip_updates.pb"
+    path.write_bytes(trip_updates(100, {"t0": 60}))
+    registry.publish(realtime=RealtimeState(timetable))
+
+    assert await RealtimePoller(str(path), 30).poll_once() == 1
+    assert registry.latest().get("realtime").trip_delay[index(timetable, "t0")] == 60
+
+
+@pytest.mark.anyio
+async def test_poller_skips_stale_upstream_responses(timetable):
+    payloads = [trip_updates(100, {"t0": 60})]
+
+    def handler(request):
+        if not payloads:
+            return httpx.Response(503)
+        return httpx.Response(200, content=payloads.pop())
+
+    client = Upstream("gtfs_rt", UpstreamSettings(base_url="http://feed.test/rt", retries=0),
+                      httpx.MockTransport(handler))
+    state = RealtimeState(timetable)
+    registry.publish(realtime=state)
+    poller = RealtimePoller("http://feed.test/rt", 30, client)
+
+    assert await poller.poll_once() == 1
+    assert await poller.poll_once() == 0 and state.version == 1
+    await client.close()
@@ -0,0 +1,75 @@
+import asyncio
+from datetime import date
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import history, registry, road_graph
+
+from tests.helpers import write_road_graph
+
+
+def test_publish_versions_each_replaced_entry():
+    first = registry.publish(a=1, b=2)
+    second = registry.publish(b=3)
+    assert (second.version, second.get("a"), second.get("b")) == (first.version + 1, 1, 3)
+    assert (registry.version("a"), registry.version("b"), registry.version("c")) == (first.version, second.version, 0)
+    # Published snapshots never change
+    assert first.get("b") == 2
+
+
+def test_pinned_snapshot_outlives_a_publish():
+    registry.publish(timetable="old")
+    with registry.pinned() as snapshot:
+        registry.publish(timetable="new")
+        assert registry.get("timetable") == "old" and registry.current() is snapshot
+        assert registry.latest().get("timetable") == "new"
+    assert registry.get("timetable") == "new"
+
+
+@pytest.mark.anyio
+async def test_pin_is_inherited_by_worker_threads():
+    registry.publish(timetable="old")
+    with registry.pinned():
+        registry.publish(timetable="new")
+        assert await asyncio.to_thread(registry.get, "timetable") == "old"
+
+
+def test_responses_report_the_data_version():
+    published = registry.publish(timetable=None)
+    response = TestClient(app).get("/health")
+    assert response.headers["x-data-version"] == str(published.version)
+
+
+def test_closures_are_replaced_not_mutated(tmp_path):
+    road_graph.init_road_graph(write_road_graph(tmp_path / "roads.json"))
+    before = road_graph.closed_roads()
+    closed = road_graph.with_road_closed("main")
+    assert before == {} and set(closed) == {"main"}
+    with pytest.raises(TypeError):
+        closed["spur"] = []
+
+    registry.publish(closures=closed)
+    assert road_graph.with_road_reopened("spur") is None
+    assert road_graph.with_road_reopened("main") == {} and set(road_graph.closed_roads()) == {"main"}
+
+
+def test_reload_carries_closures_the_new_graph_still_has(tmp_path):
+    graph = road_graph.init_road_graph(write_road_graph(tmp_path / "roads.json"))
+    registry.publish(closures=road_graph.with_road_closed("main"))
+    assert set(road_graph.reclose_roads(graph)) == {"main"}
+
+
+def test_history_store_is_a_registry_entry(tmp_path):
+    store = history.init_history(str(tmp_path / "history"))
+    assert history.get_history() is store and registry.version("history") > 0
+    loaded = history.data_version()
+
+    store.register_stops(["A"], ["Alpha"], [53.0], [-2.0])
+    store.append(date.today(), ["A"], [3600], [60], [0.5])
+    assert history.data_version() != loaded
+
+    with registry.pinned():
+        history.init_history(str(tmp_path / "other"))
+        assert history.get_history() is store
@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import config
+from app.main import app
+from app.services import planner, road_graph
+from app.services.road_graph import RoadGraph, load_road_graph
+
+from tests.helpers import hms, publish_feed, write_road_graph
+
+
+@pytest.fixture
+def graph(tmp_path):
+    return road_graph.init_road_graph(write_road_graph(tmp_path / "roads.json"))
+
+
+def record_loop(monkeypatch, cls, name):
+    """Patch cls.name to note whether each call ran on an event loop thread."""
+    calls = []
+    original = getattr(cls, name)
+
+    def recording(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            calls.append("loop")
+        except RuntimeError:
+            calls.append("thread")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(cls, name, recording)
+    return calls
+
+
+def test_closure_diverts_routes_via_the_detour(graph):
+    [impact] = graph.closure_impact("main")
+    assert (impact.route, impact.impact, impact.alternative) == ("1", "diverted", "Via Side Road")
+    assert impact.extra_minutes > 5
+
+
+def test_closure_without_a_detour_suspends(graph):
+    [impact] = graph.closure_impact("spur")
+    assert (impact.route, impact.impact) == ("2", "suspended")
+    assert "replacement buses" in graph.simulate("spur").recommended_action
+
+
+def test_road_without_routes_affects_nothing(graph):
+    assert graph.closure_impact("north") == []
+    assert graph.simulate("north").affected_routes == []
+
+
+def test_impacts_are_memoised(graph):
+    assert graph.closure_impact("main") is graph.closure_impact("main")
+
+
+def test_loaded_graph_round_trips_roads(tmp_path):
+    graph = load_road_graph(write_road_graph(tmp_path / "roads.json"))
+    assert graph.has_road("main") and not graph.has_road("ring")
+
+
+def test_closure_impact_runs_off_the_event_loop(graph, monkeypatch):
+    calls = record_loop(monkeypatch, RoadGraph, "simulate")
+    response = TestClient(app).post("/api/road-closure-impact", json={"road_id": "main"})
+    assert response.status_code == 200
+    assert response.json()["affected_routes"][0]["route"] == "1"
+    assert calls == ["thread"]
+
+
+def test_admin_closure_is_planned_off_the_loop_and_applied(graph, tmp_path, monkeypatch):
+    trips = [(f"t{h}", "r1", "Delta", [("A", hms(h * 3600)), ("D", hms(h * 3600 + 900))]) for h in range(24)]
+    publish_feed(tmp_path / "gtfs.zip", trips)
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    calls = record_loop(monkeypatch, RoadGraph, "closure_impact")
+    client = TestClient(app)
+    headers = {"X-Admin-Token": "secret"}
+
+    response = client.put("/admin/closures/main", headers=headers)
+    assert response.status_code == 200
+    assert calls and set(calls) == {"thread"}
+    assert planner.get_disruption().delays          # route 1's pattern now runs late
+    assert client.get("/admin/closures", headers=headers).json()["closures"].keys() == {"main"}
+
+    assert client.delete("/admin/closures/main", headers=headers).status_code == 200
+    assert planner.get_disruption() == planner.NO_DISRUPTION
+    assert client.put("/admin/closures/ring", headers=headers).status_code == 404
+
+
+def test_admin_closures_are_refused_in_shared_workers(graph, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(config, "SHARED_DATA_PATH", str(tmp_path / "shared.bin"))
+    client = TestClient(app)
+    headers = {"X-Admin-Token": "secret"}
+
+    # Each worker has its own registry: a closure here would reach this worker only
+    assert client.put("/admin/closures/main", headers=headers).status_code == 409
+    assert client.delete("/admin/closures/main", headers=headers).status_code == 409
+    assert client.get("/admin/closures", headers=headers).json()["closures"] == {}
+
+
+def test_mock_scenarios_report_their_baseline_figures():
+    client = TestClient(app)
+
+    def passengers(**body):
+        response = client.post("/api/road-closure-impact", json={"road_id": "oxford_road", **body})
+        assert response.status_code == 200
+        return response.json()["estimated_passengers_affected"]
+
+    # A whole day is six average four-hour closures, whatever the start hour
+    assert passengers(duration_hours=24, start_hour=3) == 6 * 14_200
+    assert passengers(duration_hours=8, start_hour=7) > 2 * passengers(duration_hours=4, start_hour=1)
+    assert passengers(duration_hours=0) == 0
@@ -0,0 +1,31 @@
+import asyncio
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import planner
+
+from tests.helpers import hms, publish_feed
+
+
+def test_routes_are_planned_off_the_event_loop(tmp_path, monkeypatch):
+    trips = [(f"t{h}", "r1", "Delta", [("A", hms(h * 3600)), ("D", hms(h * 3600 + 900))]) for h in range(24)]
+    publish_feed(tmp_path / "gtfs.zip", trips)
+    on_loop = []
+    search = planner.RaptorNetwork.search
+
+    def recording_search(self, *args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return search(self, *args, **kwargs)
+
+    monkeypatch.setattr(planner.RaptorNetwork, "search", recording_search)
+    client = TestClient(app)    # no lifespan: keeps the feed published above
+    response = client.get("/api/routes", params={"origin": "Alpha", "destination": "Delta"})
+
+    assert response.status_code == 200
+    assert response.json()["options"][0]["legs"][0].startswith("Bus 1 from Alpha")
+    assert on_loop and not any(on_loop)
@@ -0,0 +1,40 @@
+import json
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.schemas import ArrivalItem
+from app.services import serialization
+from app.services.serialization import clock_time, dumps, loads, with_timestamp
+
+ITEM = ArrivalItem(route="42", destination="Didsbury", due_minutes=5, status="ontime", stop_name="Alpha")
+DATA = {"stop": "Alpha", "arrivals": [ITEM.model_dump()], 3: None}
+
+
+def test_models_encode_like_pydantic():
+    assert dumps(ITEM) == ITEM.model_dump_json().encode()
+
+
+@pytest.mark.parametrize("fast", [True, False])
+def test_plain_data_encodes_compactly_with_or_without_orjson(fast, monkeypatch):
+    if not fast:
+        monkeypatch.setattr(serialization, "orjson", None)
+    body = dumps(DATA)
+    assert b" " not in body.replace(b"Alpha", b"")
+    assert loads(body) == json.loads(json.dumps(DATA))
+
+
+def test_with_timestamp_copies_models_and_dicts():
+    assert with_timestamp(ITEM, "stop_name", "Bravo").stop_name == "Bravo" and ITEM.stop_name == "Alpha"
+    assert with_timestamp(DATA, "stop", "Bravo")["stop"] == "Bravo" and DATA["stop"] == "Alpha"
+    assert clock_time(datetime(2024, 3, 14, 8, 5, 9)) == "08:05:09"
+
+
+def test_cached_bodies_keep_the_time_their_version_was_built():
+    client = TestClient(app)
+    first = client.get("/api/heatmap", params={"metric": "delay"})
+    second = client.get("/api/heatmap", params={"metric": "delay"})
+    assert second.headers["x-cache"] == "HIT"
+    assert second.content == first.content
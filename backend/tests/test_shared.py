@@ -0,0 +1,55 @@
+import dataclasses
+from typing import Dict
+
+import numpy as np
+import pytest
+
+from app.services import shared
+
+
+@dataclasses.dataclass
+class Index:
+    ids: np.ndarray
+    names: list
+    by_name: Dict[str, int] = dataclasses.field(init=False)
+
+    def __post_init__(self):
+        self.by_name = {name: i for i, name in enumerate(self.names)}
+
+
+def test_attach_round_trips_with_aligned_read_only_views(tmp_path):
+    path = str(tmp_path / "datasets.bin")
+    ids = np.arange(1000, dtype=np.int64)
+    size = shared.publish({"index": Index(ids, ["a", "b"]), "grid": np.ones((3, 5), dtype=np.float32)},
+                          path, meta={"version": 7})
+    assert size == (tmp_path / "datasets.bin").stat().st_size
+    assert not list(tmp_path.glob("*.tmp"))
+
+    loaded = shared.attach(path, verify=True)
+    index, grid = loaded["index"], loaded["grid"]
+    assert np.array_equal(index.ids, ids) and index.by_name == {"a": 0, "b": 1}
+    assert grid.shape == (3, 5) and grid.dtype == np.float32
+    for array in (index.ids, grid):
+        assert not array.flags.writeable                          # a view of the read-only mapping
+        assert array.ctypes.data % shared.ALIGN == 0
+    assert shared.read_header(path)["meta"] == {"version": 7}
+
+
+def test_attach_rejects_foreign_truncated_and_corrupt_files(tmp_path):
+    path = tmp_path / "datasets.bin"
+    shared.publish({"ids": np.arange(4096, dtype=np.int64)}, str(path))
+    data = path.read_bytes()
+
+    (tmp_path / "foreign.bin").write_bytes(b"NOTSMART" + data[8:])
+    with pytest.raises(ValueError, match="not a SmartBee"):
+        shared.attach(str(tmp_path / "foreign.bin"))
+    (tmp_path / "short.bin").write_bytes(data[:-64])
+    with pytest.raises(ValueError, match="truncated"):
+        shared.read_header(str(tmp_path / "short.bin"))
+
+    corrupt = bytearray(data)
+    corrupt[-1024] ^= 0xFF                                          # inside the array, not padding
+    path.write_bytes(bytes(corrupt))
+    assert shared.attach(str(path))["ids"][-128] != 4096 - 128      # unchecked by default
+    with pytest.raises(ValueError, match="checksum"):
+        shared.attach(str(path), verify=True)
@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+import pytest
+
+from app import config, snapshot as snapshot_cli
+from app.services import shared, snapshot
+
+from tests.helpers import hms, write_feed, write_road_graph
+
+TRIPS = [("t1", "r1", "Delta", [("A", hms(8 * 3600)), ("B", hms(8 * 3600 + 300)), ("D", hms(8 * 3600 + 900))])]
+
+
+@pytest.fixture
+def sources(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "GTFS_PATH", write_feed(tmp_path / "gtfs.zip", TRIPS))
+    monkeypatch.setattr(config, "ROAD_GRAPH_PATH", write_road_graph(tmp_path / "roads.json"))
+    monkeypatch.setattr(config, "HEATMAP_EVENTS_PATH", None)
+    monkeypatch.setattr(config, "SNAPSHOT_VERIFY", False)
+    return tmp_path
+
+
+def corrupt_last_byte(path):
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+
+def test_snapshot_round_trips_the_datasets(sources):
+    path = str(sources / "snapshot.bin")
+    meta = snapshot.build_snapshot(path)
+    assert snapshot.stale_reason(path) is None
+
+    datasets = snapshot.open_snapshot(path)
+    loaded = snapshot.load_datasets()
+    assert np.array_equal(datasets["timetable"].st_departure, loaded["timetable"].st_departure)
+    assert datasets["road_graph"].has_road("main")
+    assert snapshot.snapshot_info() == meta
+
+
+def test_changed_sources_make_the_snapshot_stale(sources):
+    path = str(sources / "snapshot.bin")
+    snapshot.build_snapshot(path)
+    write_feed(sources / "gtfs.zip", TRIPS + [("t2", "r2", "Alpha", [("D", hms(9 * 3600)), ("A", hms(9 * 3600 + 900))])])
+    assert snapshot.stale_reason(path) == "source files changed"
+    assert snapshot.stale_reason(str(sources / "absent.bin")) == "missing"
+
+
+def test_startup_skips_the_body_hash_unless_asked(sources, monkeypatch):
+    path = str(sources / "snapshot.bin")
+    snapshot.build_snapshot(path)
+    corrupt_last_byte(path)
+    rebuilt = []
+    monkeypatch.setattr(snapshot, "build_snapshot", lambda p, build=snapshot.build_snapshot: rebuilt.append(p) or build(p))
+
+    # Header, size and sources check out: mapped as is
+    snapshot.open_snapshot(path)
+    assert rebuilt == []
+
+    monkeypatch.setattr(config, "SNAPSHOT_VERIFY", True)
+    snapshot.open_snapshot(path)
+    assert rebuilt == [path]
+    assert shared.attach(path, verify=True)["timetable"].n_trips == 1
+
+
+def test_truncated_snapshot_is_rebuilt(sources):
+    path = str(sources / "snapshot.bin")
+    snapshot.build_snapshot(path)
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 64)
+    datasets = snapshot.open_snapshot(path)
+    assert datasets["timetable"].n_trips == 1
+    assert shared.attach(path, verify=True)["road_graph"].has_road("main")
+
+
+def test_check_command_verifies_the_checksum(sources, capsys):
+    path = str(sources / "snapshot.bin")
+    snapshot.build_snapshot(path)
+    assert snapshot_cli.main(["check", path]) == 0
+    corrupt_last_byte(path)
+    assert snapshot_cli.main(["check", path]) == 1
+    assert "checksum mismatch" in capsys.readouterr().err
@@ -0,0 +1,116 @@
+import itertools
+import re
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.stop_resolver import EXACT_SCORE, NAME_PREFIX_SCORE, PREFIX_SCORE, StopResolver, fold, trigrams
+from app.services.timetable import load_gtfs
+
+from tests.helpers import STOPS, hms, publish_feed, write_feed
+
+DASHBOARD = Path(__file__).resolve().parents[2] / "frontend" / "src" / "pages" / "UserDashboard.jsx"
+
+PLACES = [
+    ("high_street", "High Street", []),
+    ("market_street", "Market Street", []),
+    ("highfield_road", "Highfield Road", []),
+    ("oxford_road_station", "Oxford Road Station", []),
+    ("piccadilly_gardens", "Piccadilly Gardens", []),
+]
+
+
+def resolver() -> StopResolver:
+    return StopResolver(PLACES, {"piccadilly": "Piccadilly Gardens"})
+
+
+def test_fold_drops_accents_punctuation_and_abbreviations():
+    assert fold("  St. Peter's Sq ") == "st peters square"
+    assert fold("Café Rd & Stn") == "cafe road & station"
+    assert fold("Oxford Road and Station") == fold("Oxford Rd & Stn")
+    assert trigrams("ab") == ["  a", " ab", "ab "]
+
+
+def test_search_ranks_exact_then_name_prefix_then_word_prefix_then_misspellings():
+    r = resolver()
+
+    exact = r.search("high street")
+    assert (exact[0].name, exact[0].score) == ("High Street", EXACT_SCORE)
+
+    prefix = r.search("high")
+    assert [(m.name, m.score) for m in prefix[:2]] == [("High Street", NAME_PREFIX_SCORE),
+                                                      ("Highfield Road", NAME_PREFIX_SCORE)]
+
+    words = r.search("str")
+    assert [(m.name, m.score) for m in words[:2]] == [("High Street", PREFIX_SCORE), ("Market Street", PREFIX_SCORE)]
+
+    typo = r.search("markt stret")
+    assert typo[0].name == "Market Street" and typo[0].score < PREFIX_SCORE
+    assert r.search("") == [] and r.search("high", 0) == []
+    assert len(r.search("road", 1)) == 1
+
+
+def test_resolve_takes_aliases_abbreviations_and_close_misspellings_only():
+    r = resolver()
+    assert r.resolve("piccadilly").key == "piccadilly_gardens"
+    assert r.resolve("oxford rd stn").key == "oxford_road_station"
+    assert r.resolve("Markett Stret").key == "market_street"
+    assert r.resolve("hi") is None                  # prefixes this short must match exactly
+    assert r.resolve("zzzz qqqq") is None
+
+
+def test_from_timetable_groups_names_and_ranks_by_departures(tmp_path):
+    stops = STOPS + [("C2", "Piccadilly Gardens", 53.4781, -2.2321)]
+    trips = [(f"t{h}", "r1", "Delta", [("A", hms(h * 3600)), ("C2", hms(h * 3600 + 300)), ("D", hms(h * 3600 + 600))])
+             for h in range(6, 10)]
+    trips += [("b1", "r1", "Delta", [("B", hms(25200)), ("C", hms(25500)), ("D", hms(25800))])]
+    timetable = load_gtfs(write_feed(tmp_path / "gtfs.zip", trips, stops=stops))
+    r = StopResolver.from_timetable(timetable)
+
+    piccadilly = r.resolve("piccadilly")
+    assert piccadilly.name == "Piccadilly Gardens"
+    assert sorted(timetable.stop_ids[s] for s in piccadilly.stops) == ["C", "C2"]
+    assert r.keys[:2] == ["piccadilly_gardens", "alpha"]   # 5 departures, then 4
+
+    single = r.resolve("C2")                        # a raw stop_id resolves to just that stop
+    assert single.key == "C2" and [timetable.stop_ids[s] for s in single.stops] == ["C2"]
+
+
+def test_search_endpoint_and_unknown_stop_hint(tmp_path):
+    trips = [(f"t{h}", "r1", "Delta", [("A", hms(h * 3600)), ("C", hms(h * 3600 + 300))]) for h in range(6, 22)]
+    publish_feed(tmp_path / "gtfs.zip", trips)
+    client = TestClient(app)    # no lifespan: keeps the feed published above
+
+    body = client.get("/api/stops/search", params={"q": "picadily", "limit": 3}).json()
+    top = body["results"][0]
+    assert body["query"] == "picadily"
+    assert top["name"] == "Piccadilly Gardens" and top["stop_ids"] == ["C"]
+    assert (top["lat"], top["lng"]) == (53.4779, -2.2323)
+    assert client.get("/api/stops/search", params={"q": ""}).status_code == 422
+
+    missing = client.get("/api/arrivals", params={"stop": "Alphaville Gardens"})
+    assert missing.status_code == 404
+    assert "did you mean" in missing.json()["detail"]
+
+
+def dashboard_stops():
+    if not DASHBOARD.exists():
+        pytest.skip("frontend sources not checked out")
+    listing = re.search(r"MANCHESTER_STOPS = \[(.*?)\]", DASHBOARD.read_text(), re.S).group(1)
+    return re.findall(r"'([^']+)'", listing)
+
+
+def test_every_dashboard_stop_has_mock_arrivals_and_routes():
+    client = TestClient(app)
+    stops = dashboard_stops()
+    assert "Ancoats" in stops
+    for stop in stops:
+        # The dashboard sends the lower-cased display name
+        board = client.get("/api/arrivals", params={"stop": stop.lower()})
+        assert board.status_code == 200, stop
+        assert board.json()["arrivals"], stop
+    for origin, destination in itertools.permutations(stops, 2):
+        routes = client.get("/api/routes", params={"origin": origin, "destination": destination})
+        assert routes.status_code == 200, (origin, destination)
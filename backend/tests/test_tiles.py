@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import tiles
+from app.services.tiles import MAX_ZOOM, MIN_ZOOM, TileGrid, parse_bbox, tile_xy
+
+# Two events ~300 m apart in the city centre, one ~30 km south
+LAT = np.array([53.4808, 53.4830, 53.2000])
+LNG = np.array([-2.2426, -2.2400, -2.2400])
+
+
+def test_tile_xy_matches_the_slippy_map_scheme():
+    x, y = tile_xy(np.array([0.0, 85.0511]), np.array([0.0, -180.0]), 10)
+    assert x.tolist() == [512, 0] and y.tolist() == [512, 0]
+
+
+def test_sum_grid_merges_nearby_events_at_low_zoom():
+    grid = TileGrid.build(LAT, LNG, np.array([1.0, 3.0, 2.0]))
+    assert sorted(grid.levels) == list(range(MIN_ZOOM, MAX_ZOOM + 1))
+    low, high = grid.levels[MIN_ZOOM], grid.levels[MAX_ZOOM]
+    assert sorted(low.count.tolist()) == [1, 2] and len(high.x) == 3
+
+    merged = int(np.argmax(low.count))
+    # Normalised by the largest cell; centroid weighted towards the heavier event
+    assert low.intensity[merged] == 1.0 and low.intensity[1 - merged] == pytest.approx(0.5)
+    assert low.lat[merged] == pytest.approx((53.4808 + 3 * 53.4830) / 4)
+
+
+def test_mean_grid_averages_and_keeps_the_heaviest_label():
+    grid = TileGrid.build(LAT, LNG, np.array([0.2, 0.6, 0.9]), label=np.array([0, 1, -1]),
+                          labels=["light", "heavy"], aggregate="mean", normalize=False)
+    rows = sorted(grid.cell_rows(MIN_ZOOM), key=lambda row: row["lat"])
+    assert [(row["intensity"], row["label"]) for row in rows] == [(0.9, None), (0.4, "heavy")]
+
+
+def test_bbox_keeps_only_cells_on_screen():
+    grid = TileGrid.build(LAT, LNG, np.ones(3))
+    centre = grid.cell_rows(MAX_ZOOM, (-2.25, 53.47, -2.23, 53.49))
+    assert len(centre) == 2 and all(row["lat"] > 53.47 for row in centre)
+    assert grid.cell_rows(MAX_ZOOM, (0.0, 0.0, 1.0, 1.0)) == []
+    # Zooms outside the built range are clamped
+    assert grid.cell_rows(3) == grid.cell_rows(MIN_ZOOM)
+
+
+@pytest.mark.parametrize("value", ["1,2,3", "2,0,1,1", "a,b,c,d"])
+def test_malformed_bbox_is_rejected(value):
+    with pytest.raises(ValueError):
+        parse_bbox(value)
+
+
+def test_heatmap_serves_loaded_events_by_viewport(tmp_path):
+    path = tmp_path / "events.npz"
+    np.savez(path, demand_lat=LAT, demand_lng=LNG, demand_weight=np.array([1.0, 1.0, 4.0]))
+    tiles.init_tiles(str(path))
+    client = TestClient(app)
+
+    points = client.get("/api/heatmap", params={"zoom": 12}).json()["points"]
+    assert sorted(point["intensity"] for point in points) == [0.5, 1.0]
+    viewport = client.get("/api/heatmap", params={"zoom": 12, "bbox": "-2.25,53.47,-2.23,53.49"}).json()
+    assert [point["intensity"] for point in viewport["points"]] == [0.5]
+
+
+def test_heatmap_rejects_bad_parameters():
+    client = TestClient(app)
+    assert client.get("/api/heatmap", params={"metric": "noise"}).status_code == 422
+    assert client.get("/api/heatmap", params={"bbox": "1,2,3"}).status_code == 422
+    # Mock point clouds without an events file
+    assert client.get("/api/heatmap", params={"metric": "crowding", "zoom": 10}).json()["points"]
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from app.services.timetable import load_gtfs, parse_gtfs_time
+
+from tests.helpers import hms, write_feed
+
+
+@pytest.fixture
+def timetable(tmp_path):
+    trips = [
+        (f"t{i}", "r1", "Delta", [("A", hms(t)), ("B", hms(t + 300)), ("D", hms(t + 900))])
+        for i, t in enumerate(range(8 * 3600, 9 * 3600, 600))
+    ]
+    trips.append(("late", "r2", "Night", [("A", "24:40:00"), ("B", "24:45:00"), ("D", "25:00:00")]))
+    return load_gtfs(write_feed(tmp_path / "gtfs.zip", trips))
+
+
+def test_parse_gtfs_time_allows_hours_past_midnight():
+    assert parse_gtfs_time("25:10:05") == 25 * 3600 + 10 * 60 + 5
+    assert parse_gtfs_time(" ") == -1
+
+
+def test_board_lists_next_departures_in_time_order(timetable):
+    board = timetable.arrival_board(timetable.stops_named("Alpha"), 8 * 3600 + 60, limit=3)
+    assert [item.due_minutes for item in board] == [9, 19, 29]
+    assert {(item.route, item.destination, item.status) for item in board} == {("1", "Delta", "ontime")}
+
+
+def test_terminus_has_no_departures(timetable):
+    assert timetable.arrival_board(timetable.stops_named("Delta"), 8 * 3600, limit=5) == []
+
+
+def test_small_hours_board_includes_previous_service_day(timetable):
+    # 00:30 today: the 24:40 trip of yesterday's service leaves in 10 minutes
+    board = timetable.arrival_board(timetable.stops_named("Alpha"), 30 * 60, limit=2)
+    assert [(item.route, item.due_minutes) for item in board] == [("2", 10), ("1", 450)]
+
+
+def test_realtime_delays_reorder_and_keep_late_vehicles(timetable):
+    delays = np.zeros(timetable.n_trips, dtype=np.int32)
+    cancelled = np.zeros(timetable.n_trips, dtype=bool)
+    first, second = timetable.trip_ids.index("t0"), timetable.trip_ids.index("t1")
+    delays[first] = 15 * 60             # scheduled 08:00, now expected 08:15
+    cancelled[second] = True
+    board = timetable.arrival_board(timetable.stops_named("Alpha"), 8 * 3600 + 5 * 60, 3, delays, cancelled)
+    assert [(item.due_minutes, item.status) for item in board] == [(5, "cancelled"), (10, "late"), (15, "ontime")]
+    assert board[1].delay_minutes == 15
+
+
+def test_late_running_overnight_trip_stays_on_the_board(timetable):
+    delays = np.zeros(timetable.n_trips, dtype=np.int32)
+    delays[timetable.trip_ids.index("late")] = 20 * 60      # 24:40 running 20 minutes late
+    board = timetable.arrival_board(timetable.stops_named("Alpha"), 50 * 60, 1, delays)
+    assert [(item.route, item.due_minutes, item.status) for item in board] == [("2", 10, "late")]
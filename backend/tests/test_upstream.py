@@ -0,0 +1,179 @@
+import asyncio
+import types
+
+import httpx
+import pytest
+
+from app.services import upstream
+from app.services.upstream import Upstream, UpstreamError, UpstreamSettings
+
+pytestmark = pytest.mark.anyio
+
+URL = "http://feed.test/rt"
+
+
+class Clock:
+    """Stands in for the module's `time`: both clocks advance only when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(upstream, "time", types.SimpleNamespace(monotonic=clock.monotonic, time=clock.time))
+    return clock
+
+
+def make(handler, **settings) -> Upstream:
+    settings = {"deadline": 1.0, "retries": 0, "backoff": 0.001, **settings}
+    return Upstream("test", UpstreamSettings(base_url=URL, **settings), httpx.MockTransport(handler))
+
+
+def statuses(*codes):
+    """Handler answering with each status in turn (the last one from then on)."""
+    codes = list(codes)
+
+    def handler(request):
+        return httpx.Response(codes.pop(0) if len(codes) > 1 else codes[0], content=b"feed")
+
+    return handler
+
+
+async def test_deadline_bounds_a_slow_upstream():
+    async def slow(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200)
+
+    client = make(slow, deadline=0.05)
+    with pytest.raises(UpstreamError, match="no answer within 0.05s"):
+        await client.get()
+    assert client.counters["failures"] == 1
+    await client.close()
+
+
+async def test_retries_with_exponential_backoff(monkeypatch):
+    waits = []
+    monkeypatch.setattr(upstream.random, "uniform", lambda low, high: waits.append(high) or 0)
+    client = make(statuses(503, 502, 200), retries=2, backoff=0.1)
+
+    response = await client.get()
+    assert (response.status, response.content) == (200, b"feed")
+    assert waits == [0.1, 0.2]
+    assert (client.counters["attempts"], client.counters["retries"]) == (3, 2)
+    await client.close()
+
+
+async def test_exhausted_retries_fail_the_call():
+    client = make(statuses(503), retries=1)
+    with pytest.raises(UpstreamError, match="HTTP 503"):
+        await client.get()
+    assert client.counters["attempts"] == 2
+    await client.close()
+
+
+async def test_client_errors_are_not_retried():
+    client = make(statuses(404), retries=2)
+    assert (await client.get()).status == 404
+    assert client.counters["attempts"] == 1
+    await client.close()
+
+
+async def test_breaker_opens_then_probes_then_closes(clock):
+    handler_statuses = [500]
+    client = make(lambda request: httpx.Response(handler_statuses[0]),
+                  breaker_failures=2, breaker_reset_seconds=30)
+
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            await client.get()
+    assert client.breaker.state == "open"
+    with pytest.raises(UpstreamError, match="circuit open"):
+        await client.get()
+    assert (client.counters["attempts"], client.counters["rejected"]) == (2, 1)
+
+    # A failed probe re-opens the breaker for another reset period
+    clock.now += 30
+    assert client.breaker.state == "half_open"
+    with pytest.raises(UpstreamError, match="HTTP 500"):
+        await client.get()
+    assert client.breaker.state == "open"
+
+    clock.now += 30
+    handler_statuses[0] = 200
+    assert (await client.get()).status == 200
+    assert client.breaker.state == "closed" and client.counters["attempts"] == 4
+    await client.close()
+
+
+async def test_half_open_lets_a_single_probe_through(clock):
+    client = make(statuses(500), breaker_failures=1, breaker_reset_seconds=30)
+    with pytest.raises(UpstreamError):
+        await client.get()
+    clock.now += 30
+    assert client.breaker.allow() and not client.breaker.allow()
+    await client.close()
+
+
+async def test_hedge_wins_over_a_stuck_attempt():
+    sent = []
+
+    async def first_stuck(request):
+        sent.append(len(sent))
+        if len(sent) == 1:
+            await asyncio.sleep(5)
+        return httpx.Response(200, content=b"hedge")
+
+    client = make(first_stuck, hedge_after=0.02)
+    response = await client.get()
+    assert response.content == b"hedge"
+    assert (client.counters["hedges"], client.counters["attempts"]) == (1, 2)
+    await client.close()
+
+
+async def test_fast_answer_sends_no_hedge():
+    client = make(statuses(200), hedge_after=0.5)
+    await client.get()
+    assert (client.counters["hedges"], client.counters["attempts"]) == (0, 1)
+    await client.close()
+
+
+async def test_stale_response_served_while_failing_until_too_old(clock):
+    handler_statuses = [200]
+    client = make(lambda request: httpx.Response(handler_statuses[0], content=b"good"),
+                  stale_seconds=600, breaker_failures=100)
+    assert not (await client.get()).stale
+
+    handler_statuses[0] = 503
+    clock.now += 600
+    stale = await client.get()
+    assert (stale.stale, stale.content, client.counters["stale"]) == (True, b"good", 1)
+
+    clock.now += 1
+    with pytest.raises(UpstreamError):
+        await client.get()
+    await client.close()
+
+
+async def test_stale_served_while_breaker_open(clock):
+    handler_statuses = [200]
+    client = make(lambda request: httpx.Response(handler_statuses[0], content=b"good"), breaker_failures=1)
+    await client.get()
+    handler_statuses[0] = 500
+    assert (await client.get()).stale
+    assert (await client.get()).stale and client.counters["rejected"] == 1
+    assert client.counters["attempts"] == 2
+    await client.close()
+
+
+def test_url_joins_path_and_params():
+    client = make(statuses(200))
+    assert client.url("stops/", {"id": [1, 2]}) == "http://feed.test/rt/stops/?id=1&id=2"
+    assert client.url() == URL